@@ -1,6 +1,7 @@
 BEGIN;
 
 CREATE INDEX listened_at_user_id_ndx_listen ON listen (listened_at DESC, user_id);
+CREATE INDEX user_id_listened_at_ndx_listen ON listen (user_id, listened_at DESC);
 CREATE INDEX created_ndx_listen ON listen (created);
 CREATE UNIQUE INDEX listened_at_user_id_recording_msid_ndx_listen ON listen (listened_at DESC, user_id, recording_msid);
 
@@ -0,0 +1,5 @@
+-- Index used by the keyset paginated fetch_listens to select a page of listens of a user.
+-- Timescale doesn't support CREATE INDEX CONCURRENTLY, transaction_per_chunk creates the index one chunk
+-- at a time so that the table remains available while the index is building.
+-- This operation doesn't support being run inside a transaction.
+CREATE INDEX user_id_listened_at_ndx_listen ON listen (user_id, listened_at DESC) WITH (timescaledb.transaction_per_chunk);
@@ -273,6 +273,13 @@ export default function Listen() {
     const newListenHandler = (socketData: string) => {
       receiveNewListen(socketData);
     };
+    const newListensHandler = (socketData: string) => {
+      // batched event, a json array of the new listens of the user
+      const newListens = JSON.parse(socketData) as Array<object>;
+      newListens.forEach((newListen) => {
+        receiveNewListen(JSON.stringify(newListen));
+      });
+    };
     const newPlayingNowHandler = (socketData: string) => {
       const newPlayingNow = JSON.parse(socketData) as Listen;
       updatePlayingNowMutation(newPlayingNow);
@@ -280,11 +287,13 @@ export default function Listen() {
 
     socket.on("connect", connectHandler);
     socket.on("listen", newListenHandler);
+    socket.on("listens", newListensHandler);
     socket.on("playing_now", newPlayingNowHandler);
 
     return () => {
       socket.off("connect", connectHandler);
       socket.off("listen", newListenHandler);
+      socket.off("listens", newListensHandler);
       socket.off("playing_now", newPlayingNowHandler);
       socket.close();
     };
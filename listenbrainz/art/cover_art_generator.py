@@ -311,7 +311,7 @@ class CoverArtGenerator:
         if user is None:
             raise ValueError(f"User {user_name} not found")
 
-        stats = db_stats.get(user["id"], entity, time_range, EntityRecord)
+        stats = db_stats.get(user["id"], entity, time_range, EntityRecord, count=NUMBER_OF_STATS)
         if stats is None:
             raise ValueError(f"Stats for user {user_name} not found/calculated")
 
@@ -0,0 +1,48 @@
+""" Benchmarks for the hot paths of ListenBrainz.
+
+Each module in this package is a standalone script meant to be run against local services (postgres, redis,
+rabbitmq, couchdb) started with develop.sh, for instance::
+
+    python -m listenbrainz.benchmarks.msid_resolution --listens 10000
+
+They are not run as part of the test suite.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+
+class Timer:
+    """ Collects wall clock timings of repeated runs of a code block. """
+
+    def __init__(self):
+        self.timings = []
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append(time.perf_counter() - start)
+
+    @property
+    def total(self):
+        return sum(self.timings)
+
+    def percentile(self, p):
+        """ Return the p-th percentile (0-100) of the recorded timings in seconds. """
+        if not self.timings:
+            return 0.0
+        if len(self.timings) == 1:
+            return self.timings[0]
+        return statistics.quantiles(self.timings, n=100, method="inclusive")[max(0, min(98, p - 1))]
+
+
+def report(name: str, items: int, seconds: float, **extra):
+    """ Print a single line result of a benchmark run. """
+    rate = items / seconds if seconds else float("inf")
+    line = f"{name:<40} {items:>10} items {seconds:>10.3f}s {rate:>12.1f} items/s"
+    for key, value in extra.items():
+        line += f"  {key}={value}"
+    print(line)
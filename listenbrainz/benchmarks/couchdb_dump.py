@@ -0,0 +1,89 @@
+""" Benchmark dumping a couchdb stats database with couchdb.dump_database and couchdb.dump_database_parallel.
+
+A database with --docs user stats documents is created in the local couchdb started with develop.sh (skipped if it
+already has them, pass --keep to reuse it across runs) and dumped sequentially and then with each of the --ranges
+values. The documents per second and the peak memory used by the process after each run are reported.
+"""
+import os
+import resource
+import shutil
+import tempfile
+
+import click
+import requests
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import couchdb
+from listenbrainz.webserver import create_app
+
+PREFIX = "benchmark_dump"
+DATABASE = f"{PREFIX}_20000101"
+
+
+def make_doc(user_id):
+    return {
+        "_id": str(user_id),
+        "key": user_id,
+        "user_id": user_id,
+        "from_ts": 0,
+        "to_ts": 1,
+        "last_updated": 1,
+        "count": 25,
+        "data": [
+            {"artist_name": f"artist {idx}", "artist_mbid": None, "listen_count": 100 - idx}
+            for idx in range(25)
+        ]
+    }
+
+
+def populate(docs, chunk_size=10000):
+    response = requests.get(f"{couchdb.get_base_url()}/{DATABASE}")
+    if response.status_code == 200 and response.json()["doc_count"] >= docs:
+        return
+    if response.status_code == 404:
+        couchdb.create_database(DATABASE)
+    for start in range(0, docs, chunk_size):
+        couchdb.insert_data(DATABASE, [make_doc(user_id) for user_id in range(start, min(docs, start + chunk_size))])
+
+
+def peak_memory_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@click.command()
+@click.option("--docs", default=1_000_000, show_default=True, help="Number of documents in the database")
+@click.option("--ranges", "ranges_list", default="4,8,16", show_default=True,
+              help="Comma separated numbers of concurrent ranges to benchmark")
+@click.option("--page-size", default=couchdb.DUMP_PAGE_SIZE, show_default=True, help="Documents per request")
+@click.option("--sequential/--no-sequential", default=True, show_default=True,
+              help="Also benchmark the sequential dump_database")
+@click.option("--keep", is_flag=True, help="Don't delete the benchmark database at the end")
+def main(docs, ranges_list, page_size, sequential, keep):
+    app = create_app()
+    with app.app_context():
+        populate(docs)
+        try:
+            if sequential:
+                timer = Timer()
+                with tempfile.TemporaryFile() as fp, timer.time():
+                    couchdb.dump_database(PREFIX, fp)
+                report("couchdb dump sequential", docs, timer.total, peak_memory_mb=peak_memory_mb())
+
+            for ranges in [int(value) for value in ranges_list.split(",")]:
+                work_dir = tempfile.mkdtemp()
+                try:
+                    timer = Timer()
+                    with timer.time():
+                        paths = couchdb.dump_database_parallel(PREFIX, work_dir, ranges=ranges, page_size=page_size)
+                    size_mb = round(sum(os.path.getsize(path) for path in paths) / 1024 / 1024, 1)
+                    report(f"couchdb dump {ranges} ranges", docs, timer.total, size_mb=size_mb,
+                           peak_memory_mb=peak_memory_mb())
+                finally:
+                    shutil.rmtree(work_dir)
+        finally:
+            if not keep:
+                requests.delete(f"{couchdb.get_base_url()}/{DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
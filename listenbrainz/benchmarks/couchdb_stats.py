@@ -0,0 +1,151 @@
+""" Benchmark the couchdb reads of a stats request against a local couchdb stand-in.
+
+The stand-in is a small in-process HTTP/1.1 server which answers _all_dbs, document and _bulk_get requests for
+--databases stats databases (two per stat type and range, like couchdb holds between two stats runs) and counts
+the requests and the TCP connections it receives. It doesn't need any of the services of develop.sh.
+
+Three ways of fetching the stats of a user are compared:
+
+* legacy: listing the databases with _all_dbs and then fetching the document with bare requests calls, like
+  couchdb.fetch_data did before it used a pooled session and cached the list of databases
+* client: couchdb.fetch_data with the list of databases cached for --cache-ttl seconds
+* bulk: couchdb.fetch_many_data for --users-per-call users at once
+
+For each, the number of requests and connections per stats call and the p50/p99 latency are reported.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+import requests
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import couchdb
+
+STATS = ["artists", "releases", "recordings", "release_groups", "daily_activity", "listening_activity",
+         "artist_map", "artist_evolution_activity", "era_activity", "genre_activity"]
+RANGES = ["week", "month", "quarter", "half_yearly", "year", "all_time", "this_week", "this_month", "this_year"]
+
+
+class CouchDBStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, databases, users):
+        super().__init__(("127.0.0.1", 0), CouchDBStandInHandler)
+        self.databases = databases
+        self.document = json.dumps({"user_id": 1, "from_ts": 0, "to_ts": 1, "last_updated": 1,
+                                    "count": 1, "data": [{"artist_name": "artist", "listen_count": 1}]})
+        self.users = users
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def reset(self):
+        with self.lock:
+            self.requests = self.connections = 0
+
+
+class CouchDBStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def count(self):
+        with self.server.lock:
+            self.server.requests += 1
+
+    def do_GET(self):
+        self.count()
+        parts = self.path.strip("/").split("/")
+        if parts == ["_all_dbs"]:
+            self.send_json(200, json.dumps(self.server.databases))
+        elif len(parts) == 2 and parts[0] in self.server.databases and int(parts[1]) < self.server.users:
+            self.send_json(200, self.server.document)
+        else:
+            self.send_json(404, '{"error":"not_found","reason":"missing"}')
+
+    def do_POST(self):
+        self.count()
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        results = []
+        for doc in body["docs"]:
+            if int(doc["id"]) < self.server.users:
+                docs = [{"ok": json.loads(self.server.document)}]
+            else:
+                docs = [{"error": {"id": doc["id"], "error": "not_found", "reason": "missing"}}]
+            results.append({"id": doc["id"], "docs": docs})
+        self.send_json(200, json.dumps({"results": results}))
+
+
+def legacy_fetch(base_url, prefix, user_id):
+    response = requests.get(f"{base_url}/_all_dbs")
+    response.raise_for_status()
+    databases = sorted((database for database in response.json() if database.startswith(prefix)), reverse=True)
+    for database in databases:
+        response = requests.get(f"{base_url}/{database}/{user_id}")
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+        return response.json()
+    return None
+
+
+def run(name, server, calls, users_per_call, fetch):
+    server.reset()
+    timer = Timer()
+    for idx in range(calls):
+        with timer.time():
+            fetch(idx)
+    report(name, calls * users_per_call, timer.total,
+           requests_per_call=round(server.requests / calls, 2),
+           connections_per_call=round(server.connections / calls, 2),
+           p50_ms=round(timer.percentile(50) * 1000, 2),
+           p99_ms=round(timer.percentile(99) * 1000, 2))
+
+
+@click.command()
+@click.option("--calls", default=2000, show_default=True, help="Number of stats calls of each kind")
+@click.option("--users", default=1000, show_default=True, help="Number of users with stats")
+@click.option("--users-per-call", default=25, show_default=True, help="Number of users of each bulk call")
+@click.option("--cache-ttl", default=60, show_default=True, help="Seconds to cache the list of databases for")
+def main(calls, users, users_per_call, cache_ttl):
+    databases = ["_users"]
+    for stat in STATS:
+        for stats_range in RANGES:
+            databases.extend([f"{stat}_{stats_range}_20250101", f"{stat}_{stats_range}_20250102"])
+    server = CouchDBStandIn(databases, users)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    try:
+        couchdb.init("benchmark", "benchmark", host, port, databases_cache_ttl=cache_ttl)
+        base_url = couchdb.get_base_url()
+        prefix = "artists_this_week"
+
+        run("couchdb stats legacy", server, calls, 1,
+            lambda idx: legacy_fetch(base_url, prefix, idx % users))
+        run("couchdb stats client", server, calls, 1,
+            lambda idx: couchdb.fetch_data(prefix, idx % users))
+        run(f"couchdb stats bulk ({users_per_call} users)", server, calls, users_per_call,
+            lambda idx: couchdb.fetch_many_data(prefix, [(idx + i) % users for i in range(users_per_call)]))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+""" Benchmark TimescaleListenStore.fetch_listens for users with dense, sparse and bursty listening histories.
+
+The keyset paginated fetch always runs a single query. For comparison, the expanding window search it replaced
+is emulated by issuing fetch_listens calls for a 30 day window, multiplied by 3 on each miss, until the page is
+full, the user's history is exhausted or 10 passes have been made. The number of passes and the p50/p99
+latency of a default (latest listens) request are reported for each kind of user.
+
+The listens are inserted for user ids starting at --base-user-id and are deleted at the end of the run.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import click
+import sqlalchemy
+from flask import current_app
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import timescale
+from listenbrainz.listen import Listen
+from listenbrainz.listenstore import TimescaleListenStore, DEFAULT_LISTENS_PER_FETCH
+from listenbrainz.webserver import create_app
+
+LEGACY_FETCH_WINDOW = timedelta(days=30)
+LEGACY_WINDOW_SIZE_MULTIPLIER = 3
+LEGACY_MAX_PASSES = 10
+
+NOW = datetime.now(timezone.utc)
+
+
+def dense_history(count):
+    """ A listen every few minutes over the last weeks. """
+    return [NOW - timedelta(minutes=4 * i) for i in range(count)]
+
+
+def sparse_history(count):
+    """ A listen every few months over the last decades. """
+    return [NOW - timedelta(days=120 * i + 1) for i in range(count)]
+
+
+def bursty_history(count):
+    """ Bursts of consecutive listens separated by long gaps, the latest burst being a year old. """
+    timestamps = []
+    burst_start = NOW - timedelta(days=365)
+    while len(timestamps) < count:
+        for i in range(min(10, count - len(timestamps))):
+            timestamps.append(burst_start - timedelta(minutes=4 * i))
+        burst_start -= timedelta(days=random.randrange(30, 400))
+    return timestamps
+
+
+HISTORIES = {"dense": dense_history, "sparse": sparse_history, "bursty": bursty_history}
+
+
+def create_user(listenstore, user_id, timestamps):
+    listens = []
+    for ts in timestamps:
+        listens.append(Listen(
+            user_id=user_id,
+            user_name=f"benchmark-{user_id}",
+            timestamp=ts,
+            recording_msid=str(uuid.uuid4()),
+            data={"artist_name": "artist", "track_name": "track", "additional_info": {}}
+        ))
+    listenstore.insert(listens)
+    return {"id": user_id, "musicbrainz_id": f"benchmark-{user_id}"}
+
+
+def legacy_fetch(listenstore, user):
+    """ Emulate the expanding window search of fetch_listens for a default request, returns the number of passes. """
+    min_user_ts, max_user_ts = listenstore.get_timestamps_for_user(user["id"])
+    window_size = LEGACY_FETCH_WINDOW
+    to_ts = max_user_ts + timedelta(seconds=1)
+    from_ts = to_ts - window_size
+    fetched = 0
+    passes = 0
+    while passes < LEGACY_MAX_PASSES:
+        passes += 1
+        listens, _, _ = listenstore.fetch_listens(user, from_ts=from_ts, to_ts=to_ts,
+                                                  limit=DEFAULT_LISTENS_PER_FETCH - fetched)
+        fetched += len(listens)
+        if fetched >= DEFAULT_LISTENS_PER_FETCH or from_ts < min_user_ts - timedelta(seconds=1):
+            break
+        to_ts = from_ts + timedelta(seconds=1)
+        window_size *= LEGACY_WINDOW_SIZE_MULTIPLIER
+        from_ts -= window_size
+    return passes
+
+
+def keyset_fetch(listenstore, user):
+    listenstore.fetch_listens(user)
+    return 1
+
+
+def cleanup(base_user_id, users):
+    with timescale.engine.begin() as connection:
+        params = {"min_user_id": base_user_id, "max_user_id": base_user_id + users}
+        connection.execute(sqlalchemy.text(
+            "DELETE FROM listen WHERE user_id >= :min_user_id AND user_id < :max_user_id"
+        ), params)
+        connection.execute(sqlalchemy.text(
+            "DELETE FROM listen_user_metadata WHERE user_id >= :min_user_id AND user_id < :max_user_id"
+        ), params)
+
+
+@click.command()
+@click.option("--users", default=20, show_default=True, help="Number of users of each kind")
+@click.option("--listens-per-user", default=200, show_default=True, help="Number of listens of each user")
+@click.option("--repeat", default=5, show_default=True, help="Number of fetches per user")
+@click.option("--base-user-id", default=2_000_000_000, show_default=True, help="First user id to insert listens for")
+def main(users, listens_per_user, repeat, base_user_id):
+    app = create_app()
+    with app.app_context():
+        listenstore = TimescaleListenStore(current_app.logger)
+        total_users = users * len(HISTORIES)
+        try:
+            user_id = base_user_id
+            created = {}
+            for kind, history in HISTORIES.items():
+                created[kind] = []
+                for _ in range(users):
+                    created[kind].append(create_user(listenstore, user_id, history(listens_per_user)))
+                    user_id += 1
+
+            for kind, kind_users in created.items():
+                for name, fetch in [("expanding window", legacy_fetch), ("keyset", keyset_fetch)]:
+                    timer = Timer()
+                    passes = 0
+                    for _ in range(repeat):
+                        for user in kind_users:
+                            with timer.time():
+                                passes += fetch(listenstore, user)
+                    fetches = len(timer.timings)
+                    report(f"fetch_listens {name} ({kind})", fetches, timer.total,
+                           avg_passes=round(passes / fetches, 2),
+                           p50_ms=round(timer.percentile(50) * 1000, 2),
+                           p99_ms=round(timer.percentile(99) * 1000, 2))
+        finally:
+            cleanup(base_user_id, total_users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+""" Microbenchmark of the conversions of a batch of listens done by the bulk paths, comparing a list of
+:class:`~listenbrainz.listen.Listen` with a :class:`~listenbrainz.listen.ListenBatch`.
+
+For each batch size, the time taken to build the batch from queue json, convert it to timescale rows and to api
+documents and to serialize it for the unique queue is reported. No database or app context is needed.
+"""
+import random
+import uuid
+
+import click
+import orjson
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.listen import Listen, ListenBatch
+
+
+def generate_listens(count):
+    listens = []
+    for idx in range(count):
+        listens.append({
+            "user_id": random.randrange(1, 10000),
+            "user_name": f"user {idx % 10000}",
+            "listened_at": 1600000000 + idx,
+            "recording_msid": str(uuid.uuid4()),
+            "track_metadata": {
+                "artist_name": f"artist {idx % 1000}",
+                "track_name": f"track {idx}",
+                "release_name": f"release {idx % 300}",
+                "additional_info": {
+                    "duration_ms": 200000 + idx,
+                    "submission_client": "listenbrainz benchmark",
+                    "artist_mbids": [str(uuid.uuid4())],
+                    "tags": ["a", "b", "c"]
+                }
+            }
+        })
+    return orjson.dumps(listens)
+
+
+def listen_objects(body):
+    timers = {name: Timer() for name in ("from_json", "to_timescale", "to_api", "to_json")}
+    with timers["from_json"].time():
+        listens = [Listen.from_json(listen) for listen in orjson.loads(body)]
+    with timers["to_timescale"].time():
+        [listen.to_timescale() for listen in listens]
+    with timers["to_api"].time():
+        [listen.to_api() for listen in listens]
+    with timers["to_json"].time():
+        orjson.dumps([listen.to_json() for listen in listens])
+    return timers
+
+
+def listen_batch(body):
+    timers = {name: Timer() for name in ("from_json", "to_timescale", "to_api", "to_json")}
+    with timers["from_json"].time():
+        batch = ListenBatch.from_json_many(orjson.loads(body))
+    with timers["to_timescale"].time():
+        batch.to_timescale_rows()
+    with timers["to_api"].time():
+        batch.to_api_many()
+    with timers["to_json"].time():
+        ListenBatch.join_json(batch.to_json_many())
+    return timers
+
+
+@click.command()
+@click.option("--sizes", default="1000,10000,100000", show_default=True, help="Comma separated batch sizes")
+@click.option("--repeat", default=5, show_default=True, help="Number of runs per batch size")
+def main(sizes, repeat):
+    for size in [int(size) for size in sizes.split(",")]:
+        body = generate_listens(size)
+        for name, run in [("Listen", listen_objects), ("ListenBatch", listen_batch)]:
+            totals = {}
+            for _ in range(repeat):
+                for step, timer in run(body).items():
+                    totals.setdefault(step, Timer()).timings.extend(timer.timings)
+            total = sum(timer.total for timer in totals.values())
+            report(f"{name} conversions ({size} listens)", size * repeat, total,
+                   **{f"{step}_ms": round(timer.percentile(50) * 1000, 2) for step, timer in totals.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+""" Benchmark the publishing of submitted listens to RabbitMQ by the web workers against a local broker.
+
+An import of --listens-per-request listens is split in messages of MAX_LISTENS_PER_RMQ_MESSAGE listens and
+published to a benchmark exchange, bound to a temporary queue so that the broker persists the messages as it
+would for the incoming queue. The previous code path, which acquired a pooled producer for each message, is
+compared with publish_chunks_to_queue with and without publisher confirms and compression. The p50/p99 time
+spent publishing per request is reported.
+"""
+import random
+import time
+import uuid
+
+import click
+from kombu import Exchange, Queue
+from kombu.entity import PERSISTENT_DELIVERY_MODE
+from more_itertools import chunked
+
+import orjson
+
+import listenbrainz.webserver.rabbitmq_connection as rabbitmq_connection
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.webserver import create_app
+from listenbrainz.webserver.views.api_tools import publish_chunks_to_queue, MAX_LISTENS_PER_RMQ_MESSAGE
+
+
+def generate_listens(count):
+    now = int(time.time())
+    return [
+        {
+            "listened_at": now - random.randrange(365 * 24 * 60 * 60),
+            "user_id": 1,
+            "user_name": "benchmark",
+            "track_metadata": {
+                "artist_name": f"artist {idx % 50}",
+                "track_name": f"track {idx}",
+                "release_name": f"release {idx % 10}",
+                "additional_info": {
+                    "artist_mbids": [str(uuid.uuid4())],
+                    "recording_mbid": str(uuid.uuid4()),
+                    "duration_ms": random.randrange(100000, 400000),
+                    "submission_client": "benchmark"
+                }
+            }
+        }
+        for idx in range(count)
+    ]
+
+
+def legacy_publish(chunks, exchange):
+    for chunk in chunks:
+        with rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
+            producer.publish(
+                exchange=exchange,
+                routing_key='',
+                body=orjson.dumps(chunk),
+                delivery_mode=PERSISTENT_DELIVERY_MODE,
+                retry=True,
+                retry_policy={"max_retries": 5},
+                declare=[exchange]
+            )
+
+
+@click.command()
+@click.option("--requests", default=200, show_default=True, help="Number of import requests per run")
+@click.option("--listens-per-request", default=1000, show_default=True, help="Listens per import request")
+@click.option("--compression-min-bytes", default=16 * 1024, show_default=True,
+              help="RABBITMQ_PUBLISH_COMPRESSION_MIN_BYTES of the compressed runs")
+def main(requests, listens_per_request, compression_min_bytes):
+    app = create_app()
+    with app.app_context():
+        exchange = Exchange("listenbrainz-publish-benchmark", "fanout", durable=False)
+        queue = Queue("listenbrainz-publish-benchmark", exchange=exchange, durable=True)
+        with rabbitmq_connection.rabbitmq.acquire(block=True) as producer:
+            queue(producer.channel).declare()
+
+        listens = generate_listens(listens_per_request)
+        runs = [
+            ("per message producer", False, 0, True),
+            ("pipelined", False, 0, False),
+            ("pipelined + confirms", True, 0, False),
+            ("pipelined + compression", False, compression_min_bytes, False),
+            ("pipelined + confirms + compression", True, compression_min_bytes, False),
+        ]
+        try:
+            for name, confirms, min_bytes, legacy in runs:
+                app.config["RABBITMQ_PUBLISH_CONFIRMS"] = confirms
+                app.config["RABBITMQ_PUBLISH_COMPRESSION_MIN_BYTES"] = min_bytes
+                timer = Timer()
+                for _ in range(requests):
+                    chunks = chunked(listens, MAX_LISTENS_PER_RMQ_MESSAGE)
+                    with timer.time():
+                        if legacy:
+                            legacy_publish(chunks, exchange)
+                        else:
+                            publish_chunks_to_queue(chunks, exchange)
+                report(f"publish {name}", requests * listens_per_request, timer.total,
+                       p50_ms=round(timer.percentile(50) * 1000, 2), p99_ms=round(timer.percentile(99) * 1000, 2))
+        finally:
+            with rabbitmq_connection.rabbitmq.acquire(block=True) as producer:
+                queue(producer.channel).delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+""" Benchmark the validation of submit-listens payloads, comparing validate_listen called on each listen, as
+submit_listen used to do, with the single pass validate_listens.
+
+Payloads are read from a JSON lines file of submit-listens request bodies, or generated to look like the imports
+of common scrobblers (mbids, durations, a few client specific additional_info fields). Each payload is parsed
+again from its raw body before each run because validation normalizes the listens in place. No database or app
+context is needed.
+"""
+import random
+import time
+import uuid
+
+import click
+import orjson
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.webserver.views.api_tools import validate_listen, validate_listens, LISTEN_TYPE_IMPORT, \
+    MAX_LISTENS_PER_REQUEST
+
+
+def load_payloads(path):
+    with open(path, "rb") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def generate_payloads(count, listens_per_payload):
+    now = int(time.time())
+    payloads = []
+    for _ in range(count):
+        listens = []
+        for idx in range(listens_per_payload):
+            listens.append({
+                "listened_at": now - random.randrange(365 * 24 * 60 * 60),
+                "track_metadata": {
+                    "artist_name": f"artist {idx % 50}",
+                    "track_name": f"track {idx}",
+                    "release_name": f"release {idx % 10}",
+                    "additional_info": {
+                        "artist_mbids": [str(uuid.uuid4())],
+                        "recording_mbid": str(uuid.uuid4()),
+                        "release_mbid": str(uuid.uuid4()),
+                        "duration_ms": random.randrange(100000, 400000),
+                        "tracknumber": str(idx % 12 + 1),
+                        "submission_client": "benchmark",
+                        "submission_client_version": "1.0",
+                        "media_player": "benchmark player",
+                        "origin_url": f"https://example.org/track/{idx}",
+                        "tags": ["rock", "indie"]
+                    }
+                }
+            })
+        payloads.append(orjson.dumps({"listen_type": "import", "payload": listens}))
+    return payloads
+
+
+def per_listen(raw):
+    payload = orjson.loads(raw)["payload"]
+    return [validate_listen(listen, LISTEN_TYPE_IMPORT) for listen in payload]
+
+
+def single_pass(raw):
+    payload = orjson.loads(raw)["payload"]
+    validated, _ = validate_listens(payload, LISTEN_TYPE_IMPORT, check_unicode_null=b"\\u0000" in raw)
+    return validated
+
+
+@click.command()
+@click.option("--payloads-file", type=click.Path(exists=True), default=None,
+              help="JSON lines file of submit-listens request bodies")
+@click.option("--payloads", default=100, show_default=True, help="Number of payloads to generate if no file is given")
+@click.option("--listens-per-payload", default=MAX_LISTENS_PER_REQUEST, show_default=True,
+              help="Listens per generated payload")
+@click.option("--repeat", default=3, show_default=True, help="Number of runs over all payloads")
+def main(payloads_file, payloads, listens_per_payload, repeat):
+    if payloads_file:
+        raw_payloads = load_payloads(payloads_file)
+    else:
+        raw_payloads = generate_payloads(payloads, listens_per_payload)
+    listens = sum(len(orjson.loads(raw)["payload"]) for raw in raw_payloads)
+
+    for name, validate in [("validate_listen per listen", per_listen), ("validate_listens", single_pass)]:
+        timer = Timer()
+        for _ in range(repeat):
+            for raw in raw_payloads:
+                with timer.time():
+                    validate(raw)
+        report(name, listens * repeat, timer.total,
+               p50_ms=round(timer.percentile(50) * 1000, 2), p99_ms=round(timer.percentile(99) * 1000, 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+""" Compare the VALUES and COPY insert modes of the TimescaleListenStore against the local timescale database.
+
+Each mode is run on a unique-heavy workload (every listen is new) and on a duplicate-heavy workload (the same
+listens are inserted again, with a small fraction of new ones). Rows per second and the WAL generated, measured
+with pg_current_wal_lsn(), are reported for each run.
+
+The listens are inserted for user ids starting at --base-user-id and are deleted at the end of the run.
+"""
+import random
+import uuid
+from datetime import datetime, timezone
+
+import click
+import sqlalchemy
+from flask import current_app
+from more_itertools import chunked
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import timescale
+from listenbrainz.listen import Listen
+from listenbrainz.listenstore import TimescaleListenStore
+from listenbrainz.listenstore.timescale_listenstore import INSERT_MODE_VALUES, INSERT_MODE_COPY
+from listenbrainz.webserver import create_app
+
+
+def generate_listens(count, users, base_user_id):
+    now = int(datetime.now(timezone.utc).timestamp())
+    listens = []
+    for idx in range(count):
+        listens.append(Listen(
+            user_id=base_user_id + random.randrange(users),
+            timestamp=now - random.randrange(365 * 24 * 60 * 60),
+            recording_msid=str(uuid.uuid4()),
+            data={
+                "artist_name": f"artist {idx % 1000}",
+                "track_name": f"track {idx}",
+                "release_name": f"release {idx % 300}",
+                "additional_info": {
+                    "duration_ms": 200000 + idx,
+                    "listening_from": "benchmark",
+                    "submission_client": "listenbrainz benchmark",
+                    "artist_mbids": [str(uuid.uuid4())],
+                    "tags": ["a", "b", "c"]
+                }
+            }
+        ))
+    return listens
+
+
+def current_wal_lsn(connection):
+    return connection.execute(sqlalchemy.text("SELECT pg_current_wal_lsn()")).scalar()
+
+
+def wal_bytes_since(connection, lsn):
+    return connection.execute(
+        sqlalchemy.text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :lsn)"), {"lsn": lsn}
+    ).scalar()
+
+
+def run(listenstore, batches):
+    timer = Timer()
+    with timescale.engine.connect() as connection:
+        lsn = current_wal_lsn(connection)
+        for batch in batches:
+            with timer.time():
+                listenstore.insert(batch)
+        wal = wal_bytes_since(connection, lsn)
+    return timer, int(wal)
+
+
+def cleanup(base_user_id, users):
+    with timescale.engine.begin() as connection:
+        params = {"min_user_id": base_user_id, "max_user_id": base_user_id + users}
+        connection.execute(sqlalchemy.text(
+            "DELETE FROM listen WHERE user_id >= :min_user_id AND user_id < :max_user_id"
+        ), params)
+        connection.execute(sqlalchemy.text(
+            "DELETE FROM listen_user_metadata WHERE user_id >= :min_user_id AND user_id < :max_user_id"
+        ), params)
+
+
+@click.command()
+@click.option("--listens", default=100000, show_default=True, help="Number of listens per workload")
+@click.option("--batch-size", default=1000, show_default=True, help="Listens per insert call")
+@click.option("--users", default=1000, show_default=True, help="Number of distinct users")
+@click.option("--duplicate-ratio", default=0.95, show_default=True, help="Fraction of duplicates in the duplicate-heavy workload")
+@click.option("--base-user-id", default=2_000_000_000, show_default=True, help="First user id to insert listens for")
+def main(listens, batch_size, users, duplicate_ratio, base_user_id):
+    app = create_app()
+    with app.app_context():
+        for mode in [INSERT_MODE_VALUES, INSERT_MODE_COPY]:
+            listenstore = TimescaleListenStore(current_app.logger, mode)
+            try:
+                unique = generate_listens(listens, users, base_user_id)
+                timer, wal = run(listenstore, list(chunked(unique, batch_size)))
+                report(f"listen insert {mode} (unique-heavy)", listens, timer.total, wal_bytes=wal,
+                       p50_ms=round(timer.percentile(50) * 1000, 1), p99_ms=round(timer.percentile(99) * 1000, 1))
+
+                new_count = int(listens * (1 - duplicate_ratio))
+                duplicates = random.sample(unique, listens - new_count) + generate_listens(new_count, users, base_user_id)
+                random.shuffle(duplicates)
+                timer, wal = run(listenstore, list(chunked(duplicates, batch_size)))
+                report(f"listen insert {mode} (duplicate-heavy)", listens, timer.total, wal_bytes=wal,
+                       p50_ms=round(timer.percentile(50) * 1000, 1), p99_ms=round(timer.percentile(99) * 1000, 1))
+            finally:
+                cleanup(base_user_id, users)
+
+
+if __name__ == "__main__":
+    main()
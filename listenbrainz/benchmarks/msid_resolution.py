@@ -0,0 +1,71 @@
+""" Compare the per-listen and the batched MessyBrainz MSID resolution against the local timescale database.
+
+The per-listen path is the one the timescale writer used before: the message is split into chunks of
+MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP and each listen does one SELECT and (for a miss) one INSERT. The batched
+path resolves the whole message with :func:`listenbrainz.messybrainz.bulk_submit_recordings`.
+
+Both paths are run on a cold (all new recordings) and on a warm (all recordings already known) workload.
+"""
+import random
+import uuid
+
+import click
+from more_itertools import chunked
+
+from listenbrainz import messybrainz
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import timescale
+from listenbrainz.webserver import create_app
+from listenbrainz.webserver.views.api_tools import MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP
+
+
+def generate_submissions(count, distinct, prefix):
+    """ Generate count submissions drawn from distinct different recordings, similar in shape to the
+     ones the timescale writer sends to messybrainz. """
+    recordings = []
+    for idx in range(distinct):
+        recording = {
+            "title": f"{prefix} track {idx}",
+            "artist": f"{prefix} artist {idx % 97}",
+            "release": f"{prefix} release {idx % 31}" if idx % 5 else None,
+        }
+        if idx % 3 == 0:
+            recording["duration"] = 180000 + idx
+        if idx % 4 == 0:
+            recording["track_number"] = str(idx % 12 + 1)
+        recordings.append(recording)
+    return [random.choice(recordings) for _ in range(count)]
+
+
+def run_per_listen(messages):
+    for message in messages:
+        for chunk in chunked(message, MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP):
+            with timescale.engine.connect() as connection:
+                messybrainz.insert_all_in_transaction(connection, chunk)
+
+
+def run_batched(messages):
+    for message in messages:
+        messybrainz.bulk_submit_listens(message)
+
+
+@click.command()
+@click.option("--listens", default=10000, show_default=True, help="Total number of listens per run")
+@click.option("--distinct", default=2000, show_default=True, help="Number of distinct recordings in the workload")
+@click.option("--message-size", default=100, show_default=True, help="Listens per rabbitmq message")
+def main(listens, distinct, message_size):
+    app = create_app()
+    with app.app_context():
+        for name, runner in [("per-listen", run_per_listen), ("batched", run_batched)]:
+            # use a different prefix for each path so that the cold run inserts everything
+            submissions = generate_submissions(listens, distinct, f"bench-{uuid.uuid4()}")
+            messages = list(chunked(submissions, message_size))
+            for phase in ["cold", "warm"]:
+                timer = Timer()
+                with timer.time():
+                    runner(messages)
+                report(f"msid resolution {name} ({phase})", listens, timer.total)
+
+
+if __name__ == "__main__":
+    main()
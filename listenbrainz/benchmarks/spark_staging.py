@@ -0,0 +1,116 @@
+""" Compare the end-to-end time of handing off the similarity and tags datasets from spark to ListenBrainz through
+json RabbitMQ messages and through Arrow IPC files in the staging directory.
+
+Synthetic rows shaped like the output of the spark queries are generated (--rows similar recording pairs, and
+--recordings recordings with --tags tags each) and then, for each transport, serialized the way the spark request
+consumer does it, decoded the way the spark reader does it and loaded into the local timescale database started
+with develop.sh by the dataset's handlers (start, data and end messages). The time to build the messages on the
+spark side (minus the spark query itself) and to load them on the ListenBrainz side are reported separately.
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import uuid
+
+import click
+import orjson
+import pyarrow as pa
+from more_itertools import chunked
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db.similarity import SimilarRecordingsDataset
+from listenbrainz.db.tags import TagsDataset
+from listenbrainz.webserver import create_app
+
+# same as RECORDINGS_PER_MESSAGE in listenbrainz_spark.similarity.recording and listenbrainz_spark.tags.tags
+ROWS_PER_MESSAGE = 10000
+# the default spark.sql.execution.arrow.maxRecordsPerBatch, the size of the batches staged by spark
+STAGING_BATCH_SIZE = 10000
+
+SIMILARITY_SCHEMA = pa.schema([("mbid0", pa.string()), ("mbid1", pa.string()), ("score", pa.int32())])
+TAGS_SCHEMA = pa.schema([
+    ("recording_mbid", pa.string()),
+    ("tags", pa.list_(pa.struct([("tag", pa.string()), ("tag_count", pa.int64()), ("_percent", pa.float64())])))
+])
+
+
+def make_similarity_rows(count):
+    mbids = [str(uuid.uuid4()) for _ in range(max(2, count // 10))]
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add(tuple(random.sample(mbids, 2)))
+    return [{"mbid0": mbid0, "mbid1": mbid1, "score": random.randint(1, 1000)} for mbid0, mbid1 in pairs]
+
+
+def make_tags_rows(recordings, tags):
+    names = [f"tag {idx}" for idx in range(1000)]
+    return [{
+        "recording_mbid": str(uuid.uuid4()),
+        "tags": [
+            {"tag": tag, "tag_count": random.randint(1, 100), "_percent": random.random()}
+            for tag in random.sample(names, tags)
+        ]
+    } for _ in range(recordings)]
+
+
+def json_messages(rows, message):
+    """ Build the data messages like the spark request consumer does. """
+    for chunk in chunked(rows, ROWS_PER_MESSAGE):
+        yield json.dumps({**message, "data": chunk})
+
+
+def staged_messages(rows, message, schema, staging_dir, name):
+    """ Write the staged file like listenbrainz_spark.staging.stage_dataframe and build its message. """
+    file_name = f"{name}-{uuid.uuid4()}.arrow"
+    with pa.OSFile(os.path.join(staging_dir, file_name), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in chunked(rows, STAGING_BATCH_SIZE):
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+    yield json.dumps({**message, "staged_file": file_name})
+
+
+def run(name, dataset, bodies_factory, count):
+    produce, load = Timer(), Timer()
+    with produce.time():
+        bodies = list(bodies_factory())
+    with load.time():
+        dataset.handle_start({"algorithm": "benchmark"})
+        for body in bodies:
+            dataset.handle_insert(orjson.loads(body))
+        dataset.handle_end({"algorithm": "benchmark"})
+    report(name, count, produce.total + load.total,
+           produce_s=round(produce.total, 3), load_s=round(load.total, 3),
+           transferred_mb=round(sum(len(body) for body in bodies) / 1024 / 1024, 2))
+
+
+@click.command()
+@click.option("--rows", default=1_000_000, show_default=True, help="Number of similar recording pairs")
+@click.option("--recordings", default=200_000, show_default=True, help="Number of recordings in the tags dataset")
+@click.option("--tags", default=5, show_default=True, help="Number of tags of each recording")
+def main(rows, recordings, tags):
+    app = create_app()
+    staging_dir = tempfile.mkdtemp()
+    app.config["SPARK_RESULT_STAGING_DIR"] = staging_dir
+    try:
+        with app.app_context():
+            similarity = make_similarity_rows(rows)
+            message = {"type": "similarity_recording", "algorithm": "benchmark", "is_production_dataset": True}
+            run("similarity json", SimilarRecordingsDataset,
+                lambda: json_messages(similarity, message), rows)
+            run("similarity staged", SimilarRecordingsDataset,
+                lambda: staged_messages(similarity, message, SIMILARITY_SCHEMA, staging_dir, "similarity_recording"),
+                rows)
+
+            tags_rows = make_tags_rows(recordings, tags)
+            message = {"type": "tags_dataset", "source": "recording"}
+            run("tags json", TagsDataset, lambda: json_messages(tags_rows, message), recordings * tags)
+            run("tags staged", TagsDataset,
+                lambda: staged_messages(tags_rows, message, TAGS_SCHEMA, staging_dir, "tags_dataset_recording"),
+                recordings * tags)
+    finally:
+        shutil.rmtree(staging_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+""" Replay user entity stats messages into the local couchdb started with develop.sh through the spark reader's
+UserEntityStatsDataset, to measure the throughput of the stats ingestion.
+
+The messages are built from the top entity testdata documents used by the stats API tests, copied for --users
+users and split in messages of --users-per-message users like the spark request consumer sends them. Each
+--concurrency value is replayed twice in a new database: once into the empty database and once again over the
+existing documents, which conflict and need to be retried with their revision.
+"""
+import json
+import os
+from copy import deepcopy
+
+import click
+import requests
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import couchdb
+from listenbrainz.db.testing import TEST_DATA_PATH
+from listenbrainz.spark import spark_dataset
+from listenbrainz.webserver import create_app
+
+ENTITIES = ["artists", "releases", "recordings", "release_groups"]
+
+
+def load_templates():
+    templates = {}
+    for entity in ENTITIES:
+        with open(os.path.join(TEST_DATA_PATH, f"user_top_{entity}_db_data_for_api_test_too_many.json")) as f:
+            templates[entity] = json.load(f)[0]
+    return templates
+
+
+def build_messages(templates, entity, database, users, users_per_message):
+    messages = []
+    for start in range(0, users, users_per_message):
+        data = []
+        for user_id in range(start, min(users, start + users_per_message)):
+            doc = deepcopy(templates[entity])
+            doc["user_id"] = user_id
+            data.append(doc)
+        messages.append({
+            "type": "user_entity",
+            "entity": entity,
+            "database": database,
+            "stats_range": "all_time",
+            "from_ts": 0,
+            "to_ts": 1,
+            "data": data
+        })
+    return messages
+
+
+@click.command()
+@click.option("--users", default=20000, show_default=True, help="Number of users to replay stats for")
+@click.option("--users-per-message", default=2000, show_default=True, help="Number of users in each message")
+@click.option("--entity", default="artists", show_default=True, type=click.Choice(ENTITIES))
+@click.option("--concurrency", "concurrency_list", default="1,2,4,8", show_default=True,
+              help="Comma separated numbers of concurrent insert requests to benchmark")
+@click.option("--chunk-bytes", default=couchdb.INSERT_CHUNK_BYTES, show_default=True,
+              help="Maximum size of each insert request")
+def main(users, users_per_message, entity, concurrency_list, chunk_bytes):
+    app = create_app()
+    templates = load_templates()
+    with app.app_context():
+        app.config["COUCHDB_INSERT_CHUNK_BYTES"] = chunk_bytes
+        for concurrency in [int(value) for value in concurrency_list.split(",")]:
+            app.config["COUCHDB_INSERT_CONCURRENCY"] = concurrency
+            database = f"benchmark_ingestion_{entity}_20000101"
+            couchdb.create_database(database)
+            try:
+                for attempt in ["new", "conflicting"]:
+                    # build the messages beforehand, the dataset modifies them in place
+                    messages = build_messages(templates, entity, database, users, users_per_message)
+                    timer = Timer()
+                    for message in messages:
+                        with timer.time():
+                            spark_dataset.UserEntityStatsDataset.handle_insert(message)
+                    report(f"stats ingestion x{concurrency} ({attempt})", users, timer.total,
+                           p50_message_ms=round(timer.percentile(50) * 1000, 1),
+                           p99_message_ms=round(timer.percentile(99) * 1000, 1))
+            finally:
+                spark_dataset.UserEntityStatsDataset.handle_shutdown()
+                requests.delete(f"{couchdb.get_base_url()}/{database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+""" Benchmark the user top entity stats endpoint with and without the stats response cache.
+
+A stats document with the top entities testdata (repeated to --entities entries) is inserted in the local couchdb
+started with develop.sh for a benchmark user, and the endpoint is requested --requests times through the flask
+test client with the cache disabled, with the cache enabled and with the cache enabled and an If-None-Match header.
+The p50/p99 latency of each and the time saved per request by the cache are reported.
+"""
+import json
+import os
+
+import click
+import requests
+from brainzutils.ratelimit import set_rate_limits
+
+import listenbrainz.db.stats as db_stats
+import listenbrainz.db.user as db_user
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import couchdb
+from listenbrainz.db.testing import TEST_DATA_PATH
+from listenbrainz.webserver import create_app, db_conn
+
+DATABASE = "artists_all_time_20000101"
+
+
+def run(client, name, url, params, requests_count, headers=None):
+    timer = Timer()
+    for _ in range(requests_count):
+        with timer.time():
+            response = client.get(url, query_string=params, headers=headers or {})
+        assert response.status_code in (200, 304), response.status_code
+    report(f"stats response {name}", requests_count, timer.total,
+           p50_ms=round(timer.percentile(50) * 1000, 3),
+           p99_ms=round(timer.percentile(99) * 1000, 3))
+    return timer, response
+
+
+@click.command()
+@click.option("--requests", "requests_count", default=500, show_default=True, help="Number of requests of each kind")
+@click.option("--entities", default=1000, show_default=True, help="Number of entities in the stats document")
+@click.option("--count", default=25, show_default=True, help="Number of entities requested")
+def main(requests_count, entities, count):
+    app = create_app()
+    app.config["TESTING"] = True
+    with open(os.path.join(TEST_DATA_PATH, "user_top_artists_db_data_for_api_test_too_many.json")) as f:
+        template = json.load(f)[0]
+
+    with app.app_context():
+        set_rate_limits(1_000_000, 1_000_000, 10)
+        user = db_user.get_or_create(db_conn, 2_000_000_000, "stats-response-cache-benchmark")
+        data = (template["data"] * (entities // len(template["data"]) + 1))[:entities]
+        couchdb.create_database(DATABASE)
+        try:
+            db_stats.insert(DATABASE, 0, 5, [{"user_id": user["id"], "count": entities, "data": data}])
+            client = app.test_client()
+            url = f"/1/stats/user/{user['musicbrainz_id']}/artists"
+            params = {"count": count}
+
+            app.config["STATS_RESPONSE_CACHE_EXPIRY"] = 0
+            uncached, _ = run(client, "uncached", url, params, requests_count)
+
+            app.config["STATS_RESPONSE_CACHE_EXPIRY"] = 60
+            cached, response = run(client, "cached", url, params, requests_count)
+            run(client, "cached (If-None-Match)", url, params, requests_count,
+                headers={"If-None-Match": response.headers["ETag"]})
+
+            saved_ms = (uncached.percentile(50) - cached.percentile(50)) * 1000
+            print(f"time saved per request (p50): {saved_ms:.3f}ms")
+        finally:
+            requests.delete(f"{couchdb.get_base_url()}/{DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
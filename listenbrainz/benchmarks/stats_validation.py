@@ -0,0 +1,73 @@
+""" Benchmark the parsing and validation of large user stats documents, as done by db_stats.get for a request to
+the top entity stats endpoints.
+
+A couchdb document is built from the top entity testdata used by the stats API tests, repeated to --entries
+entries, and serialized to json. The document is then parsed and validated --repeat times:
+
+* full: parsed with the json module like requests' Response.json(), validated entirely with StatApi and sliced
+* window: parsed with orjson from the bytes and only the requested --count entries are validated
+
+No service is needed.
+"""
+import json
+import os
+
+import click
+import orjson
+
+from data.model.user_entity import EntityRecord
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db.stats import _to_stat_api
+from listenbrainz.db.testing import TEST_DATA_PATH
+
+ENTITIES = ["artists", "releases", "recordings", "release_groups"]
+
+
+def make_document(entity, entries):
+    with open(os.path.join(TEST_DATA_PATH, f"user_top_{entity}_db_data_for_api_test_too_many.json")) as f:
+        template = json.load(f)[0]
+    data = (template["data"] * (entries // len(template["data"]) + 1))[:entries]
+    return orjson.dumps({
+        "_id": "1",
+        "_rev": "1-abc",
+        "key": 1,
+        "user_id": 1,
+        "count": entries,
+        "from_ts": 0,
+        "to_ts": 1,
+        "last_updated": 1,
+        "data": data
+    })
+
+
+@click.command()
+@click.option("--entries", default=1000, show_default=True, help="Number of entries in the stats document")
+@click.option("--count", default=25, show_default=True, help="Number of entries requested")
+@click.option("--offset", default=0, show_default=True, help="Number of entries skipped")
+@click.option("--repeat", default=200, show_default=True, help="Number of documents processed by each method")
+def main(entries, count, offset, repeat):
+    for entity in ENTITIES:
+        content = make_document(entity, entries)
+
+        full = Timer()
+        for _ in range(repeat):
+            with full.time():
+                stats = _to_stat_api(json.loads(content), 1, "all_time", EntityRecord, 0, None)
+                result = [x.dict() for x in stats.data.__root__[offset:offset + count]]
+
+        window = Timer()
+        for _ in range(repeat):
+            with window.time():
+                stats = _to_stat_api(orjson.loads(content), 1, "all_time", EntityRecord, offset, count)
+                windowed = [x.dict() for x in stats.data.__root__]
+        assert result == windowed
+
+        for name, timer in [("full", full), ("window", window)]:
+            report(f"stats validation {entity} ({name})", repeat, timer.total,
+                   p50_ms=round(timer.percentile(50) * 1000, 3),
+                   p99_ms=round(timer.percentile(99) * 1000, 3))
+        print(f"saved per request (p50): {(full.percentile(50) - window.percentile(50)) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+""" Load test harness for the timescale writer.
+
+Replays submit-listens payloads through an in-process RabbitMQ stand-in (kombu's memory transport) into the
+timescale writer, which writes to the local timescale database and redis as usual. This allows comparing the
+latency and throughput of the micro-batching settings without a broker.
+
+Payloads are read from a JSON lines file, each line being a submit-listens request body as accepted by the
+/1/submit-listens endpoint, i.e. {"listen_type": "import", "payload": [...]}. If no file is given, payloads are
+generated. Each payload is published the way the API does, in messages of at most MAX_LISTENS_PER_RMQ_MESSAGE
+listens.
+"""
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+import click
+import orjson
+from kombu import Connection, Producer
+from more_itertools import chunked
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.timescale_writer.timescale_writer import TimescaleWriterSubscriber, LISTEN_INSERT_ERROR_SENTINEL
+from listenbrainz.webserver import create_app
+from listenbrainz.webserver.views.api_tools import MAX_LISTENS_PER_RMQ_MESSAGE
+
+
+def load_payloads(path):
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield orjson.loads(line)["payload"]
+
+
+def generate_payloads(count, listens_per_payload):
+    now = int(datetime.now(timezone.utc).timestamp())
+    for _ in range(count):
+        payload = []
+        for _ in range(listens_per_payload):
+            idx = random.randrange(5000)
+            payload.append({
+                "listened_at": now - random.randrange(30 * 24 * 60 * 60),
+                "track_metadata": {
+                    "artist_name": f"load test artist {idx % 500}",
+                    "track_name": f"load test track {idx}",
+                    "release_name": f"load test release {idx % 100}",
+                    "additional_info": {"submission_client": "load test", "duration_ms": 200000 + idx}
+                }
+            })
+        yield payload
+
+
+class InstrumentedWriter(TimescaleWriterSubscriber):
+    """ Timescale writer which records the time each message spent waiting in the queue and in processing. """
+
+    def __init__(self):
+        super().__init__()
+        self.latency = Timer()
+        self.batch_sizes = []
+        self.errors = 0
+
+    def process_messages(self, messages, listens):
+        ret = super().process_messages(messages, listens)
+        if ret == LISTEN_INSERT_ERROR_SENTINEL:
+            self.errors += 1
+            return ret
+        now = time.perf_counter()
+        self.batch_sizes.append(len(listens))
+        for message in messages:
+            self.latency.timings.append(now - message.headers["published_at"])
+        return ret
+
+
+@click.command()
+@click.option("--payloads-file", type=click.Path(exists=True), default=None,
+              help="JSON lines file of submit-listens request bodies")
+@click.option("--payloads", default=1000, show_default=True, help="Number of payloads to generate if no file is given")
+@click.option("--listens-per-payload", default=10, show_default=True, help="Listens per generated payload")
+@click.option("--user-id", default=1, show_default=True, help="User id to submit the listens for")
+@click.option("--user-name", default="load-test", show_default=True, help="User name to submit the listens for")
+@click.option("--batch-max-listens", default=0, show_default=True,
+              help="TIMESCALE_WRITER_BATCH_MAX_LISTENS, 0 disables micro-batching")
+@click.option("--batch-max-delay-ms", default=200, show_default=True, help="TIMESCALE_WRITER_BATCH_MAX_DELAY_MS")
+def main(payloads_file, payloads, listens_per_payload, user_id, user_name, batch_max_listens, batch_max_delay_ms):
+    app = create_app()
+    with app.app_context():
+        app.config["TIMESCALE_WRITER_BATCH_MAX_LISTENS"] = batch_max_listens
+        app.config["TIMESCALE_WRITER_BATCH_MAX_DELAY_MS"] = batch_max_delay_ms
+        writer = InstrumentedWriter()
+        writer.connection = Connection("memory://")
+
+        if payloads_file:
+            source = load_payloads(payloads_file)
+        else:
+            source = generate_payloads(payloads, listens_per_payload)
+
+        total_listens = 0
+        with writer.connection.channel() as channel:
+            writer.incoming_queue(channel).declare()
+            writer.unique_queue(channel).declare()
+            producer = Producer(channel, exchange=writer.incoming_exchange)
+            for payload in source:
+                for listen in payload:
+                    listen["user_id"] = user_id
+                    listen["user_name"] = user_name
+                    # make listens unique across runs so that each run inserts its listens
+                    listen["track_metadata"].setdefault("additional_info", {})["load_test_run"] = str(uuid.uuid4())
+                for chunk in chunked(payload, MAX_LISTENS_PER_RMQ_MESSAGE):
+                    total_listens += len(chunk)
+                    producer.publish(orjson.dumps(chunk), headers={"published_at": time.perf_counter()})
+
+        start = time.perf_counter()
+        safety_interval = min(1, batch_max_delay_ms / 1000) if batch_max_listens else 1
+        try:
+            for _ in writer.consume(timeout=safety_interval, safety_interval=safety_interval):
+                pass
+        except socket.timeout:
+            pass
+        writer.flush()
+        # the consume loop only stops after having been idle for a full timeout
+        elapsed = time.perf_counter() - start - safety_interval
+
+        report("timescale writer", total_listens, elapsed,
+               batches=len(writer.batch_sizes),
+               avg_batch=round(total_listens / max(len(writer.batch_sizes), 1), 1),
+               p50_latency_ms=round(writer.latency.percentile(50) * 1000, 1),
+               p99_latency_ms=round(writer.latency.percentile(99) * 1000, 1),
+               errors=writer.errors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+""" Count the database queries and measure the latency of the artist listeners stats, as shown on the artist entity
+pages, with and without the user identity cache.
+
+--artists artists listeners documents with --listeners listeners each (drawn from the same pool of users, like
+popular artists share their listeners) are inserted in the local couchdb started with develop.sh. Each artist is
+then requested --rounds times through the artist listeners endpoint, which resolves the listeners' user ids with
+db_stats.get_entity_listener like the artist page, with the cache disabled and enabled. The postgres queries per
+request are counted with a sqlalchemy event listener.
+"""
+import random
+import uuid
+
+import click
+import requests
+from brainzutils.ratelimit import set_rate_limits
+from sqlalchemy import event
+
+import listenbrainz.db.user as db_user
+from listenbrainz import db
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.db import couchdb, user_identity_cache
+from listenbrainz.spark.handlers import handle_entity_listener
+from listenbrainz.webserver import create_app, db_conn
+
+DATABASE = "artists_listeners_all_time_20000101"
+FIRST_USER_ID = 2_000_000_000
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def run(client, name, urls, rounds, counter):
+    timer = Timer()
+    counter.count = 0
+    for _ in range(rounds):
+        for url in urls:
+            with timer.time():
+                response = client.get(url)
+            assert response.status_code == 200, response.status_code
+    requests_count = rounds * len(urls)
+    report(f"artist listeners {name}", requests_count, timer.total,
+           queries_per_request=round(counter.count / requests_count, 2),
+           p50_ms=round(timer.percentile(50) * 1000, 3),
+           p99_ms=round(timer.percentile(99) * 1000, 3))
+    return counter.count
+
+
+@click.command()
+@click.option("--artists", default=50, show_default=True, help="Number of artists")
+@click.option("--listeners", default=100, show_default=True, help="Number of listeners of each artist")
+@click.option("--users", default=1000, show_default=True, help="Number of users the listeners are drawn from")
+@click.option("--rounds", default=5, show_default=True, help="Number of times each artist is requested")
+def main(artists, listeners, users, rounds):
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        set_rate_limits(1_000_000, 1_000_000, 10)
+        user_ids = [
+            db_user.get_or_create(db_conn, FIRST_USER_ID + idx, f"user-identity-benchmark-{idx}")["id"]
+            for idx in range(users)
+        ]
+        mbids = [str(uuid.uuid4()) for _ in range(artists)]
+        couchdb.create_database(DATABASE)
+        try:
+            handle_entity_listener({
+                "type": "entity_listener",
+                "entity": "artists",
+                "stats_range": "all_time",
+                "database": DATABASE,
+                "from_ts": 0,
+                "to_ts": 1,
+                "data": [{
+                    "artist_mbid": mbid,
+                    "artist_name": f"artist {idx}",
+                    "total_listen_count": listeners,
+                    "listeners": [
+                        {"user_id": user_id, "listen_count": 1}
+                        for user_id in random.sample(user_ids, min(listeners, users))
+                    ]
+                } for idx, mbid in enumerate(mbids)]
+            })
+
+            client = app.test_client()
+            urls = [f"/1/stats/artist/{mbid}/listeners" for mbid in mbids]
+            counter = QueryCounter()
+            event.listen(db.engine, "before_cursor_execute", counter)
+
+            app.config["USER_IDENTITY_CACHE_EXPIRY"] = 0
+            uncached = run(client, "uncached", urls, rounds, counter)
+
+            app.config["USER_IDENTITY_CACHE_EXPIRY"] = 3600
+            user_identity_cache._get_local().clear()
+            cached = run(client, "cached", urls, rounds, counter)
+            print(f"database queries saved: {uncached - cached} of {uncached}")
+        finally:
+            requests.delete(f"{couchdb.get_base_url()}/{DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
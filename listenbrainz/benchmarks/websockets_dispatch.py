@@ -0,0 +1,128 @@
+""" Synthetic benchmark of the websockets ListensDispatcher with thousands of rooms.
+
+Messages of the unique queue are generated for --users users, of which --subscribed-ratio have a client connected
+to this process. The emits are counted by a stand-in for the SocketIO server instead of being sent, so this
+measures the cost of the dispatcher itself: decoding, filtering, serialization and the number of emit calls. The
+previous implementation, which built a Listen and json.dumps'd every listen, is compared with the current one with
+and without batched events. No app, broker or websocket clients are needed.
+"""
+import json
+import random
+import uuid
+
+import click
+import orjson
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.listen import Listen
+from listenbrainz.webserver.views.api_tools import MAX_LISTENS_PER_RMQ_MESSAGE
+from listenbrainz.websockets.listens_dispatcher import ListensDispatcher
+
+
+class FakeApp:
+
+    def __init__(self, batch_events):
+        self.config = {
+            "UNIQUE_EXCHANGE": "unique",
+            "PLAYING_NOW_EXCHANGE": "playing_now",
+            "WEBSOCKETS_QUEUE": "websockets",
+            "PLAYING_NOW_QUEUE": "playing_now",
+            "WEBSOCKETS_BATCH_EVENTS": batch_events,
+        }
+
+
+class FakeManager:
+
+    def __init__(self, rooms):
+        self.rooms = {"/": {room: {str(uuid.uuid4()): None} for room in rooms}}
+
+
+class FakeServer:
+
+    def __init__(self, rooms):
+        self.manager = FakeManager(rooms)
+
+
+class FakeSocketIO:
+    """ Stand-in for flask_socketio.SocketIO which only counts the emits. """
+
+    def __init__(self, rooms):
+        self.server = FakeServer(rooms)
+        self.emits = 0
+
+    def emit(self, event, data, to=None):
+        self.emits += 1
+
+
+class FakeMessage:
+
+    def __init__(self, body):
+        self.body = body
+
+    def ack(self):
+        pass
+
+
+def legacy_send_listens(socketio, message):
+    for data in json.loads(message.body):
+        listen = Listen.from_json(data)
+        socketio.emit("listen", json.dumps(listen.to_api()), to=listen.user_name)
+
+
+def generate_messages(count, users):
+    messages = []
+    for _ in range(count):
+        listens = []
+        for idx in range(MAX_LISTENS_PER_RMQ_MESSAGE):
+            listens.append({
+                "user_id": 1,
+                "user_name": f"user-{random.randrange(users)}",
+                "timestamp": 1600000000 + idx,
+                "recording_msid": str(uuid.uuid4()),
+                "track_metadata": {
+                    "artist_name": f"artist {idx}",
+                    "track_name": f"track {idx}",
+                    "release_name": f"release {idx}",
+                    "additional_info": {
+                        "artist_mbids": [str(uuid.uuid4())],
+                        "recording_mbid": str(uuid.uuid4()),
+                        "duration_ms": 200000 + idx,
+                        "submission_client": "benchmark"
+                    }
+                }
+            })
+        messages.append(FakeMessage(orjson.dumps(listens)))
+    return messages
+
+
+@click.command()
+@click.option("--messages", default=200, show_default=True, help="Number of unique queue messages")
+@click.option("--users", default=5000, show_default=True, help="Number of distinct users (rooms)")
+@click.option("--subscribed-ratio", default=0.1, show_default=True,
+              help="Fraction of the users with a connected client")
+def main(messages, users, subscribed_ratio):
+    rooms = [f"user-{idx}" for idx in random.sample(range(users), int(users * subscribed_ratio))]
+    payloads = generate_messages(messages, users)
+    listens = messages * MAX_LISTENS_PER_RMQ_MESSAGE
+
+    socketio = FakeSocketIO(rooms)
+    timer = Timer()
+    for message in payloads:
+        with timer.time():
+            legacy_send_listens(socketio, message)
+    report("legacy dispatcher", listens, timer.total, emits=socketio.emits,
+           p50_ms=round(timer.percentile(50) * 1000, 2), p99_ms=round(timer.percentile(99) * 1000, 2))
+
+    for name, batch_events in [("dispatcher", False), ("dispatcher (batched events)", True)]:
+        socketio = FakeSocketIO(rooms)
+        dispatcher = ListensDispatcher(FakeApp(batch_events), socketio)
+        timer = Timer()
+        for message in payloads:
+            with timer.time():
+                dispatcher.send_listens("listen", message)
+        report(name, listens, timer.total, emits=socketio.emits,
+               p50_ms=round(timer.percentile(50) * 1000, 2), p99_ms=round(timer.percentile(99) * 1000, 2))
+
+
+if __name__ == "__main__":
+    main()
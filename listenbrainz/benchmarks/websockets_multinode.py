@@ -0,0 +1,144 @@
+""" Local multi-process test harness of the websockets servers running with WEBSOCKETS_EXCLUSIVE_QUEUES.
+
+Starts --nodes websockets servers, each in its own process and on its own port starting at --base-port, and
+connects a socket.io client for each of --users users to one of the servers, round robin. Unique listens are then
+published to the unique exchange like the timescale writer does, and the harness checks that every client receives
+exactly the listens of its user, once, and no others. The end to end latency from publishing to receiving is
+reported.
+
+Needs the local rabbitmq started with develop.sh. Exits with a non-zero status if any listen is missing,
+duplicated or delivered to the wrong user.
+"""
+import multiprocessing
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import click
+import orjson
+import socketio
+from kombu import Connection, Exchange, Producer
+
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz.webserver import create_app
+
+
+def run_node(port):
+    # imported here because the websockets module monkey patches the socket module with eventlet
+    from listenbrainz.websockets.websockets import run_websockets
+    app = create_app()
+    app.config["WEBSOCKETS_EXCLUSIVE_QUEUES"] = True
+    with app.app_context():
+        run_websockets(app, host="127.0.0.1", port=port, debug=False)
+
+
+def connect_client(port, user_name, received, timeout):
+    client = socketio.Client()
+
+    @client.on("listen")
+    def on_listen(message):
+        listen = orjson.loads(message)
+        received[user_name].append((listen["recording_msid"], time.time() - listen["track_metadata"]["sent_at"]))
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            client.connect(f"http://127.0.0.1:{port}", wait_timeout=5)
+            break
+        except socketio.exceptions.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+    client.emit("json", {"user": user_name})
+    return client
+
+
+def make_listen(user_name):
+    return {
+        "user_id": 1,
+        "user_name": user_name,
+        "timestamp": int(time.time()),
+        "recording_msid": str(uuid.uuid4()),
+        "track_metadata": {
+            "artist_name": "multinode harness",
+            "track_name": "multinode harness",
+            "sent_at": time.time(),
+            "additional_info": {}
+        }
+    }
+
+
+@click.command()
+@click.option("--nodes", default=3, show_default=True, help="Number of websockets server processes")
+@click.option("--users", default=30, show_default=True, help="Number of users with a connected client")
+@click.option("--listens-per-user", default=10, show_default=True, help="Number of listens published per user")
+@click.option("--base-port", default=8200, show_default=True, help="Port of the first websockets server")
+@click.option("--timeout", default=30, show_default=True, help="Seconds to wait for the servers and the listens")
+def main(nodes, users, listens_per_user, base_port, timeout):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_node, args=(base_port + idx,), daemon=True) for idx in range(nodes)]
+    for process in processes:
+        process.start()
+
+    received = defaultdict(list)
+    clients = []
+    missing = duplicated = unexpected = 0
+    try:
+        user_names = [f"multinode-harness-{idx}" for idx in range(users)]
+        for idx, user_name in enumerate(user_names):
+            clients.append(connect_client(base_port + idx % nodes, user_name, received, timeout))
+        # let the clients join their rooms
+        time.sleep(1)
+
+        app = create_app()
+        expected = defaultdict(set)
+        listens = [make_listen(user_name) for user_name in user_names for _ in range(listens_per_user)]
+        random.shuffle(listens)
+        for listen in listens:
+            expected[listen["user_name"]].add(listen["recording_msid"])
+
+        with Connection(
+            hostname=app.config["RABBITMQ_HOST"],
+            userid=app.config["RABBITMQ_USERNAME"],
+            port=app.config["RABBITMQ_PORT"],
+            password=app.config["RABBITMQ_PASSWORD"],
+            virtual_host=app.config["RABBITMQ_VHOST"],
+        ) as connection:
+            exchange = Exchange(app.config["UNIQUE_EXCHANGE"], "fanout", durable=False)
+            producer = Producer(connection.channel(), exchange=exchange)
+            start = time.perf_counter()
+            for idx in range(0, len(listens), 100):
+                producer.publish(orjson.dumps(listens[idx:idx + 100]), declare=[exchange])
+
+        deadline = time.monotonic() + timeout
+        while sum(len(items) for items in received.values()) < len(listens) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+        latency = Timer()
+        for user_name in user_names:
+            msids = [msid for msid, _ in received[user_name]]
+            latency.timings.extend(delay for _, delay in received[user_name])
+            missing += len(expected[user_name] - set(msids))
+            duplicated += len(msids) - len(set(msids))
+            unexpected += len(set(msids) - expected[user_name])
+
+        report(f"websockets {nodes} nodes", len(listens), elapsed, missing=missing, duplicated=duplicated,
+               unexpected=unexpected,
+               p50_latency_ms=round(latency.percentile(50) * 1000, 1),
+               p99_latency_ms=round(latency.percentile(99) * 1000, 1))
+    finally:
+        for client in clients:
+            client.disconnect()
+        for process in processes:
+            process.terminate()
+            process.join()
+
+    if missing or duplicated or unexpected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+""" Two level (in-process LRU and redis) cache of the users authenticated by API tokens, used by
+:func:`listenbrainz.webserver.views.api_tools.validate_auth_header` to avoid a database query (and for MetaBrainz
+OAuth tokens, an introspection request) on each authenticated API call.
+
+Entries are keyed on a hash of the token and hold the user (without the email, only whether the user has one, and
+without the API token), the scopes of OAuth tokens and their expiry time. OAuth tokens are cached no longer than they are valid. The keys of the
+entries of each user are tracked in a redis set so that all of them can be removed when the user's token is reset,
+the user is paused, unpaused, renamed or deleted, see :func:`invalidate`. The invalidation removes the redis entries
+and the entries in the local cache of the current process, the local caches of other processes expire after
+AUTH_TOKEN_CACHE_LOCAL_TTL seconds.
+
+An invalidation also records a new generation for the user. Callers take the current generation with
+:func:`get_generation` before looking the user up and pass it to :func:`put`, which drops the entry if the user was
+invalidated in the meantime, so that a lookup racing with a token reset can't cache the old token again.
+"""
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from brainzutils import cache
+from flask import current_app
+
+from listenbrainz.lru import LRUCache
+
+AUTH_TOKEN_CACHE_KEY_PREFIX = "auth.token."
+AUTH_TOKEN_USER_KEY_PREFIX = "auth.user."
+AUTH_TOKEN_GENERATION_KEY = "auth.generation"
+AUTH_TOKEN_USER_GENERATION_KEY_PREFIX = "auth.generation."
+# user columns which are never written to the cache, the API token of a user mustn't be stored under the key of
+# another token (like a MetaBrainz OAuth access token)
+UNCACHED_USER_COLUMNS = ("email", "auth_token")
+
+logger = logging.getLogger(__name__)
+
+_local: Optional[LRUCache] = None
+
+
+def _get_local() -> LRUCache:
+    global _local
+    if _local is None:
+        _local = LRUCache(current_app.config.get("AUTH_TOKEN_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+    return _local
+
+
+def enabled() -> bool:
+    """ Whether the cache is enabled, it is disabled if AUTH_TOKEN_CACHE_EXPIRY is 0. """
+    return bool(current_app.config.get("AUTH_TOKEN_CACHE_EXPIRY", 0))
+
+
+def _token_key(token: str) -> str:
+    return AUTH_TOKEN_CACHE_KEY_PREFIX + hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _user_key(user_id: int) -> str:
+    return AUTH_TOKEN_USER_KEY_PREFIX + str(user_id)
+
+
+def _user_generation_key(user_id: int) -> str:
+    return AUTH_TOKEN_USER_GENERATION_KEY_PREFIX + str(user_id)
+
+
+def get_generation() -> Optional[int]:
+    """ Return the current invalidation generation, to be taken before looking up the user of a token and passed
+     to :func:`put`. None if it couldn't be read, the entry is then not cached. """
+    try:
+        generation = cache._r.get(cache._prep_key(AUTH_TOKEN_GENERATION_KEY))
+    except Exception:
+        logger.error("Could not read auth token cache generation:", exc_info=True)
+        return None
+    return int(generation) if generation is not None else 0
+
+
+def get(token: str) -> Optional[dict]:
+    """ Return the cached entry for the token, a dict with the keys user, scopes and expires_at,
+     or None if the token isn't cached. """
+    if not enabled():
+        return None
+
+    key = _token_key(token)
+    local = _get_local()
+    entry = local.get(key)
+    if entry is None:
+        try:
+            entry = cache.get(key)
+        except Exception:
+            logger.error("Could not read cached auth token:", exc_info=True)
+            return None
+        if entry is None:
+            return None
+        local.set(key, entry, ttl=current_app.config.get("AUTH_TOKEN_CACHE_LOCAL_TTL", 10))
+
+    if entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+        local.delete(key)
+        return None
+    return entry
+
+
+def put(token: str, user: dict, generation: Optional[int],
+        scopes: Optional[list[str]] = None, expires_at: Optional[int] = None):
+    """ Cache the user authenticated by the token.
+
+        Args:
+            token: the API token or OAuth access token
+            user: the user, as returned by db_user.get_by_token with fetch_email=True, the email itself
+                isn't cached, only whether the user has one in has_email, and neither is the API token
+            generation: the generation returned by get_generation before the user was looked up
+            scopes: the scopes of an OAuth access token
+            expires_at: the expiry time of an OAuth access token in seconds since the epoch
+    """
+    if not enabled() or generation is None:
+        return
+
+    expiry = current_app.config["AUTH_TOKEN_CACHE_EXPIRY"]
+    if expires_at is not None:
+        expiry = min(expiry, int(expires_at - time.time()))
+        if expiry <= 0:
+            return
+
+    key = _token_key(token)
+    cached_user = {k: v for k, v in user.items() if k not in UNCACHED_USER_COLUMNS}
+    cached_user["has_email"] = bool(user.get("email"))
+    entry = {"user": cached_user, "scopes": scopes, "expires_at": expires_at}
+    try:
+        cache.set(key, entry, expirein=expiry)
+        user_key = cache._prep_key(_user_key(user["id"]))
+        pipe = cache._r.pipeline()
+        pipe.sadd(user_key, key)
+        pipe.expire(user_key, current_app.config["AUTH_TOKEN_CACHE_EXPIRY"])
+        pipe.get(cache._prep_key(_user_generation_key(user["id"])))
+        user_generation = pipe.execute()[-1]
+        # invalidate records the new generation before removing the entries of the user: either it removes the
+        # entry written above or the new generation is visible here
+        if user_generation is not None and int(user_generation) > generation:
+            cache.delete(key)
+            return
+    except Exception:
+        logger.error("Could not cache auth token:", exc_info=True)
+        return
+    _get_local().set(key, entry, ttl=min(expiry, current_app.config.get("AUTH_TOKEN_CACHE_LOCAL_TTL", 10)))
+
+
+def invalidate(user_id: int):
+    """ Remove the cached entries of all the tokens of the given user. """
+    user_key = _user_key(user_id)
+    try:
+        generation = cache._r.incr(cache._prep_key(AUTH_TOKEN_GENERATION_KEY))
+        cache._r.set(cache._prep_key(_user_generation_key(user_id)), generation,
+                     ex=current_app.config.get("AUTH_TOKEN_CACHE_EXPIRY") or 60)
+        keys = [key.decode("utf-8") for key in cache._r.smembers(cache._prep_key(user_key))]
+        cache.delete_many(keys + [user_key])
+    except Exception:
+        logger.error("Could not invalidate cached auth tokens of user %s:", user_id, exc_info=True)
+        return
+    if _local is not None:
+        _local.delete_many(keys)
@@ -1,6 +1,10 @@
 import json
+import os
 import re
-from typing import BinaryIO
+import shutil
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Optional
 
 import requests
 import orjson
@@ -14,13 +18,96 @@ DATABASE_NAME_PATTERN = re.compile(r"([a-zA-Z]+)_(\w+)_(\d{8})")
 
 DATABASE_LOCK_FILE = "LOCK"
 
+# the maximum number of keep-alive connections to couchdb kept open by each process
+CONNECTION_POOL_SIZE = 10
+
+# the default number of _id ranges fetched concurrently by dump_database_parallel
+DUMP_RANGES = 8
+# the default number of documents fetched per request by dump_database_parallel
+DUMP_PAGE_SIZE = 1000
+DUMP_STATE_FILE = "STATE"
+
+# the default maximum size of the body of each _bulk_docs request made by insert_data
+INSERT_CHUNK_BYTES = 8 * 1024 * 1024
+# the number of times insert_data retries the documents which conflicted with an existing revision
+INSERT_CONFLICT_RETRIES = 3
+
 _user = None
 _admin_key = None
 _host = None
 _port = None
+_client = None
+
+
+class CouchDBClient:
+    """ Holds a keep-alive connection pool to couchdb and a cache of the list of databases.
+
+    The list of databases (_all_dbs) is cached for databases_cache_ttl seconds and the sorted databases matching
+    a prefix are derived from it on demand, so that a stats lookup doesn't need to list the databases first. The
+    cache is cleared when this process creates or deletes a database, databases created or deleted by other
+    processes are noticed when the cache expires or, for deleted databases, as soon as a lookup finds them missing.
+    A databases_cache_ttl of 0 disables the cache.
+
+    The session is recreated after a fork, so that worker processes don't share connections of their parent.
+    """
+
+    def __init__(self, base_url: str, databases_cache_ttl: int = 0, pool_size: int = CONNECTION_POOL_SIZE):
+        self.base_url = base_url
+        self.databases_cache_ttl = databases_cache_ttl
+        self.pool_size = pool_size
+        self._session = None
+        self._session_pid = None
+        # (expiry time, all databases, map of prefix to sorted matching databases), replaced as a whole
+        self._databases = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None or self._session_pid != os.getpid():
+            retry_strategy = Retry(total=2, read=1, status=0, backoff_factor=0.1)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry_strategy)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _fetch_all_databases(self) -> list[str]:
+        response = self.session.get(f"{self.base_url}/_all_dbs")
+        response.raise_for_status()
+        return response.json()
+
+    def list_databases(self, prefix: str) -> list[str]:
+        """ List the databases whose name starts with the given prefix, sorted in descending order of name. """
+        if not self.databases_cache_ttl:
+            all_databases = self._fetch_all_databases()
+            return sorted((database for database in all_databases if database.startswith(prefix)), reverse=True)
+
+        cached = self._databases
+        if cached is None or time.monotonic() >= cached[0]:
+            all_databases = self._fetch_all_databases()
+            cached = (time.monotonic() + self.databases_cache_ttl, all_databases, {})
+            self._databases = cached
 
+        _, all_databases, prefix_databases = cached
+        databases = prefix_databases.get(prefix)
+        if databases is None:
+            databases = sorted((database for database in all_databases if database.startswith(prefix)), reverse=True)
+            prefix_databases[prefix] = databases
+        # callers are free to modify the returned list
+        return list(databases)
 
-def init(user, password, host, port):
+    def invalidate_databases(self):
+        """ Clear the cached list of databases. """
+        self._databases = None
+
+
+def init(user, password, host, port, databases_cache_ttl=0):
     """
     Initialize config to connect to couchdb instance.
     
@@ -29,18 +116,35 @@ def init(user, password, host, port):
         password: couchdb admin password
         host: couchdb service host
         port: couchdb service port
+        databases_cache_ttl: the number of seconds to cache the list of databases for, 0 to disable the cache
     """
-    global _user, _admin_key, _host, _port
+    global _user, _admin_key, _host, _port, _client
     _user = user
     _admin_key = password
     _host = host
     _port = port
+    if _client is not None:
+        _client.close()
+    _client = CouchDBClient(get_base_url(), databases_cache_ttl)
 
 
 def get_base_url():
     return f"http://{_user}:{_admin_key}@{_host}:{_port}"
 
 
+def get_client() -> CouchDBClient:
+    """ Return the client created by :func:`init`. """
+    return _client
+
+
+def _is_missing_database(response) -> bool:
+    """ Whether a 404 response was returned because the database doesn't exist rather than the document. """
+    try:
+        return response.json().get("reason") == "Database does not exist."
+    except ValueError:
+        return False
+
+
 def create_database(database: str):
     """ Create a couchdb database with the given name.
 
@@ -51,7 +155,8 @@ def create_database(database: str):
          database: the database's name
     """
     databases_url = f"{get_base_url()}/{database}"
-    response = requests.put(databases_url)
+    response = _client.session.put(databases_url)
+    _client.invalidate_databases()
     response.raise_for_status()
 
 
@@ -64,15 +169,10 @@ def list_databases(prefix: str) -> list[str]:
     YYYYMMDD is the date. After statistics for the day have been inserted, we want to get rid
     of the older database for that stat. This method looks up all the databases whose name starts
     with the given prefix.
-    """
-    databases_url = f"{get_base_url()}/_all_dbs"
-    response = requests.get(databases_url)
-    response.raise_for_status()
-    all_databases = response.json()
 
-    databases = [database for database in all_databases if database.startswith(prefix)]
-    databases.sort(reverse=True)
-    return databases
+    The list of databases may be cached, see :class:`CouchDBClient`.
+    """
+    return _client.list_databases(prefix)
 
 
 def delete_database(prefix: str):
@@ -98,7 +198,8 @@ def delete_database(prefix: str):
         if check_database_lock(database):
             retained.append(database)
         else:
-            response = requests.delete(f"{get_base_url()}/{database}")
+            response = _client.session.delete(f"{get_base_url()}/{database}")
+            _client.invalidate_databases()
             response.raise_for_status()
             deleted.append(database)
 
@@ -116,20 +217,87 @@ def fetch_data(prefix: str, user_id: int):
          prefix: the string to match database names with
          user_id: the user to retrieve data for
     """
-    databases = list_databases(prefix)
     base_url = get_base_url()
 
-    for database in databases:
-        document_url = f"{base_url}/{database}/{user_id}"
-        response = requests.get(document_url)
-        if response.status_code == 404:
-            continue
-        response.raise_for_status()
-        return response.json()
+    for _ in range(2):
+        for database in list_databases(prefix):
+            document_url = f"{base_url}/{database}/{user_id}"
+            response = _client.session.get(document_url)
+            if response.status_code == 404:
+                if _is_missing_database(response):
+                    # deleted by another process since the list of databases was cached
+                    break
+                continue
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        else:
+            return None
+        _client.invalidate_databases()
 
     return None
 
 
+def bulk_get(database: str, doc_ids: Iterable[str]) -> dict[str, dict]:
+    """ Retrieve the given documents from the database in a single request.
+
+    Args:
+        database: the database name to retrieve data from
+        doc_ids: the ids of the documents to retrieve
+
+    Returns:
+        a dict of the found documents keyed by their id, documents that don't exist are left out
+    """
+    docs = orjson.dumps({"docs": [{"id": str(doc_id)} for doc_id in doc_ids]})
+    response = _client.session.post(
+        f"{get_base_url()}/{database}/_bulk_get",
+        data=docs,
+        headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+
+    found = {}
+    for result in orjson.loads(response.content)["results"]:
+        doc = result["docs"][0].get("ok")
+        if doc is not None and not doc.get("_deleted"):
+            found[result["id"]] = doc
+    return found
+
+
+def fetch_many_data(prefix: str, doc_ids: Iterable[int | str]) -> dict:
+    """ Retrieve data from couchdb for given stat type and many users.
+
+    Like :func:`fetch_data`, the databases for the stat type are queried in descending order of their creation
+    but with a single _bulk_get request per database, and only for the users not found in the newer databases.
+
+    Args:
+        prefix: the string to match database names with
+        doc_ids: the users (or other document ids) to retrieve data for
+
+    Returns:
+        a dict of the found documents keyed by the given ids
+    """
+    remaining = {str(doc_id): doc_id for doc_id in doc_ids}
+    found = {}
+
+    for _ in range(2):
+        for database in list_databases(prefix):
+            if not remaining:
+                return found
+            try:
+                docs = bulk_get(database, remaining.keys())
+            except requests.HTTPError as e:
+                if e.response.status_code == 404 and _is_missing_database(e.response):
+                    break
+                raise
+            for doc_id, doc in docs.items():
+                found[remaining.pop(doc_id)] = doc
+        else:
+            return found
+        _client.invalidate_databases()
+
+    return found
+
+
 def fetch_exact_data(database: str, document_id: str):
     """ Retrieve data from couchdb for the exact given database and document id.
     Args:
@@ -138,65 +306,126 @@ def fetch_exact_data(database: str, document_id: str):
     """
     base_url = get_base_url()
     document_url = f"{base_url}/{database}/{document_id}"
-    response = requests.get(document_url)
+    response = _client.session.get(document_url)
     if response.status_code == 404:
         return None
-    return response.json()
-
-
-def insert_data(database: str, data: list[dict]):
-    """ Insert the given data into the specified database. """
-    with start_span(op="serializing", name="serialize data to json"):
-        docs = orjson.dumps({"docs": data})
-
+    return orjson.loads(response.content)
+
+
+def _chunk_serialized_docs(docs: list[bytes], max_bytes: int) -> list[list[int]]:
+    """ Group the indices of the serialized documents in chunks of at most max_bytes, a document larger than
+     max_bytes makes up a chunk on its own. """
+    chunks, chunk, chunk_bytes = [], [], 0
+    for idx, doc in enumerate(docs):
+        if chunk and chunk_bytes + len(doc) > max_bytes:
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append(idx)
+        chunk_bytes += len(doc) + 1
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _post_bulk_docs(database: str, docs: list[bytes]) -> list[str]:
+    """ Insert the serialized documents in the database with a single request, returns the ids of the documents
+     which conflicted with an existing revision. """
     with start_span(op="http", name="insert docs in couchdb using api"):
-        couchdb_url = f"{get_base_url()}/{database}/_bulk_docs"
-        response = requests.post(couchdb_url, data=docs, headers={"Content-Type": "application/json"})
+        response = _client.session.post(
+            f"{get_base_url()}/{database}/_bulk_docs",
+            data=b'{"docs":[' + b",".join(docs) + b"]}",
+            headers={"Content-Type": "application/json"}
+        )
         response.raise_for_status()
+    return [status["id"] for status in orjson.loads(response.content) if status.get("error") == "conflict"]
 
-    with start_span(op="deserializing", name="checking response for conflicts"):
-        conflict_doc_ids = []
-        for doc_status in response.json():
-            if doc_status.get("error") == "conflict":
-                conflict_doc_ids.append(doc_status["id"])
-
-        if not conflict_doc_ids:
-            return
-
-        conflict_docs = orjson.dumps({"docs": [{"id": doc_id} for doc_id in conflict_doc_ids]})
 
+def _get_revisions(database: str, doc_ids: list[str]) -> dict[str, str]:
+    """ Retrieve the current revision of the given documents, without their contents. """
     with start_span(op="http", name="retrieving conflicts from database"):
-        response = requests.post(
-            f"{get_base_url()}/{database}/_bulk_get",
-            data=conflict_docs,
+        response = _client.session.post(
+            f"{get_base_url()}/{database}/_all_docs",
+            data=orjson.dumps({"keys": doc_ids}),
             headers={"Content-Type": "application/json"}
         )
         response.raise_for_status()
+    revisions = {}
+    for row in orjson.loads(response.content)["rows"]:
+        value = row.get("value")
+        if value is not None and not value.get("deleted"):
+            revisions[row["id"]] = value["rev"]
+    return revisions
 
-    with start_span(op="deserializing", name="processing conflicting revisions"):
-        revs_map = {}
-        for result in response.json()["results"]:
-            existing_doc = result["docs"][0]["ok"]
-            revs_map[existing_doc["_id"]] = existing_doc["_rev"]
 
-        docs_to_update = []
-        for doc in data:
-            if doc["_id"] in revs_map:
-                doc["_rev"] = revs_map[doc["_id"]]
-            docs_to_update.append(doc)
+class InsertConflictError(Exception):
+    """ Raised when some documents still conflict after all the insertion attempts. """
 
-    with start_span(op="serializing", name="serialize conflicting docs to update"):
-        docs_to_update = orjson.dumps({"docs": docs_to_update})
+    def __init__(self, database: str, doc_ids: list[str]):
+        super().__init__(f"Documents still conflicting in {database} after {INSERT_CONFLICT_RETRIES} retries:"
+                         f" {', '.join(doc_ids)}")
+        self.database = database
+        self.doc_ids = doc_ids
 
-    with start_span(op="http", name="retry updating conflicts in database"):
-        response = requests.post(couchdb_url, data=docs_to_update, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
+
+def insert_data(database: str, data: list[dict], executor: Optional[Executor] = None,
+                max_chunk_bytes: int = INSERT_CHUNK_BYTES):
+    """ Insert the given data into the specified database.
+
+    The documents are inserted with _bulk_docs requests of at most max_chunk_bytes each. If an executor is given,
+    the requests are submitted to it and run concurrently, the number of requests in flight being bounded by its
+    number of workers, otherwise they are sent one after the other. Documents which already exist in the database
+    conflict on the first attempt, only those are retried with their current revision.
+
+    Args:
+        database: the database to insert the data in
+        data: the documents to insert, the ones which conflicted are updated in place with their revision
+        executor: an optional executor to send the requests concurrently
+        max_chunk_bytes: the maximum size of the body of each request
+
+    Raises:
+        InsertConflictError: if some documents still conflict after INSERT_CONFLICT_RETRIES retries
+    """
+    with start_span(op="serializing", name="serialize data to json"):
+        docs = [orjson.dumps(doc) for doc in data]
+        # documents without an _id are assigned one by couchdb and can't conflict
+        index = {doc["_id"]: idx for idx, doc in enumerate(data) if "_id" in doc}
+
+    pending = list(range(len(docs)))
+    for attempt in range(INSERT_CONFLICT_RETRIES + 1):
+        chunks = [[pending[idx] for idx in chunk]
+                  for chunk in _chunk_serialized_docs([docs[idx] for idx in pending], max_chunk_bytes)]
+        if executor is None:
+            results = [_post_bulk_docs(database, [docs[idx] for idx in chunk]) for chunk in chunks]
+        else:
+            futures = [executor.submit(_post_bulk_docs, database, [docs[idx] for idx in chunk]) for chunk in chunks]
+            results = [future.result() for future in futures]
+
+        conflict_doc_ids = [doc_id for result in results for doc_id in result]
+        if not conflict_doc_ids:
+            return
+        if attempt == INSERT_CONFLICT_RETRIES:
+            raise InsertConflictError(database, conflict_doc_ids)
+
+        revisions = _get_revisions(database, conflict_doc_ids)
+        with start_span(op="serializing", name="serialize conflicting docs to update"):
+            pending = []
+            for doc_id in conflict_doc_ids:
+                idx = index[doc_id]
+                doc = data[idx]
+                if doc_id in revisions:
+                    doc["_rev"] = revisions[doc_id]
+                else:
+                    doc.pop("_rev", None)
+                docs[idx] = orjson.dumps(doc)
+                pending.append(idx)
 
 
 def try_insert_data(database: str, data: list[dict]):
     """ Try to insert data in the database if it exists, otherwise create the database and try again. """
     try:
         insert_data(database, data)
+    except InsertConflictError:
+        raise
     except Exception:
         create_database(database)
         insert_data(database, data)
@@ -214,11 +443,11 @@ def delete_data(database: str, doc_id: int | str):
          doc_id: the id of the document to delete
     """
     document_url = f"{get_base_url()}/{database}/{doc_id}"
-    response = requests.head(document_url)
+    response = _client.session.head(document_url)
     response.raise_for_status()
 
     rev = json.loads(response.headers.get("ETag"))
-    response = requests.delete(document_url, params={"rev": rev})
+    response = _client.session.delete(document_url, params={"rev": rev})
     response.raise_for_status()
 
 
@@ -227,7 +456,7 @@ def check_database_lock(database: str):
      DATABASE_LOCK_FILE. A database is usually locked only during dumps.
     """
     url = f"{get_base_url()}/{database}/{DATABASE_LOCK_FILE}"
-    response = requests.get(url)
+    response = _client.session.get(url)
     return response.status_code == 200
 
 
@@ -240,7 +469,7 @@ def lock_database(database: str):
     """
     document_url = f"{get_base_url()}/{database}/{DATABASE_LOCK_FILE}"
     # TODO: figure out why PUT works but POST fails with a weird referer header error
-    response = requests.put(document_url, json={})
+    response = _client.session.put(document_url, json={})
     response.raise_for_status()
 
 
@@ -323,3 +552,147 @@ def dump_database(prefix: str, fp: BinaryIO):
                     fp.write(orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE))
     finally:
         unlock_database(database)
+
+
+def _fetch_all_docs(http, database_url: str, params: dict) -> list[dict]:
+    """ Fetch a page of the _all_docs rows of the database. """
+    response = http.get(f"{database_url}/_all_docs", params=params)
+    response.raise_for_status()
+    return orjson.loads(response.content)["rows"]
+
+
+def _split_keyspace(http, database_url: str, total_docs: int, ranges: int) -> list[Optional[str]]:
+    """ Split the _id keyspace of the database in ranges of about the same number of documents.
+
+    Returns:
+        the boundaries of the ranges, range i spans from boundaries[i] (inclusive) to boundaries[i + 1]
+        (exclusive), None standing for the start and the end of the keyspace
+    """
+    boundaries = [None]
+    for idx in range(1, ranges):
+        rows = _fetch_all_docs(http, database_url, {"limit": 1, "skip": idx * total_docs // ranges})
+        if rows and rows[0]["id"] != boundaries[-1]:
+            boundaries.append(rows[0]["id"])
+    boundaries.append(None)
+    return boundaries
+
+
+def _write_json_atomic(path: str, data):
+    with open(path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(data))
+    os.replace(path + ".tmp", path)
+
+
+def _dump_range(database_url: str, start: Optional[str], end: Optional[str], page_size: int, path: str):
+    """ Dump the documents whose _id is in [start, end) to the file at path.
+
+    After each page is written, the file offset and the last _id written are saved in a checkpoint file next to
+    the dump file. If the dump of the range is interrupted, calling this again truncates the file to the last
+    checkpoint and continues after the last _id written.
+    """
+    checkpoint_path = path + ".checkpoint"
+    checkpoint = {"offset": 0, "last_id": None, "done": False}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "rb") as f:
+            checkpoint = orjson.loads(f.read())
+        if checkpoint["done"]:
+            return
+
+    with _get_requests_session() as http, open(path, "ab") as fp:
+        fp.truncate(checkpoint["offset"])
+        fp.seek(checkpoint["offset"])
+
+        params = {"limit": page_size, "include_docs": "true"}
+        if end is not None:
+            params["endkey"] = json.dumps(end)
+            params["inclusive_end"] = "false"
+
+        last_id = checkpoint["last_id"]
+        while True:
+            if last_id is not None:
+                params["startkey"] = json.dumps(last_id)
+                params["skip"] = 1
+            elif start is not None:
+                params["startkey"] = json.dumps(start)
+            rows = _fetch_all_docs(http, database_url, params)
+
+            lines = []
+            for row in rows:
+                doc = row["doc"]
+                last_id = doc.pop("_id", None)
+                doc.pop("key", None)
+                doc.pop("_rev", None)
+                doc.pop("_revisions", None)
+                if doc:
+                    lines.append(orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE))
+            fp.write(b"".join(lines))
+            fp.flush()
+
+            done = len(rows) < page_size
+            _write_json_atomic(checkpoint_path, {"offset": fp.tell(), "last_id": last_id, "done": done})
+            if done:
+                return
+
+
+def dump_database_parallel(prefix: str, work_dir: str, ranges: int = DUMP_RANGES,
+                           page_size: int = DUMP_PAGE_SIZE) -> list[str]:
+    """ Dump the contents of the earliest database of the asked type, like :func:`dump_database`, fetching
+        ranges of the _id keyspace concurrently.
+
+        Each range is written to its own file in work_dir, the concatenation of the files in the returned order
+        is the dump, in the order of the document ids. The ranges are checkpointed after each page, so if the dump
+        is interrupted, calling this again with the same work_dir resumes it as long as the database still exists.
+        Only a page of documents per range is held in memory.
+
+        Args:
+            prefix: the string to match database names with
+            work_dir: the directory to write the dump files and the checkpoints to
+            ranges: the number of _id ranges to fetch concurrently
+            page_size: the number of documents to fetch per request
+
+        Returns:
+            the paths of the files with the dumped documents
+    """
+    databases = list_databases(prefix)
+    if not databases:
+        return []
+    database = databases[-1]
+    database_url = f"{get_base_url()}/{database}"
+
+    os.makedirs(work_dir, exist_ok=True)
+    state_path = os.path.join(work_dir, DUMP_STATE_FILE)
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path, "rb") as f:
+            state = orjson.loads(f.read())
+        if state["database"] != database:
+            # the database of the interrupted dump has been replaced, start over
+            shutil.rmtree(work_dir)
+            os.makedirs(work_dir)
+            state = None
+
+    if not check_database_lock(database):
+        lock_database(database)
+
+    try:
+        if state is None:
+            with _get_requests_session() as http:
+                response = http.get(database_url)
+                response.raise_for_status()
+                total_docs = response.json()["doc_count"]
+                boundaries = _split_keyspace(http, database_url, total_docs, ranges)
+            state = {"database": database, "boundaries": boundaries}
+            _write_json_atomic(state_path, state)
+
+        boundaries = state["boundaries"]
+        paths = [os.path.join(work_dir, f"{idx:04d}.jsonl") for idx in range(len(boundaries) - 1)]
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            futures = [
+                executor.submit(_dump_range, database_url, boundaries[idx], boundaries[idx + 1], page_size, path)
+                for idx, path in enumerate(paths)
+            ]
+            for future in futures:
+                future.result()
+        return paths
+    finally:
+        unlock_database(database)
@@ -352,7 +352,71 @@ def dump_feedback_for_spark(location, dump_time=datetime.today(), threads=DUMP_D
     return feedback_dump
 
 
-def dump_statistics(location: str):
+class _ConcatenatedFiles:
+    """ A read-only file object over the concatenation of the given files. """
+
+    def __init__(self, paths: list[str]):
+        self.paths = list(paths)
+        self.current = None
+
+    def read(self, size=-1) -> bytes:
+        chunks = []
+        while size != 0:
+            if self.current is None:
+                if not self.paths:
+                    break
+                self.current = open(self.paths.pop(0), "rb")
+            data = self.current.read(size)
+            if not data:
+                self.current.close()
+                self.current = None
+                continue
+            chunks.append(data)
+            if size > 0:
+                size -= len(data)
+        return b"".join(chunks)
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+
+def _add_concatenated_files(tar: tarfile.TarFile, paths: list[str], arcname: str):
+    """ Add the concatenation of the given files to the archive as a single file, without copying them first. """
+    tarinfo = tarfile.TarInfo(arcname)
+    tarinfo.size = sum(os.path.getsize(path) for path in paths)
+    tarinfo.mtime = int(datetime.now().timestamp())
+    reader = _ConcatenatedFiles(paths)
+    try:
+        tar.addfile(tarinfo, reader)
+    finally:
+        reader.close()
+
+
+# directory under the dump location where the statistics are dumped before being added to the archive
+STATISTICS_CHECKPOINT_DIRNAME = "statistics-checkpoint"
+
+
+def dump_statistics(tar: tarfile.TarFile, arcname: str, checkpoint_dir: str):
+    """ Dump the statistics from couchdb into the archive, one jsonl file for each stat.
+
+        The stats are dumped one at a time with :func:`listenbrainz.db.couchdb.dump_database_parallel` into a
+        subdirectory of checkpoint_dir, added to the archive and removed, so only one stat is held on disk at a
+        time (the size of a tar member has to be known before writing it, so a stat can't be piped into the
+        archive as it is fetched). The checkpoints are keyed on the stat and the dump state records the couchdb
+        database, so if a stat fails to dump, the next dump of statistics in the same location resumes its
+        interrupted ranges as long as the database still exists. Checkpoints of other stats or databases are
+        removed, and checkpoint_dir itself once all the stats are dumped.
+
+        Args:
+            tar: the archive to add the statistics to
+            arcname: the directory of the archive to add the statistics directory to
+            checkpoint_dir: the directory to dump the databases to, a single stat can take several GBs
+
+        Raises:
+            Exception if a stat failed to dump, the archive would be incomplete
+    """
     # TODO: when adding support to dump entity listener statistics, replace user_id with user_name
     stats = [
         f"{stat_type}_{stat_range}"
@@ -360,15 +424,23 @@ def dump_statistics(location: str):
         for stat_type in ["artists", "recordings", "releases", "daily_activity", "listening_activity"]
         for stat_range in ALLOWED_STATISTICS_RANGE
     ]
-    full_path = os.path.join(location, "statistics")
+    if os.path.isdir(checkpoint_dir):
+        for name in os.listdir(checkpoint_dir):
+            if name not in stats:
+                shutil.rmtree(os.path.join(checkpoint_dir, name), ignore_errors=True)
+
     for stat in stats:
+        work_dir = os.path.join(checkpoint_dir, stat)
         try:
             current_app.logger.info(f"Dumping statistics for {stat}...")
-            os.makedirs(full_path, exist_ok=True)
-            with open(os.path.join(full_path, f"{stat}.jsonl"), "wb+") as fp:
-                couchdb.dump_database(stat, fp)
+            paths = couchdb.dump_database_parallel(stat, work_dir)
+            _add_concatenated_files(tar, paths, os.path.join(arcname, "statistics", f"{stat}.jsonl"))
         except Exception:
-            current_app.logger.info(f"Failed to create dump for {stat}:", exc_info=True)
+            current_app.logger.error(f"Failed to create dump for {stat}:", exc_info=True)
+            raise
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
 
 
 def _create_dump(location: str, db_engine: Optional[sqlalchemy.engine.Engine], dump_type: str, tables: Optional[dict],
@@ -424,7 +496,8 @@ def _create_dump(location: str, db_engine: Optional[sqlalchemy.engine.Engine], d
             create_path(archive_tables_dir)
 
             if dump_type == "statistics":
-                dump_statistics(archive_tables_dir)
+                dump_statistics(tar, os.path.join(archive_name, "lbdump"),
+                                os.path.join(location, STATISTICS_CHECKPOINT_DIRNAME))
             else:
                 with db_engine.connect() as connection:
                     if dump_type == "feedback":
@@ -445,7 +518,10 @@ def _create_dump(location: str, db_engine: Optional[sqlalchemy.engine.Engine], d
                                     raise
                             transaction.rollback()
 
-            if not tables:
+            if dump_type == "statistics":
+                # the statistics have been added to the archive while dumping them
+                pass
+            elif not tables:
                 # order doesn't matter or name of tables can't be determined before dumping so just
                 # add entire directory with all files inside it
                 tar.add(archive_tables_dir, arcname=os.path.join(archive_name, 'lbdump'))
@@ -27,6 +27,9 @@ class SimilarityDataset(DatabaseDataset):
         values = [(x["mbid0"], x["mbid1"], x["score"]) for x in message["data"]]
         return query, None, values
 
+    def get_copy(self, message, batch):
+        return batch.select(["mbid0", "mbid1", "score"])
+
     def run_post_processing(self, cursor, message):
         query = SQL("COMMENT ON TABLE {table} IS {comment}").format(
             table=self._get_table_name(),
@@ -21,6 +21,7 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
 
 
+from concurrent.futures import Executor
 from datetime import datetime
 from typing import Optional
 
@@ -31,9 +32,9 @@ from requests import HTTPError
 from sentry_sdk import start_span
 
 from data.model.common_stat import StatApi
-from listenbrainz.db import couchdb
+from listenbrainz.db import couchdb, stats_response_cache
 from listenbrainz.db.couchdb import try_insert_data
-from listenbrainz.db.user import get_users_by_id
+from listenbrainz.db import user_identity_cache
 
 # sitewide statistics are stored in the user statistics table
 # as statistics for a special user with the following user_id.
@@ -42,7 +43,8 @@ SITEWIDE_STATS_USER_ID = 15753
 SITEWIDE_STATS_DB = "sitewide_stats_current"
 
 
-def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="user_id"):
+def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="user_id",
+           executor: Optional[Executor] = None, max_chunk_bytes: int = couchdb.INSERT_CHUNK_BYTES):
     """ Insert stats in couchdb.
 
         Args:
@@ -51,6 +53,8 @@ def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="use
             to_ts: the end of the time period for which the stat is
             values: list with each item as stat for 1 user
             key: the key of the value to user as _id of the document
+            executor: an optional executor to send the insert requests concurrently
+            max_chunk_bytes: the maximum size of each insert request
     """
     with start_span(op="processing", name="add _id, from_ts, to_ts and last_updated to docs"):
         for doc in values:
@@ -60,31 +64,51 @@ def insert(database: str, from_ts: int, to_ts: int, values: list[dict], key="use
             doc["to_ts"] = to_ts
             doc["last_updated"] = int(datetime.now().timestamp())
 
-    couchdb.insert_data(database, values)
+    couchdb.insert_data(database, values, executor, max_chunk_bytes)
 
+    match = couchdb.DATABASE_NAME_PATTERN.match(database)
+    if key == "user_id" and match:
+        stats_response_cache.invalidate(f"{match[1]}_{match[2]}", (doc["user_id"] for doc in values))
 
-def get(user_id, stats_type, stats_range, stats_model) -> Optional[StatApi]:
+
+def _to_stat_api(data: dict, user_id, stats_range, stats_model, offset: int, count: Optional[int]) -> StatApi:
+    """ Validate the stats document, only the entries of data in the [offset, offset + count) window
+     if count is given. """
+    entries = data["data"]
+    if count is not None:
+        entries = entries[offset:offset + count]
+    return StatApi[stats_model](
+        user_id=user_id,
+        from_ts=data["from_ts"],
+        to_ts=data["to_ts"],
+        count=data.get("count"),  # all stats may not have a count field
+        stats_range=stats_range,
+        data=entries,
+        last_updated=data["last_updated"]
+    )
+
+
+def get(user_id, stats_type, stats_range, stats_model, offset: int = 0,
+        count: Optional[int] = None) -> Optional[StatApi]:
     """ Retrieve stats for the given user, stats range and stats type.
 
+        If count is given, only the window of count entries of the stats data starting at offset is validated
+        and returned, the count field of the stats still is the total number of entries. Callers which only
+        need a page of the entries should pass it, validating large stats documents is expensive.
+
         Args:
             user_id: ListenBrainz id of the user
             stats_range: time period to retrieve stats for
             stats_type: the stat to retrieve
             stats_model: the pydantic model for the stats
+            offset: the number of entries of the stats data to skip
+            count: the number of entries of the stats data to return, all of them if None
     """
     prefix = f"{stats_type}_{stats_range}"
     try:
         data = couchdb.fetch_data(prefix, user_id)
         if data is not None:
-            return StatApi[stats_model](
-                user_id=user_id,
-                from_ts=data["from_ts"],
-                to_ts=data["to_ts"],
-                count=data.get("count"),  # all stats may not have a count field
-                stats_range=stats_range,
-                data=data["data"],
-                last_updated=data["last_updated"]
-            )
+            return _to_stat_api(data, user_id, stats_range, stats_model, offset, count)
     except HTTPError as e:
         current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
     except (ValidationError, KeyError) as e:
@@ -97,6 +121,46 @@ def get(user_id, stats_type, stats_range, stats_model) -> Optional[StatApi]:
     return None
 
 
+def get_many(user_ids: list[int], stats_type, stats_range, stats_model, offset: int = 0,
+             count: Optional[int] = None) -> dict[int, StatApi]:
+    """ Retrieve stats for the given users, stats range and stats type.
+
+        The stats of all users are fetched with a single request for each stats database, see
+        :func:`listenbrainz.db.couchdb.fetch_many_data`.
+
+        Args:
+            user_ids: ListenBrainz ids of the users
+            stats_range: time period to retrieve stats for
+            stats_type: the stat to retrieve
+            stats_model: the pydantic model for the stats
+            offset: the number of entries of the stats data to skip, see :func:`get`
+            count: the number of entries of the stats data to return, all of them if None
+
+        Returns:
+            a dict of the stats keyed by user id, users whose stats haven't been calculated or couldn't
+            be processed are left out
+    """
+    prefix = f"{stats_type}_{stats_range}"
+    try:
+        docs = couchdb.fetch_many_data(prefix, user_ids)
+    except HTTPError as e:
+        current_app.logger.error(f"{e}. Response: %s", e.response.json(), exc_info=True)
+        return {}
+    except Exception as e:
+        current_app.logger.error(f"Error connecting to CouchDB: {e}")
+        return {}
+
+    stats = {}
+    for user_id, data in docs.items():
+        try:
+            stats[user_id] = _to_stat_api(data, user_id, stats_range, stats_model, offset, count)
+        except (ValidationError, KeyError) as e:
+            current_app.logger.error(
+                f"{e}. Occurred while processing {stats_range} {stats_type} for user_id: {user_id}"
+                f" and data: {orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')}", exc_info=True)
+    return stats
+
+
 def get_entity_listener(db_conn, entity, entity_id, stats_range) -> Optional[dict]:
     """ Retrieve stats for the given entity, stats range and stats type.
 
@@ -118,7 +182,7 @@ def get_entity_listener(db_conn, entity, entity_id, stats_range) -> Optional[dic
         doc.pop("_revisions", None)
 
         user_id_listeners = doc.pop("listeners", [])
-        users_map = get_users_by_id(db_conn, [x["user_id"] for x in user_id_listeners])
+        users_map = user_identity_cache.get_user_names(db_conn, [x["user_id"] for x in user_id_listeners])
         user_name_listeners = []
         for x in user_id_listeners:
             user_name = users_map.get(x["user_id"])
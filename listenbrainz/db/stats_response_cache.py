@@ -0,0 +1,219 @@
+""" Cache of the rendered responses of the user stats API endpoints.
+
+The responses are cached in redis as the serialized json body, gzip compressed if larger than
+STATS_RESPONSE_CACHE_COMPRESS_MIN_BYTES, along with an ETag of the body and the time it took to build the response
+from couchdb. A hit saves fetching the couchdb document, validating it with the pydantic models, slicing it and
+serializing the response, the time saved is reported as a metric.
+
+All the cached responses of a user for a stat and range (for all the counts and offsets requested) are fields of a
+single redis hash, so that they can be removed at once when the spark reader inserts new stats for the user, see
+:func:`invalidate`. The hash expires STATS_RESPONSE_CACHE_EXPIRY seconds after it is created and each response is
+only served for STATS_RESPONSE_CACHE_EXPIRY seconds after it was cached. The cache is disabled if
+STATS_RESPONSE_CACHE_EXPIRY is 0.
+
+A response is only served while the couchdb databases of the stat are the ones it was built from, so that the
+responses built from a database which has been replaced or deleted since aren't served anymore. Invalidations
+also bump a version of the user's responses, which is read before building a response and checked when caching
+it, so that a response built from the stats replaced by a concurrent insert isn't cached.
+"""
+import gzip
+import hashlib
+import logging
+import time
+from typing import Iterable, NamedTuple, Optional
+
+import orjson
+from brainzutils import cache, metrics
+from flask import current_app
+from redis.exceptions import WatchError
+
+from listenbrainz.db import couchdb
+
+STATS_RESPONSE_CACHE_KEY_PREFIX = "stats.response."
+STATS_RESPONSE_VERSION_KEY_PREFIX = "stats.response.version."
+METRIC_UPDATE_INTERVAL = 60  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    compressed: bool
+
+
+class StatsResponseCacheMetrics:
+    """ Counts hits and misses and the time saved by the hits in this process and periodically reports them. """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_total = 0.0
+        self.submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
+
+    def hit(self, saved: float):
+        self.hits += 1
+        self.saved_total += saved
+        self.submit()
+
+    def miss(self):
+        self.misses += 1
+        self.submit()
+
+    def submit(self):
+        if time.monotonic() < self.submission_time:
+            return
+        self.submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
+        total = self.hits + self.misses
+        try:
+            metrics.set(
+                "stats_response_cache",
+                hits=self.hits,
+                misses=self.misses,
+                hit_ratio=self.hits / total if total else 0.0,
+                avg_saved_ms=self.saved_total / self.hits * 1000 if self.hits else 0.0
+            )
+        except Exception:
+            pass
+        self.hits = self.misses = 0
+        self.saved_total = 0.0
+
+
+_metrics = StatsResponseCacheMetrics()
+
+
+def enabled() -> bool:
+    """ Whether the cache is enabled, it is disabled if STATS_RESPONSE_CACHE_EXPIRY is 0. """
+    return bool(current_app.config.get("STATS_RESPONSE_CACHE_EXPIRY", 0))
+
+
+def _key(prefix: str, user_id: int) -> str:
+    return cache._prep_key(f"{STATS_RESPONSE_CACHE_KEY_PREFIX}{prefix}.{user_id}")
+
+
+def _version_key(prefix: str, user_id: int) -> str:
+    return cache._prep_key(f"{STATS_RESPONSE_VERSION_KEY_PREFIX}{prefix}.{user_id}")
+
+
+def get_databases(prefix: str) -> Optional[str]:
+    """ Return an identifier of the current couchdb databases of the stat, None if they couldn't be listed. """
+    try:
+        return ",".join(couchdb.list_databases(prefix))
+    except Exception:
+        logger.error("Could not list the databases of the stat:", exc_info=True)
+        return None
+
+
+def get_version(prefix: str, user_id: int) -> Optional[int]:
+    """ Return the version of the user's cached responses for the stat, to be read before building a response
+     and passed to :func:`put`. None if it couldn't be read, the response is then not cached. """
+    try:
+        version = cache._r.get(_version_key(prefix, user_id))
+    except Exception:
+        logger.error("Could not read cached stats response version:", exc_info=True)
+        return None
+    return int(version) if version is not None else 0
+
+
+def get(prefix: str, user_id: int, variant: str, databases: str) -> Optional[CachedResponse]:
+    """ Return the cached response of the user's stats or None if it isn't cached.
+
+        Args:
+            prefix: the stat type and range, like the prefix of the couchdb databases of the stat
+            user_id: the id of the user
+            variant: identifies the response among the ones of the user for this stat, e.g. the count and offset
+            databases: the current databases of the stat, as returned by get_databases
+    """
+    start = time.perf_counter()
+    try:
+        body, meta = cache._r.hmget(_key(prefix, user_id), [variant, f"{variant}:meta"])
+    except Exception:
+        logger.error("Could not read cached stats response:", exc_info=True)
+        return None
+
+    if body is None or meta is None:
+        _metrics.miss()
+        return None
+
+    meta = orjson.loads(meta)
+    if meta["databases"] != databases or meta["expires_at"] <= time.time():
+        _metrics.miss()
+        return None
+
+    _metrics.hit(meta["cost"] - (time.perf_counter() - start))
+    return CachedResponse(body=body, etag=meta["etag"], compressed=meta["compressed"])
+
+
+def put(prefix: str, user_id: int, variant: str, body: bytes, cost: float,
+        databases: str, version: Optional[int]) -> CachedResponse:
+    """ Cache the response of the user's stats and return it.
+
+        Args:
+            prefix: the stat type and range, like the prefix of the couchdb databases of the stat
+            user_id: the id of the user
+            variant: identifies the response among the ones of the user for this stat, e.g. the count and offset
+            body: the serialized json body of the response
+            cost: the time it took to build the response, in seconds
+            databases: the databases of the stat the response was built from, as returned by get_databases
+            version: the version returned by get_version before building the response, the response isn't
+                cached if the user's responses have been invalidated since
+    """
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    compressed = len(body) >= current_app.config.get("STATS_RESPONSE_CACHE_COMPRESS_MIN_BYTES", 1024)
+    if compressed:
+        body = gzip.compress(body, compresslevel=6)
+    response = CachedResponse(body=body, etag=etag, compressed=compressed)
+    if version is None:
+        return response
+
+    expiry = current_app.config["STATS_RESPONSE_CACHE_EXPIRY"]
+    meta = orjson.dumps({
+        "etag": etag,
+        "compressed": compressed,
+        "cost": cost,
+        "databases": databases,
+        "expires_at": time.time() + expiry
+    })
+    key = _key(prefix, user_id)
+    version_key = _version_key(prefix, user_id)
+    try:
+        with cache._r.pipeline() as pipe:
+            # the transaction is aborted if the responses are invalidated, or the hash changes or expires, before
+            # it is executed
+            pipe.watch(version_key, key)
+            current_version = pipe.get(version_key)
+            if (int(current_version) if current_version is not None else 0) != version:
+                return response
+            ttl = pipe.ttl(key)
+            pipe.multi()
+            pipe.hset(key, mapping={variant: body, f"{variant}:meta": meta})
+            if ttl < 0:
+                # only set the expiry of the hash when it is created, so that the responses cached in it
+                # earlier don't outlive it
+                pipe.expire(key, expiry)
+            pipe.execute()
+    except WatchError:
+        pass
+    except Exception:
+        logger.error("Could not cache stats response:", exc_info=True)
+    return response
+
+
+def invalidate(prefix: str, user_ids: Iterable[int]):
+    """ Remove the cached responses of the given users for the stat type and range. """
+    if not enabled():
+        return
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    expiry = current_app.config["STATS_RESPONSE_CACHE_EXPIRY"]
+    try:
+        pipe = cache._r.pipeline(transaction=False)
+        for user_id in user_ids:
+            version_key = _version_key(prefix, user_id)
+            pipe.incr(version_key)
+            pipe.expire(version_key, expiry)
+            pipe.delete(_key(prefix, user_id))
+        pipe.execute()
+    except Exception:
+        logger.error("Could not invalidate cached stats responses:", exc_info=True)
@@ -1,3 +1,5 @@
+import pyarrow as pa
+import pyarrow.compute as pc
 from flask import current_app
 from psycopg2.sql import Literal, SQL
 from sqlalchemy import text
@@ -19,7 +21,7 @@ class _TagsDataset(DatabaseDataset):
                     recording_mbid          UUID NOT NULL,
                     tag_count               INTEGER NOT NULL,
                     percent                 DOUBLE PRECISION NOT NULL,
-                    source                  tag_source_type_enum NOT NULL
+                    source                  lb_tag_radio_source_type_enum NOT NULL
             )
         """
 
@@ -41,6 +43,21 @@ class _TagsDataset(DatabaseDataset):
 
         return query, template, values
 
+    def get_copy(self, message, batch):
+        # one row per tag of each recording
+        tags = batch.column("tags")
+        flat_tags = pc.list_flatten(tags)
+        return pa.RecordBatch.from_arrays(
+            [
+                pc.take(batch.column("recording_mbid"), pc.list_parent_indices(tags)),
+                pc.struct_field(flat_tags, "tag"),
+                pc.struct_field(flat_tags, "tag_count"),
+                pc.struct_field(flat_tags, "_percent"),
+                pa.repeat(message["source"], len(flat_tags)),
+            ],
+            names=["recording_mbid", "tag", "tag_count", "percent", "source"]
+        )
+
 
 TagsDataset = _TagsDataset()
 
@@ -1,5 +1,8 @@
 import json
+import os
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from unittest.mock import patch
 
@@ -127,3 +130,105 @@ class CouchdbTestCase(unittest.TestCase):
         received = dumped.read().splitlines()
         received_numbers = {json.loads(x)["data"] for x in received}
         self.assertEqual(set(numbers), received_numbers)
+
+    def test_databases_cache(self):
+        couchdb.init(config.COUCHDB_USER, config.COUCHDB_ADMIN_KEY, config.COUCHDB_HOST, config.COUCHDB_PORT,
+                     databases_cache_ttl=60)
+        couchdb.create_database("couchdb_cache_test_db_20220730")
+        self.assertEqual(couchdb.list_databases("couchdb_cache_test_db"), ["couchdb_cache_test_db_20220730"])
+
+        # creating a database in this process invalidates the cache
+        couchdb.create_database("couchdb_cache_test_db_20220731")
+        self.assertEqual(
+            couchdb.list_databases("couchdb_cache_test_db"),
+            ["couchdb_cache_test_db_20220731", "couchdb_cache_test_db_20220730"]
+        )
+        couchdb.insert_data("couchdb_cache_test_db_20220730", [{"_id": "1", "data": "foo"}])
+
+        # a database deleted by another process is still listed but fetch_data notices it is missing
+        requests.delete(f"{get_base_url()}/couchdb_cache_test_db_20220731")
+        self.assertEqual(len(couchdb.list_databases("couchdb_cache_test_db")), 2)
+        self.assertEqual(couchdb.fetch_data("couchdb_cache_test_db", 1)["data"], "foo")
+        self.assertEqual(couchdb.list_databases("couchdb_cache_test_db"), ["couchdb_cache_test_db_20220730"])
+
+    def test_fetch_many_data(self):
+        older, newer = "couchdb_many_test_db_20220730", "couchdb_many_test_db_20220731"
+        couchdb.create_database(older)
+        couchdb.insert_data(older, [{"_id": "1", "data": "old1"}, {"_id": "2", "data": "old2"}])
+        couchdb.create_database(newer)
+        couchdb.insert_data(newer, [{"_id": "1", "data": "new1"}])
+
+        self.assertEqual(couchdb.bulk_get(newer, ["1", "2"]).keys(), {"1"})
+
+        found = couchdb.fetch_many_data("couchdb_many_test_db", [1, 2, 3])
+        self.assertEqual(found.keys(), {1, 2})
+        self.assertEqual(found[1]["data"], "new1")
+        self.assertEqual(found[2]["data"], "old2")
+
+    def test_dump_database_parallel(self):
+        database = "couchdb_parallel_dump_test_db_20250505"
+        couchdb.create_database(database)
+        numbers = list(range(1000))
+        couchdb.insert_data(database, [{"_id": str(i), "key": str(i), "data": i} for i in numbers])
+
+        fetch_all_docs = couchdb._fetch_all_docs
+        calls = 0
+
+        def interrupted_fetch(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 10:
+                raise requests.ConnectionError()
+            return fetch_all_docs(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            with patch("listenbrainz.db.couchdb._fetch_all_docs", side_effect=interrupted_fetch):
+                with self.assertRaises(requests.ConnectionError):
+                    couchdb.dump_database_parallel("couchdb_parallel_dump_test_db", work_dir, ranges=4, page_size=30)
+            self.assertFalse(couchdb.check_database_lock(database))
+
+            paths = couchdb.dump_database_parallel("couchdb_parallel_dump_test_db", work_dir, ranges=4, page_size=30)
+            self.assertEqual(len(paths), 4)
+            received = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    received.extend(json.loads(line)["data"] for line in f.read().splitlines())
+            # every document is dumped exactly once, in the order of the document ids
+            self.assertEqual(received, sorted(numbers, key=str))
+            self.assertTrue(os.path.exists(os.path.join(work_dir, couchdb.DUMP_STATE_FILE)))
+
+    def test_insert_data_concurrently(self):
+        database = "couchdb_concurrent_insert_test_db_20250505"
+        couchdb.create_database(database)
+
+        with ThreadPoolExecutor(max_workers=4) as executor, \
+                patch("listenbrainz.db.couchdb._post_bulk_docs", wraps=couchdb._post_bulk_docs) as post_bulk_docs:
+            couchdb.insert_data(database, [{"_id": str(i), "data": i} for i in range(100)],
+                                executor=executor, max_chunk_bytes=500)
+            self.assertGreater(post_bulk_docs.call_count, 1)
+
+            # only the existing documents conflict and are retried
+            post_bulk_docs.reset_mock()
+            couchdb.insert_data(database, [{"_id": str(i), "data": i * 2} for i in range(90, 110)],
+                                executor=executor, max_chunk_bytes=500)
+            posted = [doc for call in post_bulk_docs.call_args_list for doc in call.args[1]]
+            self.assertEqual(len(posted), 30)
+
+        found = couchdb.fetch_many_data("couchdb_concurrent_insert_test_db", range(110))
+        self.assertEqual(len(found), 110)
+        self.assertEqual(found[5]["data"], 5)
+        self.assertEqual(found[95]["data"], 190)
+        self.assertEqual(found[105]["data"], 210)
+
+    def test_insert_data_persistent_conflict(self):
+        database = "couchdb_conflict_insert_test_db_20250505"
+        couchdb.create_database(database)
+
+        with patch("listenbrainz.db.couchdb._post_bulk_docs", return_value=["1"]) as post_bulk_docs, \
+                patch("listenbrainz.db.couchdb._get_revisions", return_value={}) as get_revisions:
+            with self.assertRaises(couchdb.InsertConflictError) as cm:
+                couchdb.insert_data(database, [{"_id": "1", "data": 1}, {"_id": "2", "data": 2}])
+            self.assertEqual(cm.exception.doc_ids, ["1"])
+            self.assertEqual(post_bulk_docs.call_count, couchdb.INSERT_CONFLICT_RETRIES + 1)
+            # the revisions are not fetched again after the last attempt
+            self.assertEqual(get_revisions.call_count, couchdb.INSERT_CONFLICT_RETRIES)
@@ -19,8 +19,10 @@ in listenbrainz.db.dump
 # You should have received a copy of the GNU General Public License along
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+import io
 import subprocess
 import tarfile
+from unittest import mock
 
 import orjson
 
@@ -79,6 +81,8 @@ class DumpTestCase(DatabaseTestCase):
         with self.app.app_context():
             dump_location = db_dump.create_statistics_dump(self.tempdir, time_now)
         self.assertTrue(os.path.isfile(dump_location))
+        # the stats are staged under the dump location and removed once added to the archive
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, db_dump.STATISTICS_CHECKPOINT_DIRNAME)))
 
         found = set()
         found_stats = None
@@ -100,6 +104,25 @@ class DumpTestCase(DatabaseTestCase):
 
         delete_all_couch_databases()
 
+    def test_dump_statistics_failure(self):
+        checkpoint_dir = os.path.join(self.tempdir, "checkpoint")
+        os.makedirs(os.path.join(checkpoint_dir, "stale_stat"))
+
+        def dump_database_parallel(prefix, work_dir):
+            os.makedirs(work_dir, exist_ok=True)
+            if prefix == "artists_month":
+                raise Exception("couchdb error")
+            return []
+
+        with self.app.app_context(), \
+                mock.patch.object(db_dump.couchdb, "dump_database_parallel", side_effect=dump_database_parallel), \
+                tarfile.open(fileobj=io.BytesIO(), mode="w|") as tar:
+            with self.assertRaises(Exception):
+                db_dump.dump_statistics(tar, "lbdump", checkpoint_dir)
+
+        # the checkpoint of the failed stat is kept for the next dump, the others are removed
+        self.assertEqual(os.listdir(checkpoint_dir), ["artists_month"])
+
     def test_add_dump_entry(self):
         prev_dumps = db_dump.get_dump_entries()
         db_dump.add_dump_entry(datetime.today(), "incremental")
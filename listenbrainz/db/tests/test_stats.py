@@ -83,3 +83,19 @@ class StatsDatabaseTestCase(DatabaseTestCase):
                         UserArtistMapRecord,
                         exclude_count=True
                     )
+
+    def test_user_entity_stats_window(self):
+        with create_app().app_context():
+            original, _, _, _, _ = insert_test_stats("artists", "week", "user_top_artists_db_data_for_api_test_week.json")
+            data = original[0]["data"]
+
+            received = db_stats.get(1, "artists", "week", EntityRecord, offset=1, count=2)
+            self.assertEqual(received.count, original[0]["count"])
+            self.assertEqual([x.dict() for x in received.data.__root__], data[1:3])
+
+            received = db_stats.get(1, "artists", "week", EntityRecord, count=0)
+            self.assertEqual(received.data.__root__, [])
+
+            received = db_stats.get_many([1, 2], "artists", "week", EntityRecord, offset=0, count=1)
+            self.assertEqual([x.dict() for x in received[1].data.__root__], data[:1])
+            self.assertEqual([x.dict() for x in received[2].data.__root__], original[1]["data"][:1])
@@ -35,3 +35,4 @@ def delete_all_couch_databases():
             continue
         databases_url = f"{couchdb.get_base_url()}/{database}"
         requests.delete(databases_url)
+    couchdb.get_client().invalidate_databases()
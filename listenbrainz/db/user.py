@@ -9,6 +9,7 @@ from datetime import datetime
 from sqlalchemy import text
 
 from listenbrainz import db
+from listenbrainz.db import auth_token_cache, user_identity_cache
 from listenbrainz.db.exceptions import DatabaseException
 from typing import Tuple, List
 
@@ -62,6 +63,7 @@ def update_token(db_conn, id):
             "id": id
         })
         db_conn.commit()
+        auth_token_cache.invalidate(id)
     except DatabaseException as e:
         logger.error(e)
         raise
@@ -324,13 +326,17 @@ def delete(db_conn, id):
         id (int): the row ID of the listenbrainz user
     """
     try:
-        db_conn.execute(sqlalchemy.text("""
+        result = db_conn.execute(sqlalchemy.text("""
             DELETE FROM "user"
                   WHERE id = :id
+              RETURNING musicbrainz_id
             """), {
             'id': id,
         })
+        row = result.fetchone()
         db_conn.commit()
+        auth_token_cache.invalidate(id)
+        user_identity_cache.invalidate(id, row.musicbrainz_id if row else None)
     except sqlalchemy.exc.ProgrammingError as err:
         logger.error(err)
         raise DatabaseException("Couldn't delete user: %s" % str(err))
@@ -480,17 +486,28 @@ def update_user_details(db_conn, lb_id: int, musicbrainz_id: str, email: str):
         email: email of a user
     """
     try:
-        db_conn.execute(sqlalchemy.text("""
-            UPDATE "user"
+        # the old musicbrainz_id is returned to remove the cached identity of the user under the old name
+        result = db_conn.execute(sqlalchemy.text("""
+              WITH old AS (
+                    SELECT id, musicbrainz_id
+                      FROM "user"
+                     WHERE id = :lb_id
+              )
+            UPDATE "user" u
                SET email = :email
                  , musicbrainz_id = :musicbrainz_id
-             WHERE id = :lb_id
+              FROM old
+             WHERE u.id = old.id
+         RETURNING old.musicbrainz_id AS old_musicbrainz_id
             """), {
             "lb_id": lb_id,
             "musicbrainz_id": musicbrainz_id,
             "email": email
         })
+        row = result.fetchone()
         db_conn.commit()
+        auth_token_cache.invalidate(lb_id)
+        user_identity_cache.invalidate(lb_id, musicbrainz_id, row.old_musicbrainz_id if row else None)
     except sqlalchemy.exc.ProgrammingError as err:
         logger.error(err)
         raise DatabaseException("Couldn't update user's email: %s" % str(err))
@@ -586,6 +603,7 @@ def pause(db_conn,id):
             'id': id,
         })
         db_conn.commit()
+        auth_token_cache.invalidate(id)
         _notify_user_paused(db_conn,id,True)
 
     except sqlalchemy.exc.ProgrammingError as err:
@@ -610,6 +628,7 @@ def unpause(db_conn,id):
             'id': id,
         })
         db_conn.commit()
+        auth_token_cache.invalidate(id)
         _notify_user_paused(db_conn,id,False)
 
     except sqlalchemy.exc.ProgrammingError as err:
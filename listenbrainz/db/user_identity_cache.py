@@ -0,0 +1,146 @@
+""" Two level (in-process LRU and redis) cache of the ids and MusicBrainz usernames of users, used to resolve the
+user ids stored in the stats documents to user names (and user names given to the API to user ids) without a
+database query for each page.
+
+Both directions are cached: ``id.<user id>`` entries hold the user name and ``name.<lowercased user name>`` entries
+hold the id and the user name. The entries of a user are removed when the user is renamed or deleted, see
+:func:`invalidate`. The invalidation removes the redis entries and the entries in the local cache of the current
+process, the local caches of other processes expire after USER_IDENTITY_CACHE_LOCAL_TTL seconds. The cache is
+disabled if USER_IDENTITY_CACHE_EXPIRY is 0, the lookups then always query the database.
+"""
+import logging
+from typing import Iterable, Optional
+
+from brainzutils import cache
+from flask import current_app
+
+import listenbrainz.db.user as db_user
+from listenbrainz.lru import LRUCache
+
+USER_IDENTITY_CACHE_KEY_PREFIX = "user.identity."
+
+logger = logging.getLogger(__name__)
+
+_local: Optional[LRUCache] = None
+
+
+def _get_local() -> LRUCache:
+    global _local
+    if _local is None:
+        _local = LRUCache(current_app.config.get("USER_IDENTITY_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+    return _local
+
+
+def enabled() -> bool:
+    """ Whether the cache is enabled, it is disabled if USER_IDENTITY_CACHE_EXPIRY is 0. """
+    return bool(current_app.config.get("USER_IDENTITY_CACHE_EXPIRY", 0))
+
+
+def _id_key(user_id: int) -> str:
+    return f"{USER_IDENTITY_CACHE_KEY_PREFIX}id.{user_id}"
+
+
+def _name_key(user_name: str) -> str:
+    return f"{USER_IDENTITY_CACHE_KEY_PREFIX}name.{user_name.lower()}"
+
+
+def _get_many(keys: list[str]) -> dict:
+    """ Return the cached values of the keys, from the local cache and then from redis. """
+    local = _get_local()
+    found = local.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return found
+
+    try:
+        from_redis = {key: value for key, value in cache.get_many(missing).items() if value is not None}
+    except Exception:
+        logger.error("Could not read cached user identities:", exc_info=True)
+        return found
+    local.set_many(from_redis, ttl=current_app.config.get("USER_IDENTITY_CACHE_LOCAL_TTL", 10))
+    found.update(from_redis)
+    return found
+
+
+def _set_many(users: Iterable[tuple[int, str]]):
+    """ Cache both directions of the given (user id, user name) pairs. """
+    mapping = {}
+    for user_id, user_name in users:
+        mapping[_id_key(user_id)] = user_name
+        mapping[_name_key(user_name)] = {"id": user_id, "musicbrainz_id": user_name}
+    if not mapping:
+        return
+
+    expiry = current_app.config["USER_IDENTITY_CACHE_EXPIRY"]
+    _get_local().set_many(mapping, ttl=min(expiry, current_app.config.get("USER_IDENTITY_CACHE_LOCAL_TTL", 10)))
+    try:
+        cache.set_many(mapping, expirein=expiry)
+    except Exception:
+        logger.error("Could not cache user identities:", exc_info=True)
+
+
+def get_user_names(db_conn, user_ids: Iterable[int]) -> dict[int, str]:
+    """ Return a dict mapping the given user ids to the MusicBrainz usernames of the users, like
+     :func:`listenbrainz.db.user.get_users_by_id`. Users which don't exist are omitted. """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    if not enabled():
+        return db_user.get_users_by_id(db_conn, user_ids)
+
+    cached = _get_many([_id_key(user_id) for user_id in user_ids])
+    result = {}
+    missing = []
+    for user_id in user_ids:
+        user_name = cached.get(_id_key(user_id))
+        if user_name is None:
+            missing.append(user_id)
+        else:
+            result[user_id] = user_name
+
+    if missing:
+        fetched = db_user.get_users_by_id(db_conn, missing)
+        _set_many(fetched.items())
+        result.update(fetched)
+    return result
+
+
+def get_users_by_name(db_conn, user_names: Iterable[str]) -> dict[str, dict]:
+    """ Return a dict mapping the lowercased given user names to dicts with the id and the MusicBrainz username
+     (musicbrainz_id) of the users, like :func:`listenbrainz.db.user.get_many_users_by_mb_id`. The user names are
+     matched case-insensitively, users which don't exist are omitted. """
+    user_names = list({user_name.lower() for user_name in user_names})
+    if not user_names:
+        return {}
+    if not enabled():
+        users = db_user.get_many_users_by_mb_id(db_conn, user_names)
+        return {name: {"id": user["id"], "musicbrainz_id": user["musicbrainz_id"]} for name, user in users.items()}
+
+    cached = _get_many([_name_key(user_name) for user_name in user_names])
+    result = {}
+    missing = []
+    for user_name in user_names:
+        user = cached.get(_name_key(user_name))
+        if user is None:
+            missing.append(user_name)
+        else:
+            result[user_name] = user
+
+    if missing:
+        fetched = db_user.get_many_users_by_mb_id(db_conn, missing)
+        _set_many((user["id"], user["musicbrainz_id"]) for user in fetched.values())
+        for user_name, user in fetched.items():
+            result[user_name] = {"id": user["id"], "musicbrainz_id": user["musicbrainz_id"]}
+    return result
+
+
+def invalidate(user_id: int, *user_names: str):
+    """ Remove the cached entries of the user, along with the entries of the given user names (the old and new
+     names of a renamed user). """
+    keys = [_id_key(user_id)] + [_name_key(user_name) for user_name in user_names if user_name]
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.error("Could not invalidate cached identity of user %s:", user_id, exc_info=True)
+    if _local is not None:
+        _local.delete_many(keys)
@@ -1,5 +1,6 @@
-from copy import deepcopy
+from array import array
 from datetime import datetime, timezone
+from typing import Iterable, Optional
 
 import orjson
 
@@ -189,9 +190,11 @@ class Listen(object):
         }
 
     def to_timescale(self):
-        track_metadata = deepcopy(self.data)
-        track_metadata['additional_info']['recording_msid'] = self.recording_msid
-        del track_metadata['additional_info']['recording_msid']
+        # recording_msid is stored in its own column, only additional_info needs to be copied to remove it
+        track_metadata = self.data.copy()
+        additional_info = track_metadata.get('additional_info', {}).copy()
+        additional_info.pop('recording_msid', None)
+        track_metadata['additional_info'] = additional_info
         return self.timestamp, self.user_id, self.recording_msid, orjson.dumps(track_metadata).decode("utf-8")
 
     def __repr__(self):
@@ -203,6 +206,165 @@ class Listen(object):
                (self.user_name, self.ts_since_epoch, self.recording_msid, self.data['artist_name'], self.data['track_name'])
 
 
+class ListenBatch:
+    """ A columnar representation of a batch of listens for the bulk paths (writer, dispatchers, dumps).
+
+    Timestamps and user ids are stored in arrays, user names and msids in lists and the track_metadata of each
+    listen is kept as the orjson encoded document. Building a batch parses and flattens each listen once and the
+    conversions to timescale rows and api/json documents work on the encoded metadata, so unlike a list of
+    :class:`Listen` no per-listen datetime is built until needed and the metadata dicts are never copied.
+
+    Callers which still need :class:`Listen` objects can convert with :meth:`to_listens` and :meth:`from_listens`.
+    """
+
+    def __init__(self, timestamps: array, user_ids: array, user_names: list[Optional[str]],
+                 recording_msids: list[Optional[str]], metadata: list[bytes]):
+        self.timestamps = timestamps
+        self.user_ids = user_ids
+        self.user_names = user_names
+        self.recording_msids = recording_msids
+        self.metadata = metadata
+
+    @classmethod
+    def empty(cls):
+        return cls(array("d"), array("q"), [], [], [])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _append(self, timestamp: float, user_id: int, user_name: Optional[str],
+                recording_msid: Optional[str], metadata: bytes):
+        self.timestamps.append(timestamp)
+        self.user_ids.append(user_id)
+        self.user_names.append(user_name)
+        self.recording_msids.append(recording_msid)
+        self.metadata.append(metadata)
+
+    @staticmethod
+    def _encode_metadata(track_metadata: dict) -> bytes:
+        additional_info = track_metadata.get("additional_info")
+        if isinstance(additional_info, dict) and any(isinstance(v, dict) for v in additional_info.values()):
+            track_metadata = track_metadata.copy()
+            track_metadata["additional_info"] = flatten_dict(additional_info)
+        return orjson.dumps(track_metadata)
+
+    @classmethod
+    def from_json_many(cls, listens: Iterable[dict]):
+        """ Make a batch from listen dicts as accepted by :meth:`Listen.from_json`. The dicts are not modified.
+
+        Listens with a timestamp which cannot be parsed are skipped, listens without a user_id are not supported.
+        """
+        batch = cls.empty()
+        for listen in listens:
+            if "listened_at" in listen:
+                timestamp = listen["listened_at"]
+            elif "timestamp" in listen:
+                timestamp = listen["timestamp"]
+            else:
+                timestamp = listen["ts_since_epoch"]
+            try:
+                timestamp = float(timestamp)
+            except ValueError:
+                continue
+            batch._append(
+                timestamp,
+                listen["user_id"],
+                listen.get("user_name"),
+                listen.get("recording_msid"),
+                cls._encode_metadata(listen.get("track_metadata") or {"additional_info": {}})
+            )
+        return batch
+
+    @classmethod
+    def from_listens(cls, listens: Iterable[Listen]):
+        """ Make a batch from :class:`Listen` objects. """
+        batch = cls.empty()
+        for listen in listens:
+            batch._append(listen.timestamp.timestamp(), listen.user_id, listen.user_name,
+                          listen.recording_msid, orjson.dumps(listen.data))
+        return batch
+
+    def select(self, indices: Iterable[int]):
+        """ Return a new batch with the listens at the given indices. """
+        batch = ListenBatch.empty()
+        for idx in indices:
+            batch._append(self.timestamps[idx], self.user_ids[idx], self.user_names[idx],
+                          self.recording_msids[idx], self.metadata[idx])
+        return batch
+
+    def keys(self):
+        """ Yield the (listened_at in seconds, user_id, recording_msid) key of each listen, which identifies
+         a listen in the listen table. """
+        for ts, user_id, msid in zip(self.timestamps, self.user_ids, self.recording_msids):
+            yield int(ts), user_id, msid
+
+    def to_listens(self) -> list[Listen]:
+        return [
+            Listen(
+                user_id=user_id,
+                user_name=user_name,
+                timestamp=datetime.fromtimestamp(ts, timezone.utc),
+                recording_msid=msid,
+                data=orjson.loads(metadata)
+            )
+            for ts, user_id, user_name, msid, metadata
+            in zip(self.timestamps, self.user_ids, self.user_names, self.recording_msids, self.metadata)
+        ]
+
+    def to_timescale_rows(self) -> list[tuple]:
+        """ Return the rows of the batch in the format of :meth:`Listen.to_timescale`. """
+        rows = []
+        for ts, user_id, msid, metadata in zip(self.timestamps, self.user_ids, self.recording_msids, self.metadata):
+            # recording_msid is stored in its own column and only rarely submitted in additional_info
+            if b'"recording_msid"' in metadata:
+                track_metadata = orjson.loads(metadata)
+                track_metadata.get("additional_info", {}).pop("recording_msid", None)
+                metadata = orjson.dumps(track_metadata)
+            rows.append((datetime.fromtimestamp(ts, timezone.utc), user_id, msid, metadata.decode("utf-8")))
+        return rows
+
+    def to_api_many(self) -> list[dict]:
+        """ Return the listens of the batch in the format of :meth:`Listen.to_api`. """
+        return [
+            {
+                "track_metadata": orjson.loads(metadata),
+                "listened_at": int(ts),
+                "recording_msid": msid,
+                "user_name": user_name,
+                "inserted_at": 0
+            }
+            for ts, user_name, msid, metadata
+            in zip(self.timestamps, self.user_names, self.recording_msids, self.metadata)
+        ]
+
+    def to_api_json_many(self) -> list[bytes]:
+        """ Return the orjson encoded :meth:`Listen.to_api` document of each listen, without decoding the
+         metadata. """
+        return [
+            b'{"track_metadata":%s,"listened_at":%d,"recording_msid":%s,"user_name":%s,"inserted_at":0}' % (
+                metadata, int(ts), orjson.dumps(msid), orjson.dumps(user_name)
+            )
+            for ts, user_name, msid, metadata
+            in zip(self.timestamps, self.user_names, self.recording_msids, self.metadata)
+        ]
+
+    def to_json_many(self) -> list[bytes]:
+        """ Return the orjson encoded :meth:`Listen.to_json` document of each listen, without decoding the
+         metadata. """
+        return [
+            b'{"user_id":%d,"user_name":%s,"timestamp":%d,"track_metadata":%s,"recording_msid":%s}' % (
+                user_id, orjson.dumps(user_name), int(ts), metadata, orjson.dumps(msid)
+            )
+            for ts, user_id, user_name, msid, metadata
+            in zip(self.timestamps, self.user_ids, self.user_names, self.recording_msids, self.metadata)
+        ]
+
+    @staticmethod
+    def join_json(documents: list[bytes]) -> bytes:
+        """ Join documents returned by :meth:`to_json_many` into a json array. """
+        return b"[" + b",".join(documents) + b"]"
+
+
 class NowPlayingListen:
     """Represents a now playing listen"""
 
@@ -0,0 +1,149 @@
+""" Cache of the first page of listens of users, as returned by TimescaleListenStore.fetch_listens when no time
+range is specified.
+
+The page is stored in redis as an orjson document with the enriched listens (including mbid mapping data) and the
+min/max listen timestamps of the user, so that a hit doesn't need any database query. Entries are invalidated when
+listens are inserted or deleted for the user and when the mapping of the user's new listens is written. There is
+a small window in which a page fetched just before an invalidation can be cached after it, the expiry time of the
+entries bounds the staleness in that case and the age of the pages served is reported as a metric.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+import orjson
+from brainzutils import cache, metrics
+
+from listenbrainz.listen import Listen
+
+LISTENS_PAGE_CACHE_KEY = "lp."
+METRIC_UPDATE_INTERVAL = 60  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class ListensPageCacheMetrics:
+    """ Counts hits and misses and the age of the served pages in this process and periodically reports them. """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.staleness_total = 0.0
+        self.staleness_max = 0.0
+        self.submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
+
+    def hit(self, age: float):
+        self.hits += 1
+        self.staleness_total += age
+        self.staleness_max = max(self.staleness_max, age)
+        self.submit()
+
+    def miss(self):
+        self.misses += 1
+        self.submit()
+
+    def submit(self):
+        if time.monotonic() < self.submission_time:
+            return
+        self.submission_time = time.monotonic() + METRIC_UPDATE_INTERVAL
+        total = self.hits + self.misses
+        try:
+            metrics.set(
+                "listens_page_cache",
+                hits=self.hits,
+                misses=self.misses,
+                hit_ratio=self.hits / total if total else 0.0,
+                avg_staleness=self.staleness_total / self.hits if self.hits else 0.0,
+                max_staleness=self.staleness_max
+            )
+        except Exception:
+            pass
+        self.hits = self.misses = 0
+        self.staleness_total = self.staleness_max = 0.0
+
+
+_metrics = ListensPageCacheMetrics()
+
+
+def _key(user_id: int) -> str:
+    return LISTENS_PAGE_CACHE_KEY + str(user_id)
+
+
+def get(user: dict, count: int) -> Optional[tuple[list[Listen], datetime, datetime]]:
+    """ Return the latest count listens of the user along with the user's min and max listen timestamps
+     if the cached page can serve them, None otherwise. """
+    try:
+        data = cache.get(_key(user["id"]), decode=False)
+    except Exception:
+        data = None
+
+    if data is not None:
+        page = orjson.loads(data)
+        if page["complete"] or len(page["listens"]) >= count:
+            _metrics.hit(time.time() - page["cached_at"])
+            listens = []
+            for listened_at, created, recording_msid, track_metadata in page["listens"][:count]:
+                listens.append(Listen(
+                    user_id=user["id"],
+                    user_name=user["musicbrainz_id"],
+                    timestamp=listened_at,
+                    recording_msid=recording_msid,
+                    inserted_timestamp=datetime.fromtimestamp(created, timezone.utc) if created else None,
+                    data=track_metadata
+                ))
+            min_ts = datetime.fromtimestamp(page["min_ts"], timezone.utc)
+            max_ts = datetime.fromtimestamp(page["max_ts"], timezone.utc)
+            return listens, min_ts, max_ts
+
+    _metrics.miss()
+    return None
+
+
+def put(user_id: int, listens: list[Listen], min_ts: datetime, max_ts: datetime, complete: bool,
+        expiry: int, max_bytes: int):
+    """ Cache the latest listens of a user.
+
+        Args:
+            user_id: the id of the user
+            listens: the latest listens of the user, in descending order of listened_at
+            min_ts: the minimum listen timestamp of the user
+            max_ts: the maximum listen timestamp of the user
+            complete: whether listens are all the listens the user has
+            expiry: the number of seconds after which the cached page expires
+            max_bytes: the page is not cached if its serialized size is larger than this
+    """
+    page = {
+        "cached_at": time.time(),
+        "min_ts": min_ts.timestamp(),
+        "max_ts": max_ts.timestamp(),
+        "complete": complete,
+        "listens": [
+            [
+                listen.ts_since_epoch,
+                listen.inserted_timestamp.timestamp() if listen.inserted_timestamp else None,
+                listen.recording_msid,
+                listen.data
+            ]
+            for listen in listens
+        ]
+    }
+    data = orjson.dumps(page)
+    if len(data) > max_bytes:
+        return
+    try:
+        cache.set(_key(user_id), data, expirein=expiry, encode=False)
+    except Exception:
+        pass
+
+
+def invalidate(user_ids: Iterable[int]):
+    """ Remove the cached pages of the given users. Errors are logged and not raised, the changes which invalidate
+    the pages are already committed when this is called. """
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.error("Could not invalidate cached listens pages:", exc_info=True)
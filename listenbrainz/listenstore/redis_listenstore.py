@@ -5,7 +5,7 @@ import redis
 import orjson
 from brainzutils import cache
 
-from listenbrainz.listen import Listen, NowPlayingListen
+from listenbrainz.listen import Listen, ListenBatch, NowPlayingListen
 
 
 class RedisListenStore:
@@ -60,8 +60,12 @@ class RedisListenStore:
         """
 
         recent = {}
-        for listen in unique:
-            recent[orjson.dumps(listen.to_json())] = float(listen.ts_since_epoch)
+        if isinstance(unique, ListenBatch):
+            for document, ts in zip(unique.to_json_many(), unique.timestamps):
+                recent[document] = float(int(ts))
+        else:
+            for listen in unique:
+                recent[orjson.dumps(listen.to_json())] = float(listen.ts_since_epoch)
 
         # Don't take this very seriously -- if it fails, really no big deal. Let is go.
         if recent:
@@ -2,6 +2,7 @@ import logging
 import random
 from datetime import datetime, timedelta, timezone
 from time import time
+from unittest import mock
 
 import sqlalchemy
 from brainzutils import cache
@@ -10,9 +11,10 @@ from sqlalchemy import text
 import listenbrainz.db.user as db_user
 from listenbrainz.db import timescale as ts, timescale
 from listenbrainz.db.testing import DatabaseTestCase, TimescaleTestCase
-from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore
+from listenbrainz.listenstore import listens_page_cache
+from listenbrainz.listenstore.tests.util import create_test_data_for_timescalelistenstore, generate_data
 from listenbrainz.listenstore.timescale_listenstore import REDIS_USER_LISTEN_COUNT, \
-    TimescaleListenStore, REDIS_TOTAL_LISTEN_COUNT
+    TimescaleListenStore, REDIS_TOTAL_LISTEN_COUNT, INSERT_MODE_COPY
 from listenbrainz.listenstore.timescale_utils import delete_listens_and_update_user_listen_data,\
     recalculate_all_user_data, add_missing_to_listen_users_metadata, update_user_listen_data
 from listenbrainz.webserver import create_app
@@ -87,6 +89,30 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         listens, min_ts, max_ts = self.logstore.fetch_listens(user=self.testuser, from_ts=from_ts)
         self.assertEqual(len(listens), count)
 
+    def test_insert_timescale_copy(self):
+        """ Test that the COPY insert mode inserts the same listens, skips duplicates and reports the
+         inserted rows like the VALUES insert mode. """
+        logstore = TimescaleListenStore(self.log, INSERT_MODE_COPY)
+        listens = create_test_data_for_timescalelistenstore(self.testuser_name, self.testuser_id)
+        listens[0].data["track_name"] = 'quote " and backslash \\ in "track" name'
+
+        inserted = logstore.insert(listens)
+        self.assertEqual(len(inserted), len(listens))
+        self.assertCountEqual(
+            [(int(row[0].timestamp()), row[1], str(row[2])) for row in inserted],
+            [(listen.ts_since_epoch, listen.user_id, listen.recording_msid) for listen in listens]
+        )
+
+        # the staging table is emptied on commit so inserting the same batch again inserts nothing
+        self.assertEqual(logstore.insert(listens), [])
+        recalculate_all_user_data()
+
+        from_ts = datetime.fromtimestamp(1399999999, timezone.utc)
+        fetched, _, _ = logstore.fetch_listens(user=self.testuser, from_ts=from_ts)
+        self.assertEqual(len(fetched), len(listens))
+        self.assertIn('quote " and backslash \\ in "track" name', [listen.data["track_name"] for listen in fetched])
+        self.assertEqual(logstore.get_listen_count_for_user(self.testuser_id), len(listens))
+
     def test_fetch_listens_0(self):
         self._create_test_data(self.testuser_name, self.testuser_id)
         from_ts = datetime.fromtimestamp(1400000000, timezone.utc)
@@ -170,6 +196,63 @@ class TestTimescaleListenStore(DatabaseTestCase, TimescaleTestCase):
         self.assertEqual(listens[2].ts_since_epoch, 1400000050)
         self.assertEqual(listens[3].ts_since_epoch, 1400000000)
 
+    def test_fetch_listens_sparse_history(self):
+        """ Test that listens years apart are fetched exactly, previously the expanding window search gave up
+         after 10 passes and returned fewer listens than available. """
+        listens = []
+        for year in range(2005, 2025, 2):
+            listens.extend(generate_data(self.testuser_id, self.testuser_name,
+                                         int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()), 1))
+        self.logstore.insert(listens)
+
+        fetched, _, _ = self.logstore.fetch_listens(user=self.testuser)
+        self.assertEqual([listen.ts_since_epoch for listen in fetched],
+                         sorted([listen.ts_since_epoch for listen in listens], reverse=True))
+
+        from_ts = datetime(2004, 1, 1, tzinfo=timezone.utc)
+        fetched, _, _ = self.logstore.fetch_listens(user=self.testuser, from_ts=from_ts, limit=3)
+        self.assertEqual([listen.ts_since_epoch for listen in fetched],
+                         sorted([listen.ts_since_epoch for listen in listens[:3]], reverse=True))
+
+        to_ts = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        fetched, _, _ = self.logstore.fetch_listens(user=self.testuser, to_ts=to_ts, limit=3)
+        self.assertEqual([listen.ts_since_epoch for listen in fetched],
+                         sorted([listen.ts_since_epoch for listen in listens[-3:]], reverse=True))
+
+    def test_fetch_listens_page_cache(self):
+        logstore = TimescaleListenStore(self.log, listens_page_cache_expiry=300, listens_page_cache_max_bytes=1024 * 1024)
+        self._create_test_data(self.testuser_name, self.testuser_id)
+
+        listens, min_ts, max_ts = logstore.fetch_listens(user=self.testuser, limit=3)
+        self.assertEqual(len(listens), 3)
+
+        # served from the cache without querying the database
+        with mock.patch.object(logstore, "get_timestamps_for_user") as mock_timestamps:
+            cached, cached_min_ts, cached_max_ts = logstore.fetch_listens(user=self.testuser, limit=2)
+            mock_timestamps.assert_not_called()
+        self.assertEqual([listen.to_api() for listen in cached], [listen.to_api() for listen in listens[:2]])
+        self.assertEqual((cached_min_ts, cached_max_ts), (min_ts, max_ts))
+
+        # a larger page than the cached one is a miss
+        listens, _, _ = logstore.fetch_listens(user=self.testuser, limit=4)
+        self.assertEqual(len(listens), 4)
+
+        # inserting listens invalidates the cached page
+        new_listens = generate_data(self.testuser_id, self.testuser_name, int(max_ts.timestamp()) + 10, 1)
+        logstore.insert(new_listens)
+        listens, _, _ = logstore.fetch_listens(user=self.testuser, limit=4)
+        self.assertEqual(listens[0].ts_since_epoch, new_listens[0].ts_since_epoch)
+
+        # deleting a listen invalidates the cached page
+        logstore.delete_listen(listens[0].timestamp, self.testuser_id, listens[0].recording_msid)
+        with mock.patch.object(logstore, "get_timestamps_for_user", wraps=logstore.get_timestamps_for_user) as mock_timestamps:
+            logstore.fetch_listens(user=self.testuser, limit=4)
+            mock_timestamps.assert_called_once()
+
+        # an error while invalidating doesn't fail the already committed change
+        with mock.patch("listenbrainz.listenstore.listens_page_cache.cache.delete_many", side_effect=Exception):
+            listens_page_cache.invalidate([self.testuser_id])
+
     def test_fetch_listens_with_mapping(self):
         """ Test that the recording mbid submitted by the user is preferred over the mapping created by LB """
         self._create_test_data(self.testuser_name, self.testuser_id)
@@ -1,3 +1,4 @@
+import io
 import subprocess
 import tarfile
 import time
@@ -15,9 +16,10 @@ from sqlalchemy import text
 
 from listenbrainz.db import timescale, DUMP_DEFAULT_THREAD_COUNT
 from listenbrainz.db.dump import SchemaMismatchException
-from listenbrainz.listen import Listen
+from listenbrainz.listen import Listen, ListenBatch
 from listenbrainz.listenstore import LISTENS_DUMP_SCHEMA_VERSION, LISTEN_MINIMUM_DATE
 from listenbrainz.listenstore import ORDER_ASC, ORDER_TEXT, ORDER_DESC, DEFAULT_LISTENS_PER_FETCH
+from listenbrainz.listenstore import listens_page_cache
 from listenbrainz.webserver import ts_conn
 
 # Append the user name for both of these keys
@@ -30,25 +32,70 @@ REDIS_USER_LISTEN_COUNT_EXPIRY = 300
 DUMP_CHUNK_SIZE = 100000
 DATA_START_YEAR_IN_SECONDS = 1104537600
 
-# How many listens to fetch on the first attempt. If we don't fetch enough, increase it by WINDOW_SIZE_MULTIPLIER
-DEFAULT_FETCH_WINDOW = timedelta(days=30)  # 30 days
-
-# When expanding the search, how fast should the bounds be moved out
-WINDOW_SIZE_MULTIPLIER = 3
-
 LISTEN_COUNT_BUCKET_WIDTH = 2592000
 
 MAX_FUTURE_SECONDS = timedelta(minutes=10)  # max fwd clock skew
 EPOCH = datetime.fromtimestamp(0, timezone.utc)
 
+# Insert listens using a multi row INSERT ... VALUES statement
+INSERT_MODE_VALUES = "values"
+# Insert listens by COPYing them into a temporary staging table and merging it into the listen table
+INSERT_MODE_COPY = "copy"
+
+# Insert listens from the given source, skipping duplicates, and update the listen counts and timestamps
+# of the users. Returns the (listened_at, user_id, recording_msid) of the listens actually inserted.
+INSERT_LISTENS_QUERY = """
+    WITH inserted_listens AS (
+        INSERT INTO listen (listened_at, user_id, recording_msid, data)
+             {source}
+        ON CONFLICT (listened_at, user_id, recording_msid)
+         DO NOTHING
+          RETURNING listened_at, user_id, recording_msid
+    ), metadata AS (
+        INSERT INTO listen_user_metadata AS lum (user_id, count, min_listened_at, max_listened_at, created)
+             SELECT user_id, count(*), min(listened_at), max(listened_at), NOW()
+               FROM inserted_listens
+           GROUP BY user_id
+        ON CONFLICT (user_id)
+          DO UPDATE
+                SET count = lum.count + excluded.count
+                  , min_listened_at = least(lum.min_listened_at, excluded.min_listened_at)
+                  , max_listened_at = greatest(lum.max_listened_at, excluded.max_listened_at)
+                  , created = excluded.created
+    ) SELECT * FROM inserted_listens
+"""
+
+CREATE_LISTEN_STAGING_TABLE_QUERY = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS listen_staging (
+        listened_at     TIMESTAMP WITH TIME ZONE NOT NULL,
+        user_id         INTEGER                  NOT NULL,
+        recording_msid  UUID                     NOT NULL,
+        data            JSONB                    NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
 
 class TimescaleListenStore:
     '''
         The listenstore implementation for the timescale DB.
     '''
 
-    def __init__(self, logger):
+    def __init__(self, logger, insert_mode: str = INSERT_MODE_VALUES,
+                 listens_page_cache_expiry: int = 0, listens_page_cache_max_bytes: int = 0):
+        """
+            Args:
+                logger: the logger to use
+                insert_mode: how to insert listens, INSERT_MODE_VALUES or INSERT_MODE_COPY
+                listens_page_cache_expiry: expiry time of the cached first page of listens of users in seconds,
+                    0 disables the cache
+                listens_page_cache_max_bytes: the maximum size of the cached page of listens of a user
+        """
         self.log = logger
+        if insert_mode not in (INSERT_MODE_VALUES, INSERT_MODE_COPY):
+            raise ValueError(f"Unknown listen insert mode: {insert_mode}")
+        self.insert_mode = insert_mode
+        self.listens_page_cache_expiry = listens_page_cache_expiry
+        self.listens_page_cache_max_bytes = listens_page_cache_max_bytes
 
     def set_empty_values_for_user(self, user_id: int):
         """When a user is created, set the timestamp keys and insert an entry in the listen count
@@ -153,40 +200,29 @@ class TimescaleListenStore:
 
     def insert(self, listens):
         """
-            Insert a batch of listens. Returns a list of (listened_at, track_name, user_name, user_id) that indicates
+            Insert a batch of listens, either a list of Listen or a ListenBatch. Returns a list of (listened_at, track_name, user_name, user_id) that indicates
             which rows were inserted into the DB. If the row is not listed in the return values, it was a duplicate.
         """
+        if not listens:
+            return []
 
-        submit = []
-        for listen in listens:
-            submit.append(listen.to_timescale())
+        if isinstance(listens, ListenBatch):
+            submit = listens.to_timescale_rows()
+        else:
+            submit = [listen.to_timescale() for listen in listens]
 
-        query = """
-            WITH inserted_listens AS (
-                INSERT INTO listen (listened_at, user_id, recording_msid, data)
-                     VALUES %s
-                ON CONFLICT (listened_at, user_id, recording_msid)
-                 DO NOTHING
-                  RETURNING listened_at, user_id, recording_msid
-            ), metadata AS (
-                INSERT INTO listen_user_metadata AS lum (user_id, count, min_listened_at, max_listened_at, created)
-                     SELECT user_id, count(*), min(listened_at), max(listened_at), NOW()
-                       FROM inserted_listens
-                   GROUP BY user_id
-                ON CONFLICT (user_id)
-                  DO UPDATE
-                        SET count = lum.count + excluded.count
-                          , min_listened_at = least(lum.min_listened_at, excluded.min_listened_at)
-                          , max_listened_at = greatest(lum.max_listened_at, excluded.max_listened_at)
-                          , created = excluded.created
-            ) SELECT * FROM inserted_listens
-        """
+        if self.insert_mode == INSERT_MODE_COPY:
+            return self._insert_with_copy(submit)
+
+        query = INSERT_LISTENS_QUERY.format(source="VALUES %s")
 
         inserted_rows = []
         conn = timescale.engine.raw_connection()
         with conn.cursor() as curs:
             try:
-                execute_values(curs, query, submit, template=None)
+                # all listens must be inserted in a single statement, otherwise only the rows inserted
+                # by the last page would be returned.
+                execute_values(curs, query, submit, template=None, page_size=len(submit))
                 while True:
                     result = curs.fetchone()
                     if not result:
@@ -197,9 +233,53 @@ class TimescaleListenStore:
                 return
 
         conn.commit()
+        self._invalidate_listens_page_cache([row[1] for row in inserted_rows])
+
+        return inserted_rows
+
+    def _insert_with_copy(self, rows):
+        """ Insert timescale rows of listens by streaming them into a temporary staging table using COPY and then
+         merging the staging table into the listen table with a single statement. Temporary tables are not
+         WAL logged and COPY avoids building and parsing a huge VALUES list, so this is cheaper for large
+         batches. The return value is the same as that of :meth:`insert`.
+        """
+        buffer = io.StringIO()
+        for listened_at, user_id, recording_msid, data in rows:
+            # csv format, the only field which may need quoting is the json document
+            buffer.write('%s,%d,%s,"%s"\n' % (listened_at.isoformat(), user_id, recording_msid, data.replace('"', '""')))
+        buffer.seek(0)
+
+        inserted_rows = []
+        conn = timescale.engine.raw_connection()
+        with conn.cursor() as curs:
+            try:
+                curs.execute(CREATE_LISTEN_STAGING_TABLE_QUERY)
+                curs.copy_expert(
+                    "COPY listen_staging (listened_at, user_id, recording_msid, data) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                curs.execute(INSERT_LISTENS_QUERY.format(source="""
+                    SELECT listened_at, user_id, recording_msid, data
+                      FROM listen_staging
+                """))
+                for result in curs.fetchall():
+                    inserted_rows.append((result[0], result[1], result[2]))
+            except UntranslatableCharacter:
+                conn.rollback()
+                return
+
+        # the staging table is emptied on commit
+        conn.commit()
+        self._invalidate_listens_page_cache([row[1] for row in inserted_rows])
 
         return inserted_rows
 
+    def _invalidate_listens_page_cache(self, user_ids):
+        """ Invalidate the cached listens pages of the users whose listens were inserted or deleted. """
+        if not user_ids:
+            return
+        listens_page_cache.invalidate(user_ids)
+
     def fetch_listens(self, user: Dict, from_ts: datetime = None, to_ts: datetime = None, limit: int = DEFAULT_LISTENS_PER_FETCH):
         """ The timestamps are stored as UTC in the postgres datebase while on retrieving
             the value they are converted to the local server's timezone. So to compare
@@ -220,17 +300,43 @@ class TimescaleListenStore:
         else:
             order = ORDER_DESC
 
+        use_page_cache = from_ts is None and to_ts is None and self.listens_page_cache_expiry
+        if use_page_cache:
+            cached = listens_page_cache.get(user, limit)
+            if cached is not None:
+                return cached
+
         min_user_ts, max_user_ts = self.get_timestamps_for_user(user["id"])
 
         if min_user_ts == EPOCH and max_user_ts == EPOCH:
             return [], min_user_ts, max_user_ts
 
-        if to_ts is None and from_ts is None:
-            to_ts = max_user_ts + timedelta(seconds=1)
-
-        window_size = DEFAULT_FETCH_WINDOW
+        # clamp the requested range to the range of the user's listens, this makes the fetch exact in a
+        # single query regardless of how sparse the user's history is and lets timescale exclude the chunks
+        # outside of the range.
+        lower_ts = min_user_ts - timedelta(seconds=1)
+        upper_ts = max_user_ts + timedelta(seconds=1)
+        if from_ts is not None:
+            lower_ts = max(lower_ts, from_ts)
+        if to_ts is not None:
+            upper_ts = min(upper_ts, to_ts)
+
+        # keyset pagination: first select the page of listens of the user using the (user_id, listened_at)
+        # index, then lookup the mapping and metadata for the rows of that page only.
         query = """
-                   WITH selected_listens AS (
+                   WITH page AS MATERIALIZED (
+                        SELECT listened_at
+                             , created
+                             , user_id
+                             , recording_msid
+                             , data
+                          FROM listen
+                         WHERE user_id = :user_id
+                           AND listened_at > :from_ts
+                           AND listened_at < :to_ts
+                      ORDER BY listened_at """ + ORDER_TEXT[order] + """
+                         LIMIT :limit
+                   ), selected_listens AS (
                         SELECT l.listened_at
                              , l.created
                              , l.user_id
@@ -238,7 +344,7 @@ class TimescaleListenStore:
                              , l.data
                              -- prefer to use user submitted mbid, then user specified mapping, then mbid mapper's mapping, finally other user's specified mappings
                              , COALESCE((data->'additional_info'->>'recording_mbid')::uuid, user_mm.recording_mbid, mm.recording_mbid, other_mm.recording_mbid) AS recording_mbid
-                          FROM listen l
+                          FROM page l
                      LEFT JOIN mbid_mapping mm
                             ON l.recording_msid = mm.recording_msid
                      LEFT JOIN mbid_manual_mapping user_mm
@@ -246,9 +352,6 @@ class TimescaleListenStore:
                            AND user_mm.user_id = l.user_id 
                      LEFT JOIN mbid_manual_mapping_top other_mm
                             ON l.recording_msid = other_mm.recording_msid
-                         WHERE l.user_id = :user_id
-                           AND listened_at > :from_ts
-                           AND listened_at < :to_ts
                    )
                    SELECT listened_at
                         , user_id
@@ -282,95 +385,40 @@ class TimescaleListenStore:
                         , release_data->>'name'
                         , release_data->>'caa_id'
                         , release_data->>'caa_release_mbid'
-                 ORDER BY listened_at """ + ORDER_TEXT[order] + " LIMIT :limit"
-
-        if from_ts and to_ts:
-            to_dynamic = False
-            from_dynamic = False
-        elif from_ts is not None:
-            to_ts = from_ts + window_size
-            to_dynamic = True
-            from_dynamic = False
-        else:
-            from_ts = to_ts - window_size
-            to_dynamic = False
-            from_dynamic = True
+                 ORDER BY listened_at """ + ORDER_TEXT[order]
 
         listens = []
-        done = False
-
-        t0 = time.monotonic()
-
-        passes = 0
-        while True:
-            passes += 1
-
-            # Oh shit valve. I'm keeping it here for the time being. :)
-            if passes == 10:
-                done = True
-                break
-
-            curs = ts_conn.execute(
+        if lower_ts < upper_ts:
+            t0 = time.monotonic()
+            result = ts_conn.execute(
                 sqlalchemy.text(query),
-                {"user_id": user["id"], "from_ts": from_ts, "to_ts": to_ts, "limit": limit}
+                {"user_id": user["id"], "from_ts": lower_ts, "to_ts": upper_ts, "limit": limit}
             )
-            while True:
-                result = curs.fetchone()
-                if not result:
-                    if not to_dynamic and not from_dynamic:
-                        done = True
-                        break
-
-                    if from_ts < min_user_ts - timedelta(seconds=1):
-                        done = True
-                        break
-
-                    if to_ts > datetime.now(tz=timezone.utc) + MAX_FUTURE_SECONDS:
-                        done = True
-                        break
-
-                    if to_dynamic:
-                        from_ts += window_size - timedelta(seconds=1)
-                        window_size *= WINDOW_SIZE_MULTIPLIER
-                        to_ts += window_size
-
-                    if from_dynamic:
-                        to_ts -= window_size
-                        window_size *= WINDOW_SIZE_MULTIPLIER
-                        from_ts -= window_size
-
-                    break
-
+            for row in result.fetchall():
                 listens.append(Listen.from_timescale(
-                    listened_at=result.listened_at,
-                    user_id=result.user_id,
-                    created=result.created,
-                    recording_msid=result.recording_msid,
-                    track_metadata=result.data,
-                    recording_mbid=result.recording_mbid,
-                    recording_name=result.recording_name,
-                    release_mbid=result.release_mbid,
-                    artist_mbids=result.artist_mbids,
-                    ac_names=result.ac_names,
-                    ac_join_phrases=result.ac_join_phrases,
+                    listened_at=row.listened_at,
+                    user_id=row.user_id,
+                    created=row.created,
+                    recording_msid=row.recording_msid,
+                    track_metadata=row.data,
+                    recording_mbid=row.recording_mbid,
+                    recording_name=row.recording_name,
+                    release_mbid=row.release_mbid,
+                    artist_mbids=row.artist_mbids,
+                    ac_names=row.ac_names,
+                    ac_join_phrases=row.ac_join_phrases,
                     user_name=user["musicbrainz_id"],
-                    caa_id=result.caa_id,
-                    caa_release_mbid=result.caa_release_mbid
+                    caa_id=row.caa_id,
+                    caa_release_mbid=row.caa_release_mbid
                 ))
-
-                if len(listens) == limit:
-                    done = True
-                    break
-
-            if done:
-                break
-
-        fetch_listens_time = time.monotonic() - t0
+            self.log.info("fetch listens %s %.2fs" % (user["musicbrainz_id"], time.monotonic() - t0))
 
         if order == ORDER_ASC:
             listens.reverse()
 
-        self.log.info("fetch listens %s %.2fs (%d passes)" % (user["musicbrainz_id"], fetch_listens_time, passes))
+        if use_page_cache:
+            listens_page_cache.put(user["id"], listens, min_user_ts, max_user_ts, len(listens) < limit,
+                                   self.listens_page_cache_expiry, self.listens_page_cache_max_bytes)
 
         return listens, min_user_ts, max_user_ts
 
@@ -676,6 +724,7 @@ class TimescaleListenStore:
         except psycopg2.OperationalError as e:
             self.log.error("Cannot delete listens for user: %s" % str(e))
             raise
+        self._invalidate_listens_page_cache([user_id])
 
     def delete_listen(self, listened_at: datetime, user_id: int, recording_msid: str):
         """ Delete a particular listen for user with specified MusicBrainz ID.
@@ -705,6 +754,7 @@ class TimescaleListenStore:
         except psycopg2.OperationalError as e:
             self.log.error("Cannot delete listen for user: %s" % str(e))
             raise TimescaleListenStoreException()
+        self._invalidate_listens_page_cache([user_id])
 
 
 class TimescaleListenStoreException(Exception):
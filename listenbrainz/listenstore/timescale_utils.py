@@ -9,6 +9,7 @@ from sqlalchemy import text
 
 from listenbrainz import db
 from listenbrainz.db import timescale
+from listenbrainz.listenstore import listens_page_cache
 
 logger = logging.getLogger(__name__)
 
@@ -193,6 +194,13 @@ def delete_listens():
               FROM calculate_new_ts mt
              WHERE lm.user_id = mt.user_id
     """
+    # the users whose cached listens pages need to be invalidated
+    select_affected_users = """
+        SELECT DISTINCT user_id
+          FROM listen_delete_metadata
+         WHERE id <= :max_id
+           AND status = 'pending'
+    """
     mark_invalid_rows_query = """
         UPDATE listen_delete_metadata
            SET status = 'invalid'
@@ -211,6 +219,9 @@ def delete_listens():
         max_id = row.max_id
         logger.info("Found max id in listen_delete_metadata table: %s", max_id)
 
+        result = connection.execute(text(select_affected_users), {"max_id": max_id})
+        user_ids = [row.user_id for row in result.fetchall()]
+
         logger.info("Deleting Listens and updating affected listens counts")
         connection.execute(text(delete_listens_and_update_listen_counts), {"max_id": max_id})
 
@@ -225,6 +236,8 @@ def delete_listens():
 
         logger.info("Completed deleting listens and updating affected metadata")
 
+    listens_page_cache.invalidate(user_ids)
+
 
 def update_user_listen_data():
     """ Scan listens created since last run and update metadata in listen_user_metadata accordingly """
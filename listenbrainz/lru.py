@@ -0,0 +1,140 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+# rough per entry overhead of the OrderedDict bookkeeping (hash table slot, linked list node and the
+# (value, expiry) tuple stored for each key).
+ENTRY_OVERHEAD_BYTES = 150
+
+
+def approximate_size(obj) -> int:
+    """ Approximate the memory used by simple python objects, including the objects they contain. """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(approximate_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in obj.items())
+    return size
+
+
+class LRUCache:
+    """ A thread safe, in-process LRU cache bounded by the approximate memory used by its entries.
+
+    Entries can optionally expire after a fixed time. Hits, misses and evictions are counted so that the
+    owner of the cache can report them, see :meth:`stats`.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        """
+            Args:
+                max_bytes: the maximum approximate memory in bytes to be used by the keys and values in the cache
+                ttl: the number of seconds after which an entry expires, None to never expire entries
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float], int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    @property
+    def current_bytes(self):
+        return self._bytes
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, count: bool = True):
+        """ Return the value cached for the key, or None if the key is not cached or has expired. """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """ Return a dict of the keys found in the cache to their values, missing keys are omitted. """
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """ Add or replace a value in the cache, evicting the least recently used entries if the
+         cache grows above its memory limit. None values are not cached. """
+        if value is None:
+            return
+        size = approximate_size(key) + approximate_size(value) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def set_many(self, mapping: dict, ttl: Optional[float] = None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def delete_many(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self, reset: bool = False) -> dict:
+        """ Return the hit, miss and eviction counts along with the current size of the cache.
+
+            Args:
+                reset: if True, reset the counters so that the next call reports counts since this call
+        """
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
+            if reset:
+                self.hits = self.misses = self.evictions = 0
+        return stats
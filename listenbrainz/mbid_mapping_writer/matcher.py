@@ -8,6 +8,7 @@ from listenbrainz.mbid_mapping_writer.mbid_mapper import MATCH_TYPES, MATCH_TYPE
 from listenbrainz.labs_api.labs.api.artist_credit_recording_lookup import ArtistCreditRecordingLookupQuery, \
     ArtistCreditRecordingLookupInput
 from listenbrainz.db import timescale
+from listenbrainz.listenstore import listens_page_cache
 
 
 MAX_THREADS = 2
@@ -186,6 +187,11 @@ def process_listens(app, listens, priority):
 
     conn.commit()
 
+    if priority == NEW_LISTEN:
+        # new listens are likely to be on the cached latest listens page of their users, which
+        # doesn't have the mapping yet.
+        listens_page_cache.invalidate(listen["user_id"] for listen in listens if listen.get("user_id"))
+
     return stats
 
 
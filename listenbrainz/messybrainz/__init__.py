@@ -1,6 +1,8 @@
+import hashlib
 import uuid
 from typing import Iterable
 
+import psycopg2
 import sqlalchemy
 import sqlalchemy.exc
 from psycopg2.extras import execute_values
@@ -8,6 +10,7 @@ from sqlalchemy import text
 
 from listenbrainz.db import timescale
 from listenbrainz.messybrainz import exceptions
+from listenbrainz.messybrainz.cache import get_msid_cache, MsidCache
 
 
 def submit_listens_and_sing_me_a_sweet_song(recordings):
@@ -71,6 +74,13 @@ def get_msid(connection, recording, artist, release=None, track_number=None, dur
     """ Retrieve the msid for a (recording, artist, release, track_number, duration) tuple if present in the db. If
      there are duplicates in the table, the earliest submitted MSID will be returned.
     """
+    msid_cache = get_msid_cache()
+    if msid_cache is not None:
+        cache_key = MsidCache.key(recording, artist, release, track_number, duration)
+        cached = msid_cache.get_many([cache_key])
+        if cached:
+            return cached[cache_key]
+
     query = text("""
         SELECT gid::TEXT
           FROM messybrainz.submissions
@@ -96,7 +106,11 @@ def get_msid(connection, recording, artist, release=None, track_number=None, dur
         "duration": duration
     })
     row = result.fetchone()
-    return row.gid if row else None
+    if row is None:
+        return None
+    if msid_cache is not None:
+        msid_cache.set_many({cache_key: row.gid})
+    return row.gid
 
 
 def submit_recording(connection, recording, artist, release=None, track_number=None, duration=None):
@@ -133,6 +147,170 @@ def submit_recording(connection, recording, artist, release=None, track_number=N
     return str(msid)
 
 
+def bulk_submit_listens(recordings: list[dict]) -> list[str]:
+    """ Inserts a list of recordings into MessyBrainz using a fixed number of queries, irrespective of
+    the number of recordings. This is the set based equivalent of :func:`submit_listens_and_sing_me_a_sweet_song`.
+
+    Args:
+        recordings: a list of recordings to be inserted
+    Returns:
+        a list of recording msids, in the same order as the given recordings
+    Raises:
+        TemporaryErrorException: if the database couldn't be reached, retrying may succeed
+        ErrorAddingException: if the recordings couldn't be added
+    """
+    for r in recordings:
+        if "artist" not in r or "title" not in r:
+            raise exceptions.BadDataException("Require artist and title keys in submission")
+
+    try:
+        conn = timescale.engine.raw_connection()
+    except sqlalchemy.exc.OperationalError:
+        raise exceptions.TemporaryErrorException("Failed to connect to the database")
+
+    try:
+        with conn.cursor() as curs:
+            msids = bulk_submit_recordings(curs, recordings)
+        conn.commit()
+        return msids
+    except psycopg2.OperationalError:
+        # the connection is likely broken, the pool resets or discards it on close
+        raise exceptions.TemporaryErrorException("Failed to add data")
+    except psycopg2.Error:
+        conn.rollback()
+        raise exceptions.ErrorAddingException("Failed to add data")
+    finally:
+        conn.close()
+
+
+def _submission_values(submissions: list[dict]) -> list[tuple]:
+    """ Convert submissions to rows for the VALUES list used in the bulk queries, the first column
+     of each row is the index of the submission in the list. """
+    values = []
+    for idx, submission in enumerate(submissions):
+        values.append((
+            idx,
+            submission["title"],
+            submission["artist"],
+            submission.get("release"),
+            submission.get("track_number"),
+            submission.get("duration")
+        ))
+    return values
+
+
+def _submission_lock_key(row: tuple) -> int:
+    """ Compute a stable signed 64-bit advisory lock key for the case-insensitive identity of a submission. """
+    key = "\x00".join("" if value is None else str(value).lower() for value in row[1:])
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _bulk_get_msids(curs, values: list[tuple]) -> dict[int, str]:
+    """ Lookup the msids for the given submission rows using a single query. Returns a dict of the submission
+    index to its msid, submissions not present in the db are omitted. In case of duplicates in the table, the
+    earliest submitted MSID is returned as in :func:`get_msid`.
+    """
+    if not values:
+        return {}
+    query = """
+        SELECT DISTINCT ON (t.idx)
+               t.idx
+             , s.gid::TEXT AS gid
+          FROM (VALUES %s) AS t(idx, recording, artist_credit, release, track_number, duration)
+          JOIN messybrainz.submissions s
+            ON lower(s.recording) = lower(t.recording)
+           AND lower(s.artist_credit) = lower(t.artist_credit)
+           AND lower(s.release) IS NOT DISTINCT FROM lower(t.release)
+           AND lower(s.track_number) IS NOT DISTINCT FROM lower(t.track_number)
+           AND s.duration IS NOT DISTINCT FROM t.duration
+      ORDER BY t.idx, s.submitted
+    """
+    template = "(%s::INT, %s::TEXT, %s::TEXT, %s::TEXT, %s::TEXT, %s::INT)"
+    results = execute_values(curs, query, values, template=template, fetch=True, page_size=len(values))
+    return {row[0]: row[1] for row in results}
+
+
+def bulk_submit_recordings(ts_curs, submissions: list[dict]) -> list[str]:
+    """ Submits a list of recordings to MessyBrainz and returns their msids. The caller is responsible for
+    committing the transaction.
+
+    Existing msids are resolved with a single lookup query and only the misses are inserted, with one
+    multi-row INSERT. Duplicate submissions within the batch are assigned the same msid. To handle other
+    writers concurrently inserting the same recordings, transaction level advisory locks are taken on the
+    missing submissions (in a consistent order to avoid deadlocks) and only those are looked up again before
+    inserting. This way a lost race only costs a second lookup of the affected submissions instead of a retry
+    of the whole batch.
+
+    Args:
+        ts_curs: a cursor on the timescale database
+        submissions: a list of recordings to be inserted
+    Returns:
+        A list of recording msids, in the same order as the given submissions
+    """
+    if not submissions:
+        return []
+
+    values = _submission_values(submissions)
+
+    msid_cache = get_msid_cache()
+    msids = {}
+    if msid_cache is not None:
+        cache_keys = [MsidCache.key(*row[1:]) for row in values]
+        cached = msid_cache.get_many(cache_keys)
+        msids = {row[0]: cached[key] for row, key in zip(values, cache_keys) if key in cached}
+
+    uncached = [row for row in values if row[0] not in msids]
+    msids.update(_bulk_get_msids(ts_curs, uncached))
+
+    missing = [row for row in uncached if row[0] not in msids]
+    if msid_cache is not None:
+        msid_cache.set_many({cache_keys[row[0]]: msids[row[0]] for row in uncached if row[0] in msids})
+    if not missing:
+        return [msids[idx] for idx in range(len(submissions))]
+
+    # group the misses by their case-insensitive identity so that duplicates in the batch
+    # are looked up and inserted only once.
+    groups: dict[int, list[tuple]] = {}
+    for row in missing:
+        groups.setdefault(_submission_lock_key(row), []).append(row)
+
+    ts_curs.execute("""
+        SELECT pg_advisory_xact_lock(lock_key)
+          FROM (SELECT lock_key FROM unnest(%s::BIGINT[]) AS lock_key ORDER BY lock_key) AS keys
+    """, (sorted(groups.keys()),))
+
+    # another writer may have inserted some of these while we were waiting for the locks
+    found = _bulk_get_msids(ts_curs, [rows[0] for rows in groups.values()])
+
+    to_insert = []
+    for rows in groups.values():
+        msid = found.get(rows[0][0])
+        if msid is None:
+            msid = str(uuid.uuid4())
+            to_insert.append((msid, *rows[0][1:]))
+        for row in rows:
+            msids[row[0]] = msid
+
+    if to_insert:
+        query = """
+            INSERT INTO messybrainz.submissions (gid, recording, artist_credit, release, track_number, duration)
+                 VALUES %s
+        """
+        template = "(%s::UUID, %s, %s, %s, %s, %s::INT)"
+        execute_values(ts_curs, query, to_insert, template=template, page_size=len(to_insert))
+
+    if msid_cache is not None:
+        # msids inserted by this transaction are not cached because the transaction may still be rolled back,
+        # the next lookup of these submissions will read them from the database and cache them. the ones
+        # inserted concurrently by other writers have been committed already.
+        concurrently_inserted = set(found.values())
+        msid_cache.set_many({
+            cache_keys[row[0]]: msids[row[0]] for row in missing if msids[row[0]] in concurrently_inserted
+        })
+
+    return [msids[idx] for idx in range(len(submissions))]
+
+
 def load_recordings_from_msids(ts_curs, messybrainz_ids: Iterable[str]) -> dict[str, dict]:
     """ Returns data for a recordings corresponding to a given list of MessyBrainz IDs.
     msids not found in the database are omitted from the returned dict (usually indicates the msid
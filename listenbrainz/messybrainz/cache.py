@@ -0,0 +1,111 @@
+""" A two level (in-process LRU and optionally redis) cache of msids of recently submitted recordings.
+
+The cache is keyed on the exact, non-normalized, (recording, artist_credit, release, track_number, duration)
+tuple of a submission. :func:`listenbrainz.messybrainz.get_msid` matches submissions case-insensitively, so the
+msid for a given exact tuple is also the msid for all its case variants, but lower() in python and postgres do not
+agree on all inputs so only exact repeats are served from the cache. Most listens are exact repeats of the same
+scrobbler output so this costs very few hits.
+
+Only msids which have been read back from the database are cached, never the ones inserted by the current
+transaction because it could still be rolled back. The msid read back is the earliest submitted msid for that
+submission and it doesn't change afterwards, so multiple writer processes can share the cache (and the redis
+tier) without coordination.
+"""
+import hashlib
+from typing import Optional
+
+from brainzutils import cache, metrics
+
+from listenbrainz.lru import LRUCache
+
+MSID_CACHE_KEY_PREFIX = "msb.msid."
+
+
+class MsidCache:
+    """ Cache of submission keys to msids, see the module docstring. """
+
+    def __init__(self, max_bytes: int, redis_expiry: Optional[int] = None):
+        """
+            Args:
+                max_bytes: the maximum memory to be used by the in-process LRU cache
+                redis_expiry: the expiry time of the entries in redis in seconds, None to disable the redis tier
+        """
+        self.local = LRUCache(max_bytes)
+        self.redis_expiry = redis_expiry
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @staticmethod
+    def key(recording, artist, release=None, track_number=None, duration=None) -> str:
+        """ Compute the cache key of a submission. """
+        parts = []
+        for value in (recording, artist, release, track_number, duration):
+            # distinguish None from the empty string
+            parts.append("\x01" if value is None else str(value))
+        digest = hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+        return MSID_CACHE_KEY_PREFIX + digest
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """ Return the cached msids for the given keys, keys not found in the cache are omitted. """
+        found = self.local.get_many(keys)
+        if self.redis_expiry is None or len(found) == len(keys):
+            return found
+
+        missing = [key for key in keys if key not in found]
+        try:
+            from_redis = {key: msid for key, msid in cache.get_many(missing).items() if msid is not None}
+        except Exception:
+            # the redis tier is only an optimization, fall back to the database
+            return found
+
+        self.redis_hits += len(from_redis)
+        self.redis_misses += len(missing) - len(from_redis)
+        self.local.set_many(from_redis)
+        found.update(from_redis)
+        return found
+
+    def set_many(self, mapping: dict[str, str]):
+        """ Add the given key to msid mapping to the cache. """
+        if not mapping:
+            return
+        self.local.set_many(mapping)
+        if self.redis_expiry is not None:
+            try:
+                cache.set_many(mapping, expirein=self.redis_expiry)
+            except Exception:
+                pass
+
+    def clear(self):
+        """ Clear the in-process cache. """
+        self.local.clear()
+
+    def submit_metrics(self):
+        """ Report the hit, miss and eviction counts since the last submission. """
+        stats = self.local.stats(reset=True)
+        metrics.set(
+            "messybrainz_msid_cache",
+            hits=stats["hits"],
+            misses=stats["misses"],
+            evictions=stats["evictions"],
+            entries=stats["entries"],
+            bytes=stats["bytes"],
+            redis_hits=self.redis_hits,
+            redis_misses=self.redis_misses
+        )
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+
+_msid_cache: Optional[MsidCache] = None
+
+
+def init_msid_cache(max_bytes: int, redis_expiry: Optional[int] = None):
+    """ Enable the msid cache for this process. The cache is disabled if max_bytes is 0. """
+    global _msid_cache
+    _msid_cache = MsidCache(max_bytes, redis_expiry) if max_bytes else None
+    return _msid_cache
+
+
+def get_msid_cache() -> Optional[MsidCache]:
+    """ Return the msid cache of this process, or None if it hasn't been enabled. """
+    return _msid_cache
@@ -11,3 +11,9 @@ class BadDataException(MessyBrainzException):
 class ErrorAddingException(MessyBrainzException):
     """Should be used when incorrect data is being submitted."""
     pass
+
+
+class TemporaryErrorException(ErrorAddingException):
+    """Should be used when data could not be added because of an error which may go away on retrying,
+    like a lost database connection."""
+    pass
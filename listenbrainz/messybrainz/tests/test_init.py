@@ -16,6 +16,7 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA)
 from datetime import datetime, timedelta
+from unittest import mock
 
 from psycopg2.extras import DictCursor
 from sqlalchemy import text
@@ -23,6 +24,7 @@ from sqlalchemy import text
 from listenbrainz import messybrainz
 from listenbrainz.db import timescale
 from listenbrainz.db.testing import TimescaleTestCase
+from listenbrainz.messybrainz.cache import init_msid_cache
 
 
 recording = {
@@ -150,3 +152,84 @@ class DataTestCase(TimescaleTestCase):
         }
 
         self.assertDictEqual(expected, received)
+
+    def test_bulk_submit_recordings(self):
+        """ Test that the bulk path reuses existing msids, dedups the batch case-insensitively and
+         agrees with the per-listen path. """
+        existing_msid = messybrainz.insert_all_in_transaction(self.ts_conn, [{
+            'artist': 'Frank Ocean',
+            'release': 'Blond',
+            'title': 'Pretty Sweet'
+        }])[0]
+
+        submissions = [
+            {'artist': 'FRANK OCEAN', 'release': 'BLoNd', 'title': 'PReTtY SWEET'},
+            {'artist': 'Frank Ocean', 'release': 'Blond', 'title': 'Nikes', 'duration': 314000},
+            {'artist': 'frank ocean', 'release': 'blond', 'title': 'nikes', 'duration': 314000},
+            {'artist': 'Frank Ocean', 'release': 'Blond', 'title': 'Nikes', 'track_number': '1'},
+        ]
+        with self.ts_conn.connection.cursor() as curs:
+            msids = messybrainz.bulk_submit_recordings(curs, submissions)
+        self.ts_conn.connection.commit()
+
+        self.assertEqual(len(msids), 4)
+        self.assertEqual(msids[0], existing_msid)
+        self.assertEqual(msids[1], msids[2])
+        self.assertNotEqual(msids[1], msids[3])
+        self.assertNotEqual(msids[0], msids[1])
+
+        # a second submission of the same batch should only hit existing rows
+        with self.ts_conn.connection.cursor() as curs:
+            self.assertEqual(msids, messybrainz.bulk_submit_recordings(curs, submissions))
+
+        self.assertEqual(msids[1], messybrainz.get_msid(
+            self.ts_conn, 'Nikes', 'Frank Ocean', 'Blond', duration=314000
+        ))
+
+    def test_bulk_submit_listens_earliest_msid(self):
+        """ Test that in case of duplicates the bulk path returns the earliest submitted msid """
+        args = {
+            "msid1": "0becc74d-9ba9-44c5-afa4-2f4ffe380d67",
+            "msid2": "9b750fdd-222e-4500-a22e-a0a942d5e342",
+            "recording": "05 Mentira ...",
+            "artist_credit": "Manu Chao",
+            "release": "Clandestino",
+            "submitted1": datetime.now(),
+            "submitted2": datetime.now() + timedelta(days=1)
+        }
+        self.ts_conn.execute(text("""
+            INSERT INTO messybrainz.submissions (gid, recording, artist_credit, release, submitted)
+                 VALUES (:msid2, :recording, :artist_credit, :release, :submitted2),
+                        (:msid1, :recording, :artist_credit, :release, :submitted1)
+        """), args)
+        self.ts_conn.commit()
+
+        msids = messybrainz.bulk_submit_listens([
+            {"title": args["recording"], "artist": args["artist_credit"], "release": args["release"]}
+        ])
+        self.assertEqual(msids, [args["msid1"]])
+
+    def test_msid_cache(self):
+        """ Test that msids are served from the cache once they have been read from the database and that
+         msids inserted by the transaction are not cached. """
+        msid_cache = init_msid_cache(1024 * 1024)
+        try:
+            submission = {'artist': 'Frank Ocean', 'release': 'Blond', 'title': 'Solo'}
+            with self.ts_conn.connection.cursor() as curs:
+                [msid] = messybrainz.bulk_submit_recordings(curs, [submission])
+            self.ts_conn.connection.commit()
+            self.assertEqual(len(msid_cache.local), 0)
+
+            with self.ts_conn.connection.cursor() as curs:
+                self.assertEqual([msid], messybrainz.bulk_submit_recordings(curs, [submission]))
+            self.assertEqual(len(msid_cache.local), 1)
+
+            # once cached, the database is not queried anymore
+            with mock.patch("listenbrainz.messybrainz._bulk_get_msids", return_value={}) as mock_lookup:
+                with self.ts_conn.connection.cursor() as curs:
+                    self.assertEqual([msid], messybrainz.bulk_submit_recordings(curs, [submission]))
+                self.assertEqual(msid, messybrainz.get_msid(self.ts_conn, 'Solo', 'Frank Ocean', 'Blond'))
+                mock_lookup.assert_called_once_with(mock.ANY, [])
+            self.assertEqual(msid_cache.local.stats()["hits"], 2)
+        finally:
+            init_msid_cache(0)
@@ -37,6 +37,7 @@ from listenbrainz.spark.handlers import (
     handle_echo,
     handle_sitewide_artist_map
 )
+from listenbrainz.db import couchdb
 from listenbrainz.spark.spark_dataset import CouchDbDataset, UserEntityStatsDataset, DailyActivityStatsDataset, \
     ListeningActivityStatsDataset, EntityListenerStatsDataset
 from listenbrainz.db.popularity import get_all_popularity_datasets
@@ -66,6 +67,10 @@ class BackgroundJobProcessor:
         2. Upon receiving a message, the RabbitMQ callback enqueues the message into the processor's message queue.
         3. The processor handles the message and, upon completion, enqueues the message into its acknowledgment queue.
         4. The main thread periodically checks the processor's acknowledgment queue for completed messages and acknowledges them.
+
+    Messages whose stats still conflicted with other writes in couchdb are put on the requeue queue instead, and the
+    main thread requeues them so that they are processed again. A message is requeued only once, if it conflicts
+    again when redelivered it is acknowledged like other failed messages.
     """
 
     def __init__(self, app):
@@ -74,6 +79,7 @@ class BackgroundJobProcessor:
         self.done = False
         self.internal_message_queue = Queue()
         self.internal_message_ack_queue = Queue()
+        self.internal_message_requeue_queue = Queue()
 
         self.datasets = [
             CouchDbDataset,
@@ -98,17 +104,29 @@ class BackgroundJobProcessor:
         """ Add a message for processing to internal queue """
         self.internal_message_queue.put(message, block=False)
 
-    def pending_acks(self):
-        """ Add a processed message to internal queue for acknowledging the message to rabbitmq. """
+    def backlog(self) -> int:
+        """ The number of messages waiting in the internal queue to be processed """
+        return self.internal_message_queue.qsize()
+
+    @staticmethod
+    def _drain(queue: Queue):
         messages = []
         while True:
             try:
-                message = self.internal_message_ack_queue.get(block=False)
+                message = queue.get(block=False)
                 messages.append(message)
             except Empty:
                 break
         return messages
 
+    def pending_acks(self):
+        """ Add a processed message to internal queue for acknowledging the message to rabbitmq. """
+        return self._drain(self.internal_message_ack_queue)
+
+    def pending_requeues(self):
+        """ Returns the messages which failed to be processed and should be requeued to rabbitmq. """
+        return self._drain(self.internal_message_requeue_queue)
+
     def run(self):
         """ Infinite loop that keeps processing messages enqueued in the internal message queue and puts them on
          ack queue if successfully processed.
@@ -117,8 +135,10 @@ class BackgroundJobProcessor:
             while not self.done:
                 try:
                     message = self.internal_message_queue.get(block=True, timeout=5)
-                    self.process_message(message)
-                    self.internal_message_ack_queue.put(message)
+                    if self.process_message(message):
+                        self.internal_message_ack_queue.put(message)
+                    else:
+                        self.internal_message_requeue_queue.put(message)
                 except Empty:
                     self.app.logger.debug("Empty internal message queue")
 
@@ -173,13 +193,16 @@ class BackgroundJobProcessor:
             "troi_playlists_end": handle_troi_playlists_end,
         })
 
-    def process_message(self, message):
-        """ Process a message received by the spark reader """
+    def process_message(self, message) -> bool:
+        """ Process a message received by the spark reader
+
+        Returns: False if the message should be requeued to be processed again, True if it should be acknowledged
+        """
         try:
             response = orjson.loads(message.body)
         except Exception:
             self.app.logger.error("Error processing message: %s", message)
-            return
+            return True
 
         try:
             response_type = response["type"]
@@ -187,16 +210,23 @@ class BackgroundJobProcessor:
         except (TypeError, KeyError):
             self.app.logger.error("Bad response sent to spark_reader: %s", json.dumps(response, indent=4),
                                   exc_info=True)
-            return
+            return True
 
         try:
             response_handler = self.response_handlers[response_type]
         except Exception:
             self.app.logger.error("Unknown response type: %s, doing nothing.", response_type, exc_info=True)
-            return
+            return True
 
         try:
             response_handler(response)
+        except couchdb.InsertConflictError as e:
+            if not message.delivery_info.get("redelivered"):
+                self.app.logger.warning("Requeuing %s message, some documents still conflict: %s", response_type, e)
+                return False
+            self.app.logger.error("Error in the spark reader response handler: data: %s",
+                                  json.dumps(response, indent=4), exc_info=True)
+            sentry_sdk.capture_exception(e)
         except Exception as e:
             self.app.logger.error("Error in the spark reader response handler: data: %s",
                                   json.dumps(response, indent=4), exc_info=True)
@@ -204,3 +234,4 @@ class BackgroundJobProcessor:
         finally:
             db_conn.rollback()
             ts_conn.rollback()
+        return True
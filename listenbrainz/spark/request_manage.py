@@ -142,6 +142,14 @@ def request_entity_stats(type_, range_, entity, database):
     send_request_to_spark_cluster(f"stats.entity.{type_}", **params)
 
 
+@cli.command(name="request_all_stats")
+@click.option("--range", 'range_', type=click.Choice(ALLOWED_STATISTICS_RANGE),
+              help="Time range of statistics to calculate", required=True)
+def request_all_stats(range_):
+    """ Send a request to calculate all user, sitewide and entity listener stats of the range in a single batch """
+    send_request_to_spark_cluster("stats.all", stats_range=range_)
+
+
 @cli.command(name="request_yim_new_release_stats")
 @click.option("--year", type=int, help="Year for which to calculate the stat",
               default=date.today().year)
@@ -530,20 +538,7 @@ def request_compact_listens():
 def cron_request_all_stats(ctx):
     ctx.invoke(request_import_pg_tables)
     for stats_range in ALLOWED_STATISTICS_RANGE:
-        for entity in ["artists", "releases", "recordings", "release_groups"]:
-            ctx.invoke(request_user_stats, type_="entity", range_=stats_range, entity=entity)
-
-        for stat in ["listening_activity", "daily_activity"]:
-            ctx.invoke(request_user_stats, type_=stat, range_=stats_range)
-
-        for entity in ["artists", "releases", "recordings", "release_groups"]:
-            ctx.invoke(request_sitewide_stats, type_="entity", range_=stats_range, entity=entity)
-
-        for stat in ["listening_activity"]:
-            ctx.invoke(request_sitewide_stats, type_=stat, range_=stats_range)
-
-        for entity in ["artists", "release_groups"]:
-            ctx.invoke(request_entity_stats, type_="listeners", range_=stats_range, entity=entity)
+        ctx.invoke(request_all_stats, range_=stats_range)
 
 
 @cli.command(name='cron_request_similar_users')
@@ -1,18 +1,18 @@
 import abc
+import os
 import time
 from abc import ABC
-from concurrent.futures import as_completed
 from concurrent.futures.thread import ThreadPoolExecutor
 from urllib.error import HTTPError
 
 from flask import current_app
-from more_itertools import chunked
 from psycopg2.extras import execute_values
 from psycopg2.sql import Identifier, SQL, Literal, Composable
 from sentry_sdk import start_transaction
 
 from listenbrainz.db import couchdb, timescale
 import listenbrainz.db.stats as db_stats
+from listenbrainz.spark import staging
 
 
 class SparkDataset(ABC):
@@ -101,15 +101,29 @@ class _CouchDbDataset(SparkDataset):
 CouchDbDataset = _CouchDbDataset()
 
 
-class _StatsDataset(SparkDataset):
+# the executor is shared by the stats datasets so that the number of concurrent insert
+# requests to couchdb is bounded by COUCHDB_INSERT_CONCURRENCY
+_insert_executor = None
+
+
+def _get_insert_executor():
+    global _insert_executor
+    if _insert_executor is None:
+        _insert_executor = ThreadPoolExecutor(
+            max_workers=current_app.config.get("COUCHDB_INSERT_CONCURRENCY", 4),
+            thread_name_prefix="couchdb-insert"
+        )
+    return _insert_executor
 
-    def __init__(self, stats_type):
-        super().__init__(stats_type)
-        # doing empirical testing for various numbers of workers, no speedup
-        # was observed by raising workers to more than 2 because the bottleneck
-        # shifted to stats generation in spark
-        self.workers = 2
-        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+def _shutdown_insert_executor():
+    global _insert_executor
+    if _insert_executor is not None:
+        _insert_executor.shutdown()
+        _insert_executor = None
+
+
+class _StatsDataset(SparkDataset):
 
     @abc.abstractmethod
     def get_key(self, message):
@@ -122,7 +136,9 @@ class _StatsDataset(SparkDataset):
                 from_ts,
                 to_ts,
                 data,
-                key
+                key,
+                executor=_get_insert_executor(),
+                max_chunk_bytes=current_app.config.get("COUCHDB_INSERT_CHUNK_BYTES", couchdb.INSERT_CHUNK_BYTES)
             )
 
     def handle_insert(self, message):
@@ -136,17 +152,15 @@ class _StatsDataset(SparkDataset):
 
         key = self.get_key(message)
 
-        futures = []
-        chunk_size = len(message["data"]) // self.workers
-        for chunk in chunked(message["data"], chunk_size):
-            f = self.executor.submit(self.insert_stats, database, stats_range, from_ts, to_ts, chunk, key)
-            futures.append(f)
-
-        for f in as_completed(futures):
-            try:
-                f.result()
-            except Exception:
-                current_app.logger.error(f"Error in writing {self.name} stats: %s", exc_info=True)
+        # the message is split into size bounded chunks which are inserted concurrently, this returns once all of
+        # them have been inserted so a slow couchdb slows down the processing of the spark reader's messages
+        try:
+            self.insert_stats(database, stats_range, from_ts, to_ts, message["data"], key)
+        except couchdb.InsertConflictError:
+            # part of the stats weren't written, let the spark reader retry the message instead of acking it
+            raise
+        except Exception:
+            current_app.logger.error(f"Error in writing {self.name} stats: %s", exc_info=True)
 
     def handle_start(self, message):
         raise NotImplementedError()
@@ -155,7 +169,7 @@ class _StatsDataset(SparkDataset):
         raise NotImplementedError()
 
     def handle_shutdown(self):
-        self.executor.shutdown()
+        _shutdown_insert_executor()
 
 
 class _UserStatsDataset(_StatsDataset):
@@ -237,6 +251,12 @@ class DatabaseDataset(SparkDataset, ABC):
         """
         raise NotImplementedError()
 
+    def get_copy(self, message, batch):
+        """ Return the rows of a record batch of a staged data message as a record batch with the columns of the
+        table, see :mod:`listenbrainz.spark.staging`. Only the datasets which spark stages need to implement it.
+        """
+        raise NotImplementedError()
+
     def run_post_processing(self, cursor, message):
         """ Called after the rotate table swap is complete so that the user can execute any post processing steps. """
         pass
@@ -296,7 +316,31 @@ class DatabaseDataset(SparkDataset, ABC):
         finally:
             conn.close()
 
+    def handle_staged_insert(self, message):
+        """ Copy the rows of the staged file of the message into the table and remove the file. """
+        path = staging.get_path(message["staged_file"])
+        if not os.path.exists(path):
+            # the file is removed once loaded, the message has been redelivered
+            current_app.logger.warning("Staged file %s not found, skipping it", path)
+            return
+
+        tmp_table = self._get_table_name("tmp")
+        conn = timescale.engine.raw_connection()
+        try:
+            with conn.cursor() as curs:
+                for batch in staging.read_batches(path):
+                    staging.copy_batch(curs, tmp_table, self.get_copy(message, batch))
+            conn.commit()
+        finally:
+            conn.close()
+            # the message isn't redelivered if the load fails, don't keep the file around
+            os.remove(path)
+
     def handle_insert(self, message):
+        if "staged_file" in message:
+            self.handle_staged_insert(message)
+            return
+
         query, template, values = self.get_inserts(message)
 
         if not isinstance(query, Composable):
@@ -21,6 +21,10 @@ class SparkReader(ConsumerMixin):
                                         durable=True)
         self.response_handlers = {}
         self.processor: BackgroundJobProcessor | None = None
+        self.consumer: Consumer | None = None
+        self.paused = False
+        # stop consuming when this many messages are waiting to be processed, 0 to never stop
+        self.max_backlog = app.config.get("SPARK_READER_MAX_BACKLOG", 0)
 
     def callback(self, message: Message):
         """ Handle the data received from the queue and insert into the database accordingly. """
@@ -29,17 +33,38 @@ class SparkReader(ConsumerMixin):
 
     def on_iteration(self):
         """ Executed periodically in the main consumption loop by kombu, we check for completed messages here
-         and acknowledge them. """
+         and acknowledge them, or requeue them if they should be processed again. """
         for message in self.processor.pending_acks():
             message.ack()
+        for message in self.processor.pending_requeues():
+            message.requeue()
+        self.apply_backpressure()
+
+    def apply_backpressure(self):
+        """ Stop consuming from the queue while the processor has max_backlog messages waiting, for instance because
+         couchdb slows down the inserts of stats, and resume once half of them have been processed. The messages
+         left in the queue are not delivered to this consumer in the meantime. """
+        if not self.max_backlog:
+            return
+        backlog = self.processor.backlog()
+        if not self.paused and backlog >= self.max_backlog:
+            self.app.logger.info("Pausing consumption, %d messages waiting to be processed", backlog)
+            self.consumer.cancel()
+            self.paused = True
+        elif self.paused and backlog <= self.max_backlog // 2:
+            self.app.logger.info("Resuming consumption, %d messages waiting to be processed", backlog)
+            self.consumer.consume()
+            self.paused = False
 
     def get_consumers(self, _, channel):
-        return [Consumer(
+        self.consumer = Consumer(
             channel,
             prefetch_count=PREFETCH_COUNT,
             queues=[self.spark_result_queue],
             on_message=lambda msg: self.callback(msg)
-        )]
+        )
+        self.paused = False
+        return [self.consumer]
 
     def init_rabbitmq_connection(self):
         self.connection = Connection(
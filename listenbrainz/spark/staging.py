@@ -0,0 +1,47 @@
+""" Loading of the datasets staged by spark as Arrow IPC files in the SPARK_RESULT_STAGING_DIR directory, see
+:mod:`listenbrainz_spark.staging`.
+
+The data messages of a staged dataset have a staged_file field with the name of the file relative to the staging
+directory instead of a data field. The file is read one record batch at a time, each batch is converted to the
+columns of the table with Arrow compute functions, written as CSV by Arrow and copied into postgres with COPY, so
+that the rows are never converted to Python objects.
+"""
+import io
+import os
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from flask import current_app
+from psycopg2.sql import SQL, Composable, Identifier
+
+# strings are always quoted and nulls are written as empty unquoted values, which COPY's csv format reads as NULL
+_CSV_WRITE_OPTIONS = pa_csv.WriteOptions(include_header=False, quoting_style="needed")
+
+
+def get_path(staged_file: str) -> str:
+    """ Return the path of a staged file in the staging directory. """
+    # only the file name is used, the staged files are always at the top level of the staging directory
+    return os.path.join(current_app.config["SPARK_RESULT_STAGING_DIR"], os.path.basename(staged_file))
+
+
+def read_batches(path: str) -> Iterator[pa.RecordBatch]:
+    """ Read the staged file one record batch at a time. """
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for idx in range(reader.num_record_batches):
+            yield reader.get_batch(idx)
+
+
+def copy_batch(cursor, table: Composable, batch: pa.RecordBatch):
+    """ Copy the rows of the batch into the table using COPY, each column of the batch into the column of the table
+    with the same name. """
+    buffer = io.BytesIO()
+    pa_csv.write_csv(batch, buffer, _CSV_WRITE_OPTIONS)
+    buffer.seek(0)
+
+    query = SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+        table=table,
+        columns=SQL(", ").join(Identifier(column) for column in batch.schema.names)
+    )
+    cursor.copy_expert(query, buffer)
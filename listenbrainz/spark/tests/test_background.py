@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+import orjson
+
+from listenbrainz.db.couchdb import InsertConflictError
+from listenbrainz.spark.background import BackgroundJobProcessor
+from listenbrainz.webserver import create_app
+
+
+def make_message(body, redelivered=False):
+    message = mock.MagicMock()
+    message.body = orjson.dumps(body)
+    message.delivery_info = {"redelivered": redelivered}
+    return message
+
+
+@mock.patch("listenbrainz.spark.background.ts_conn")
+@mock.patch("listenbrainz.spark.background.db_conn")
+class BackgroundJobProcessorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.processor = BackgroundJobProcessor(self.app)
+
+    def test_process_message(self, _, __):
+        handler = mock.MagicMock()
+        self.processor.response_handlers["test"] = handler
+        self.assertTrue(self.processor.process_message(make_message({"type": "test"})))
+        handler.assert_called_once_with({"type": "test"})
+
+        # other errors are logged and the message is acknowledged
+        handler.side_effect = Exception("error")
+        self.assertTrue(self.processor.process_message(make_message({"type": "test"})))
+
+    def test_process_message_insert_conflict(self, _, __):
+        self.processor.response_handlers["test"] = mock.MagicMock(
+            side_effect=InsertConflictError("database", ["1"])
+        )
+        # requeued the first time, acknowledged if it conflicts again once redelivered
+        self.assertFalse(self.processor.process_message(make_message({"type": "test"})))
+        self.assertTrue(self.processor.process_message(make_message({"type": "test"}, redelivered=True)))
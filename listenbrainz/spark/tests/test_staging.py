@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+import pyarrow as pa
+from psycopg2.sql import Identifier
+from sqlalchemy import text
+
+from listenbrainz.db import timescale
+from listenbrainz.db.similarity import SimilarRecordingsDataset
+from listenbrainz.db.tags import TagsDataset
+from listenbrainz.db.testing import TimescaleTestCase
+from listenbrainz.spark import staging
+from listenbrainz.webserver import create_app
+
+
+class StagingTestCase(TimescaleTestCase):
+
+    def setUp(self):
+        super(StagingTestCase, self).setUp()
+        self.staging_dir = tempfile.mkdtemp()
+        self.app = create_app()
+        self.app.config["SPARK_RESULT_STAGING_DIR"] = self.staging_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.staging_dir)
+        super(StagingTestCase, self).tearDown()
+
+    def write_staged_file(self, name, schema, batches):
+        path = os.path.join(self.staging_dir, name)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for rows in batches:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+        return path
+
+    def test_staged_similarity_dataset(self):
+        schema = pa.schema([("mbid0", pa.string()), ("mbid1", pa.string()), ("score", pa.int64())])
+        rows = [
+            {"mbid0": "e97f805a-ab48-4c52-855e-07049142113d", "mbid1": "1e9f9c3b-4bdb-4b29-9a25-c1a2e1a0d5d0", "score": 5},
+            {"mbid0": "1e9f9c3b-4bdb-4b29-9a25-c1a2e1a0d5d0", "mbid1": "7f8a7d8a-5e6f-4cb5-9d5e-8a3a1e5b2f60", "score": 3},
+        ]
+        path = self.write_staged_file("similarity_recording-1.arrow", schema, [rows[:1], rows[1:]])
+
+        with self.app.app_context():
+            SimilarRecordingsDataset.handle_start({"algorithm": "test"})
+            SimilarRecordingsDataset.handle_insert({
+                "type": "similarity_recording",
+                "algorithm": "test",
+                "staged_file": "similarity_recording-1.arrow",
+                "is_production_dataset": True
+            })
+            SimilarRecordingsDataset.handle_end({"algorithm": "test"})
+
+        self.assertFalse(os.path.exists(path))
+        result = self.ts_conn.execute(text("""
+            SELECT mbid0::text, mbid1::text, score FROM similarity.recording ORDER BY score DESC
+        """))
+        self.assertEqual([dict(row) for row in result.mappings()], rows)
+
+    def test_tags_dataset_copy(self):
+        schema = pa.schema([
+            ("recording_mbid", pa.string()),
+            ("tags", pa.list_(pa.struct([("tag", pa.string()), ("tag_count", pa.int64()), ("_percent", pa.float64())])))
+        ])
+        batch = pa.RecordBatch.from_pylist([{
+            "recording_mbid": "e97f805a-ab48-4c52-855e-07049142113d",
+            "tags": [
+                {"tag": "rock", "tag_count": 3, "_percent": 0.5},
+                {"tag": "electronic", "tag_count": 1, "_percent": 1.0},
+            ]
+        }, {
+            "recording_mbid": "1e9f9c3b-4bdb-4b29-9a25-c1a2e1a0d5d0",
+            "tags": [{"tag": "jazz", "tag_count": 2, "_percent": 0.0}]
+        }], schema=schema)
+        copy = TagsDataset.get_copy({"source": "artist"}, batch)
+        self.assertEqual(copy.schema.names, ["recording_mbid", "tag", "tag_count", "percent", "source"])
+        self.assertEqual(copy.to_pylist(), [
+            {"recording_mbid": "e97f805a-ab48-4c52-855e-07049142113d", "tag": "rock", "tag_count": 3,
+             "percent": 0.5, "source": "artist"},
+            {"recording_mbid": "e97f805a-ab48-4c52-855e-07049142113d", "tag": "electronic", "tag_count": 1,
+             "percent": 1.0, "source": "artist"},
+            {"recording_mbid": "1e9f9c3b-4bdb-4b29-9a25-c1a2e1a0d5d0", "tag": "jazz", "tag_count": 2,
+             "percent": 0.0, "source": "artist"},
+        ])
+
+    def test_copy_batch(self):
+        values = ["rock", "drum\tand\\bass\r\n", "with \"quotes\", and commas", "", None]
+        batch = pa.RecordBatch.from_pydict({"id": list(range(len(values))), "value": values})
+        conn = timescale.engine.raw_connection()
+        try:
+            with conn.cursor() as curs:
+                curs.execute("CREATE TEMPORARY TABLE staging_test (id INTEGER, value TEXT)")
+                staging.copy_batch(curs, Identifier("staging_test"), batch)
+                curs.execute("SELECT value FROM staging_test ORDER BY id")
+                self.assertEqual([row[0] for row in curs.fetchall()], values)
+        finally:
+            conn.close()
+
+    def test_staged_file_missing(self):
+        with self.app.app_context():
+            # a redelivered message whose file has already been loaded and removed is skipped
+            SimilarRecordingsDataset.handle_insert({
+                "type": "similarity_recording",
+                "algorithm": "test",
+                "staged_file": "similarity_recording-missing.arrow",
+                "is_production_dataset": True
+            })
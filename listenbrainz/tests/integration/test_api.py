@@ -7,6 +7,7 @@ from psycopg2.extras import execute_values
 import requests_mock
 
 import listenbrainz.db.user as db_user
+from listenbrainz.db import auth_token_cache
 import listenbrainz.db.user_relationship as db_user_relationship
 from data.model.external_service import ExternalServiceType
 from listenbrainz.tests.integration import ListenAPIIntegrationTestCase
@@ -942,6 +943,56 @@ class APITestCase(ListenAPIIntegrationTestCase):
         self.assertTrue(response.json['valid'])
         self.assertEqual(response.json['user_name'], self.user['musicbrainz_id'])
 
+    def test_auth_token_cache(self):
+        """ Test that authenticated users are served from the token cache and that resetting the token
+         invalidates the cached entry """
+        with open(self.path_to_data_file('valid_single.json'), 'r') as f:
+            payload = json.load(f)
+
+        self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 60
+        try:
+            response = self.send_data(payload)
+            self.assert200(response)
+
+            with patch.object(db_user, "get_by_token", wraps=db_user.get_by_token) as mock_get_by_token:
+                response = self.send_data(payload)
+                self.assert200(response)
+                mock_get_by_token.assert_not_called()
+
+            db_user.update_token(self.db_conn, self.user["id"])
+            response = self.send_data(payload)
+            self.assert401(response)
+            self.assertEqual(response.json["error"], "Invalid authorization token.")
+        finally:
+            self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 0
+
+    def test_auth_token_cache_without_credentials(self):
+        """ Test that neither the email nor the API token of the user is cached """
+        self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 60
+        try:
+            generation = auth_token_cache.get_generation()
+            user = db_user.get_by_token(self.db_conn, self.user["auth_token"], fetch_email=True)
+            auth_token_cache.put("meba_test_token", user, generation)
+            cached_user = auth_token_cache.get("meba_test_token")["user"]
+            self.assertEqual(cached_user["id"], self.user["id"])
+            self.assertNotIn("auth_token", cached_user)
+            self.assertNotIn("email", cached_user)
+        finally:
+            auth_token_cache.invalidate(self.user["id"])
+            self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 0
+
+    def test_auth_token_cache_invalidated_during_lookup(self):
+        """ Test that a user looked up before an invalidation isn't cached after it """
+        self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 60
+        try:
+            generation = auth_token_cache.get_generation()
+            user = db_user.get_by_token(self.db_conn, self.user["auth_token"], fetch_email=True)
+            db_user.update_token(self.db_conn, self.user["id"])
+            auth_token_cache.put(self.user["auth_token"], user, generation)
+            self.assertIsNone(auth_token_cache.get(self.user["auth_token"]))
+        finally:
+            self.app.config["AUTH_TOKEN_CACHE_EXPIRY"] = 0
+
     @requests_mock.Mocker()
     def test_oauth_invalid_access_token(self, mock_requests):
         """Test oauth access tokens for submit listens"""
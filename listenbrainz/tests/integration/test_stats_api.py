@@ -1,3 +1,4 @@
+import gzip
 import json
 from copy import deepcopy
 from datetime import datetime
@@ -14,7 +15,7 @@ import requests_mock
 from data.model.user_artist_map import UserArtistMapRecord
 
 from listenbrainz.config import LISTENBRAINZ_LABS_API_URL
-from listenbrainz.db import couchdb
+from listenbrainz.db import couchdb, stats_response_cache, user_identity_cache
 from listenbrainz.spark.handlers import handle_entity_listener
 from listenbrainz.tests.integration import IntegrationTestCase
 
@@ -324,6 +325,103 @@ class StatsAPITestCase(IntegrationTestCase):
                                                query_string={'range': range_})
                     self.assertUserStatEqual(payload, response, entity, range_, total_count_key, payload[0]['count'])
 
+    def test_users_entity_stat(self):
+        """ Test the stats of many users are returned by the bulk endpoint """
+        another_payload = deepcopy(self.user_artist_payload)
+        another_payload[0]["user_id"] = self.another_user["id"]
+        another_payload[0]["data"] = another_payload[0]["data"][:3]
+        db_stats.insert("artists_all_time_20220718", 0, 5, another_payload)
+
+        user_names = [self.user["musicbrainz_id"], self.another_user["musicbrainz_id"],
+                      self.no_stat_user["musicbrainz_id"], "nouser"]
+        response = self.client.get(self.custom_url_for("stats_api_v1.get_users_entity", entity="artists"),
+                                   query_string={"user_names": ",".join(user_names), "count": 5})
+        self.assert200(response)
+        received = orjson.loads(response.data)["payload"]
+        self.assertEqual(received["range"], "all_time")
+        self.assertCountEqual(received["users"].keys(),
+                              [self.user["musicbrainz_id"], self.another_user["musicbrainz_id"]])
+
+        for user_name, payload, count in [(self.user["musicbrainz_id"], self.user_artist_payload, 5),
+                                          (self.another_user["musicbrainz_id"], another_payload, 3)]:
+            stats = received["users"][user_name]
+            self.assertEqual(stats["count"], count)
+            self.assertEqual(stats["total_artist_count"], payload[0]["count"])
+            self.assertEqual(stats["from_ts"], 0)
+            self.assertEqual(stats["to_ts"], 5)
+            self.assertListEqual(stats["artists"], payload[0]["data"][:count])
+
+        response = self.client.get(self.custom_url_for("stats_api_v1.get_users_entity", entity="release-groups"),
+                                   query_string={"user_names": self.user["musicbrainz_id"]})
+        self.assert200(response)
+        stats = orjson.loads(response.data)["payload"]["users"][self.user["musicbrainz_id"]]
+        self.assertListEqual(stats["release_groups"], self.user_release_group_payload[0]["data"][:25])
+
+        response = self.client.get(self.custom_url_for("stats_api_v1.get_users_entity", entity="artists"),
+                                   query_string={"user_names": ",".join(f"user{i}" for i in range(101))})
+        self.assert400(response)
+
+        response = self.client.get(self.custom_url_for("stats_api_v1.get_users_entity", entity="artists"))
+        self.assert400(response)
+
+        response = self.client.get(self.custom_url_for("stats_api_v1.get_users_entity", entity="foobar"),
+                                   query_string={"user_names": self.user["musicbrainz_id"]})
+        self.assert404(response)
+
+    def test_user_entity_stat_response_cache(self):
+        """ Test the stats responses are cached, revalidated with etags and invalidated when new stats arrive """
+        self.app.config["STATS_RESPONSE_CACHE_EXPIRY"] = 60
+        self.app.config["STATS_RESPONSE_CACHE_COMPRESS_MIN_BYTES"] = 1024
+        url = self.custom_url_for("stats_api_v1.get_artist", user_name=self.user["musicbrainz_id"])
+
+        with patch("listenbrainz.db.stats.get", wraps=db_stats.get) as get_stats:
+            response = self.client.get(url, query_string={"count": 5})
+            self.assertUserStatEqual(self.user_artist_payload, response, "artists", "all_time", "total_artist_count", 5)
+            etag = response.headers["ETag"]
+
+            response = self.client.get(url, query_string={"count": 5})
+            self.assertUserStatEqual(self.user_artist_payload, response, "artists", "all_time", "total_artist_count", 5)
+            self.assertEqual(response.headers["ETag"], etag)
+            self.assertEqual(get_stats.call_count, 1)
+
+            response = self.client.get(url, query_string={"count": 5}, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+
+            # a different count is cached separately, large responses are sent compressed if the client accepts it
+            response = self.client.get(url, query_string={"count": 100}, headers={"Accept-Encoding": "gzip"})
+            self.assert200(response)
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            payload = orjson.loads(gzip.decompress(response.data))["payload"]
+            self.assertListEqual(payload["artists"], self.user_artist_payload[0]["data"][:100])
+            self.assertEqual(get_stats.call_count, 2)
+
+            # inserting new stats for the user invalidates the cached responses
+            new_payload = deepcopy(self.user_artist_payload)
+            new_payload[0]["data"] = new_payload[0]["data"][:2]
+            new_payload[0]["count"] = 2
+            db_stats.insert("artists_all_time_20220718", 0, 5, new_payload)
+            response = self.client.get(url, query_string={"count": 5}, headers={"If-None-Match": etag})
+            self.assertUserStatEqual(new_payload, response, "artists", "all_time", "total_artist_count", 2)
+            self.assertNotEqual(response.headers["ETag"], etag)
+            self.assertEqual(get_stats.call_count, 3)
+
+    def test_user_entity_stat_response_cache_staleness(self):
+        """ Test that responses built before an invalidation aren't cached, and that cached responses aren't served
+         once the databases of the stat change """
+        self.app.config["STATS_RESPONSE_CACHE_EXPIRY"] = 60
+        prefix, user_id = "artists_all_time", self.user["id"]
+        databases = stats_response_cache.get_databases(prefix)
+
+        version = stats_response_cache.get_version(prefix, user_id)
+        stats_response_cache.invalidate(prefix, [user_id])
+        stats_response_cache.put(prefix, user_id, "variant", b"{}", 0.1, databases, version)
+        self.assertIsNone(stats_response_cache.get(prefix, user_id, "variant", databases))
+
+        version = stats_response_cache.get_version(prefix, user_id)
+        stats_response_cache.put(prefix, user_id, "variant", b"{}", 0.1, databases, version)
+        self.assertIsNotNone(stats_response_cache.get(prefix, user_id, "variant", databases))
+        self.assertIsNone(stats_response_cache.get(prefix, user_id, "variant", "artists_all_time_20220801"))
+
     def test_listening_activity_stat(self):
         endpoint = self.non_entity_endpoints["listening_activity"]["endpoint"]
         with self.subTest(f"test valid response is received for listening_activity stats"):
@@ -462,6 +560,37 @@ class StatsAPITestCase(IntegrationTestCase):
             "to_ts": data["to_ts"],
         })
 
+    def test_artist_listeners_user_identity_cache(self):
+        """ Test that the listeners' user names are served from the user identity cache and that renaming a
+         user invalidates the cached name """
+        self._setup_listener_stats("artists_listeners_db_data_for_api_test.json")
+        url = self.custom_url_for("stats_api_v1.get_artist_listeners", artist_mbid="056e4f3e-d505-4dad-8ec1-d04f521cbb56")
+
+        self.app.config["USER_IDENTITY_CACHE_EXPIRY"] = 60
+        try:
+            response = self.client.get(url)
+            self.assert200(response)
+
+            with patch.object(db_user, "get_users_by_id", wraps=db_user.get_users_by_id) as mock_get_users_by_id:
+                response = self.client.get(url)
+                self.assert200(response)
+                mock_get_users_by_id.assert_not_called()
+            self.assertEqual(
+                [listener["user_name"] for listener in response.json["payload"]["listeners"]],
+                [self.another_user["musicbrainz_id"], self.user["musicbrainz_id"]]
+            )
+
+            db_user.update_user_details(self.db_conn, self.user["id"], "renamed-listener", "renamed@example.com")
+            response = self.client.get(url)
+            self.assert200(response)
+            self.assertEqual(
+                [listener["user_name"] for listener in response.json["payload"]["listeners"]],
+                [self.another_user["musicbrainz_id"], "renamed-listener"]
+            )
+        finally:
+            self.app.config["USER_IDENTITY_CACHE_EXPIRY"] = 0
+            user_identity_cache._get_local().clear()
+
     def test_release_group_listeners_stats(self):
         data = self._setup_listener_stats("release_groups_listeners_db_data_for_api_test.json")
 
@@ -0,0 +1,55 @@
+import copy
+import time
+import unittest
+import uuid
+
+from listenbrainz.webserver.errors import APIBadRequest, ListenValidationError
+from listenbrainz.webserver.views.api_tools import validate_listen, validate_listens, LISTEN_TYPE_IMPORT
+
+
+class ValidateListensTestCase(unittest.TestCase):
+
+    def make_listen(self, **additional_info):
+        return {
+            "listened_at": int(time.time()) - 60,
+            "track_metadata": {
+                "artist_name": " Kishore Kumar ",
+                "track_name": "Saamne Ye Kaun Aaya",
+                "additional_info": {
+                    "recording_mbid": str(uuid.uuid4()).upper(),
+                    "artist_mbids": [str(uuid.uuid4()), ""],
+                    "duration_ms": "300000",
+                    **additional_info
+                }
+            }
+        }
+
+    def test_matches_validate_listen(self):
+        listens = [
+            self.make_listen(),
+            self.make_listen(release_mbid="not an mbid"),
+            self.make_listen(tags=["\u0000tag"]),
+            self.make_listen(duration=300, release_group_mbid="{%s}" % uuid.uuid4()),
+        ]
+        listens[3]["listened_at"] = int(time.time()) + 7 * 24 * 60 * 60
+
+        expected = []
+        for listen in copy.deepcopy(listens):
+            try:
+                expected.append(validate_listen(listen, LISTEN_TYPE_IMPORT))
+            except (ListenValidationError, APIBadRequest) as err:
+                expected.append(err.message)
+
+        validated, errors = validate_listens(listens, LISTEN_TYPE_IMPORT)
+        self.assertEqual(validated, [expected[0]])
+        self.assertEqual([idx for idx, _ in errors], [1, 2, 3])
+        self.assertEqual([err.message for _, err in errors], expected[1:])
+        self.assertEqual(validated[0]["track_metadata"]["artist_name"], "Kishore Kumar")
+        self.assertEqual(validated[0]["track_metadata"]["additional_info"]["duration_ms"], 300000)
+        self.assertEqual(len(validated[0]["track_metadata"]["additional_info"]["artist_mbids"]), 1)
+
+    def test_unicode_null_check_skipped(self):
+        listens = [self.make_listen(tags=["\u0000tag"])]
+        validated, errors = validate_listens(listens, LISTEN_TYPE_IMPORT, check_unicode_null=False)
+        self.assertEqual(len(validated), 1)
+        self.assertEqual(errors, [])
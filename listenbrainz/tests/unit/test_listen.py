@@ -1,5 +1,5 @@
 import unittest
-from listenbrainz.listen import Listen
+from listenbrainz.listen import Listen, ListenBatch
 from datetime import datetime
 import time
 import uuid
@@ -102,3 +102,65 @@ class ListenTestCase(unittest.TestCase):
         listen = Listen.from_json(json_row)
 
         self.assertEqual(listen.timestamp, json_row['listened_at'])
+
+
+class ListenBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.listens = [
+            {
+                "user_id": 1,
+                "user_name": "testuser",
+                "listened_at": 1525557084 + i,
+                "recording_msid": str(uuid.uuid4()),
+                "track_metadata": {
+                    "artist_name": "Radiohead",
+                    "track_name": "True Love Waits %d" % i,
+                    "additional_info": {
+                        "recording_msid": "should not be stored",
+                        "nested": {"key": "value"}
+                    }
+                }
+            }
+            for i in range(3)
+        ]
+
+    def test_conversions_match_listen(self):
+        batch = ListenBatch.from_json_many(self.listens)
+        listens = [Listen.from_json(orjson.loads(orjson.dumps(listen))) for listen in self.listens]
+        self.assertEqual(len(batch), 3)
+
+        self.assertEqual(batch.to_timescale_rows(), [listen.to_timescale() for listen in listens])
+        self.assertEqual(batch.to_api_many(), [listen.to_api() for listen in listens])
+        self.assertEqual(
+            [orjson.loads(document) for document in batch.to_api_json_many()],
+            [listen.to_api() for listen in listens]
+        )
+        self.assertEqual(
+            [orjson.loads(document) for document in batch.to_json_many()],
+            [listen.to_json() for listen in listens]
+        )
+        self.assertEqual(
+            [listen.to_json() for listen in batch.to_listens()],
+            [listen.to_json() for listen in listens]
+        )
+        self.assertEqual(ListenBatch.from_listens(listens).to_timescale_rows(), batch.to_timescale_rows())
+
+    def test_from_json_many_skips_invalid_timestamps(self):
+        self.listens[1]["listened_at"] = "invalid"
+        batch = ListenBatch.from_json_many(self.listens)
+        self.assertEqual(list(batch.timestamps), [1525557084, 1525557086])
+        # the submitted dicts are left untouched
+        self.assertEqual(self.listens[0]["track_metadata"]["additional_info"]["nested"], {"key": "value"})
+
+    def test_select(self):
+        batch = ListenBatch.from_json_many(self.listens)
+        selected = batch.select([2, 0])
+        self.assertEqual(list(selected.keys()), [
+            (1525557086, 1, self.listens[2]["recording_msid"]),
+            (1525557084, 1, self.listens[0]["recording_msid"])
+        ])
+        self.assertEqual(
+            orjson.loads(ListenBatch.join_json(selected.to_json_many()))[0]["track_metadata"]["track_name"],
+            "True Love Waits 2"
+        )
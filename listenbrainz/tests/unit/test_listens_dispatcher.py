@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+import orjson
+
+from listenbrainz.websockets.listens_dispatcher import ListensDispatcher
+
+
+def make_listen(user_name, ts):
+    return {
+        "user_id": 1,
+        "user_name": user_name,
+        "timestamp": ts,
+        "recording_msid": "db9a7483-a8f4-4a2c-99af-c8ab58850200",
+        "track_metadata": {"artist_name": "Kanye West", "track_name": "Fade", "additional_info": {}}
+    }
+
+
+class ListensDispatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = mock.MagicMock()
+        self.app.config = {
+            "UNIQUE_EXCHANGE": "unique",
+            "PLAYING_NOW_EXCHANGE": "playing_now",
+            "WEBSOCKETS_QUEUE": "websockets",
+            "PLAYING_NOW_QUEUE": "playing_now",
+        }
+        self.socketio = mock.MagicMock()
+        self.socketio.server.manager.rooms = {"/": {"iliekcomputers": {"sid": "eio_sid"}, "empty": {}}}
+        self.message = mock.MagicMock()
+        self.message.body = orjson.dumps([
+            make_listen("iliekcomputers", 1525557084),
+            make_listen("lucifer", 1525557085),
+            make_listen("empty", 1525557086),
+            make_listen("iliekcomputers", 1525557087),
+        ])
+
+    def test_send_listens(self):
+        dispatcher = ListensDispatcher(self.app, self.socketio)
+        dispatcher.send_listens("listen", self.message)
+
+        self.assertEqual(self.socketio.emit.call_count, 2)
+        for call, ts in zip(self.socketio.emit.call_args_list, [1525557084, 1525557087]):
+            event_name, document = call.args
+            self.assertEqual(event_name, "listen")
+            self.assertEqual(call.kwargs, {"to": "iliekcomputers"})
+            self.assertEqual(orjson.loads(document)["listened_at"], ts)
+        self.message.ack.assert_called_once()
+        self.assertEqual(dispatcher.dropped_listens, 2)
+
+    def test_send_listens_batched(self):
+        self.app.config["WEBSOCKETS_BATCH_EVENTS"] = True
+        dispatcher = ListensDispatcher(self.app, self.socketio)
+        dispatcher.send_listens("listen", self.message)
+
+        self.socketio.emit.assert_called_once()
+        event_name, document = self.socketio.emit.call_args.args
+        self.assertEqual(event_name, "listens")
+        listens = orjson.loads(document)
+        self.assertEqual([listen["listened_at"] for listen in listens], [1525557084, 1525557087])
+        self.assertEqual(listens[0]["track_metadata"]["track_name"], "Fade")
+        self.message.ack.assert_called_once()
+
+    def test_send_playing_now(self):
+        dispatcher = ListensDispatcher(self.app, self.socketio)
+        dispatcher.send_listens("playing_now", self.message)
+
+        self.assertEqual(self.socketio.emit.call_count, 2)
+        event_name, document = self.socketio.emit.call_args.args
+        self.assertEqual(event_name, "playing_now")
+        self.assertTrue(orjson.loads(document)["playing_now"])
+
+    def test_exclusive_queues(self):
+        shared = ListensDispatcher(self.app, self.socketio)
+        self.assertEqual(shared.websockets_queue.name, "websockets")
+        self.assertTrue(shared.websockets_queue.durable)
+
+        self.app.config["WEBSOCKETS_EXCLUSIVE_QUEUES"] = True
+        first, second = ListensDispatcher(self.app, self.socketio), ListensDispatcher(self.app, self.socketio)
+        for dispatcher in (first, second):
+            for queue in (dispatcher.websockets_queue, dispatcher.playing_now_queue):
+                self.assertTrue(queue.exclusive)
+                self.assertTrue(queue.auto_delete)
+        self.assertNotEqual(first.websockets_queue.name, second.websockets_queue.name)
+        self.assertTrue(first.websockets_queue.name.startswith("websockets."))
+        self.assertIsNone(shared.playlist_queue)
+        self.assertTrue(first.playlist_queue.exclusive)
+        self.assertNotEqual(first.playlist_queue.name, second.playlist_queue.name)
+
+    def test_send_playlist_update(self):
+        self.app.config["WEBSOCKETS_EXCLUSIVE_QUEUES"] = True
+        dispatcher = ListensDispatcher(self.app, self.socketio)
+        for room in ["iliekcomputers", "lucifer"]:
+            message = mock.MagicMock()
+            message.body = orjson.dumps({"playlist_id": room, "data": {"identifier": room}})
+            dispatcher.send_playlist_update(message)
+            message.ack.assert_called_once()
+
+        self.socketio.emit.assert_called_once_with(
+            "playlist_changed", {"identifier": "iliekcomputers"}, to="iliekcomputers"
+        )
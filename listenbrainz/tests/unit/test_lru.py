@@ -0,0 +1,67 @@
+import unittest
+from unittest import mock
+
+from listenbrainz.lru import LRUCache, approximate_size, ENTRY_OVERHEAD_BYTES
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = LRUCache(max_bytes=10000)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "1")
+        cache.set("b", None)
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get_many(["a", "b"]), {"a": "1"})
+        self.assertEqual(cache.stats(), {
+            "hits": 2,
+            "misses": 3,
+            "evictions": 0,
+            "entries": 1,
+            "bytes": approximate_size("a") + approximate_size("1") + ENTRY_OVERHEAD_BYTES
+        })
+
+    def test_evicts_least_recently_used(self):
+        entry_size = approximate_size("a") + approximate_size("1") + ENTRY_OVERHEAD_BYTES
+        cache = LRUCache(max_bytes=entry_size * 2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        # touch a so that b becomes the least recently used entry
+        self.assertEqual(cache.get("a"), "1")
+        cache.set("c", "3")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(cache.stats(reset=True)["evictions"], 1)
+        self.assertEqual(cache.stats()["evictions"], 0)
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+
+    def test_oversized_value_not_cached(self):
+        cache = LRUCache(max_bytes=100)
+        cache.set("a", "x" * 1000)
+        self.assertIsNone(cache.get("a"))
+
+    @mock.patch("listenbrainz.lru.time.monotonic")
+    def test_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = LRUCache(max_bytes=10000, ttl=10)
+        cache.set("a", "1")
+        cache.set("b", "2", ttl=100)
+        mock_monotonic.return_value = 111
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "2")
+        self.assertEqual(len(cache), 1)
+
+    def test_delete_and_clear(self):
+        cache = LRUCache(max_bytes=10000)
+        cache.set_many({"a": "1", "b": "2", "c": "3"})
+        cache.delete("a")
+        self.assertNotIn("a", cache)
+        cache.delete_many(["b", "d"])
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.current_bytes, 0)
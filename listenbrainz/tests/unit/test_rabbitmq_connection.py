@@ -0,0 +1,60 @@
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+from listenbrainz.webserver.rabbitmq_connection import PublisherConfirms, get_publisher_confirms
+
+
+class FakeChannel:
+
+    def __init__(self):
+        self.events = defaultdict(set)
+        self.confirm_select = mock.MagicMock()
+        self.connection = mock.MagicMock()
+
+
+class PublisherConfirmsTestCase(unittest.TestCase):
+
+    def test_confirm_mode_enabled_once(self):
+        channel = FakeChannel()
+        confirms = get_publisher_confirms(channel)
+        self.assertIs(get_publisher_confirms(channel), confirms)
+        channel.confirm_select.assert_called_once()
+
+    def test_wait(self):
+        channel = FakeChannel()
+        confirms = PublisherConfirms(channel)
+        tags = {confirms.published() for _ in range(3)}
+        self.assertEqual(tags, {1, 2, 3})
+
+        def drain_events(timeout):
+            for callback in channel.events["basic_ack"]:
+                callback(1, False)
+                callback(3, True)
+        channel.connection.drain_events.side_effect = drain_events
+
+        confirms.wait(tags, timeout=1)
+        channel.connection.drain_events.assert_called_once()
+        self.assertEqual(confirms.pending, set())
+
+    def test_wait_nacked(self):
+        channel = FakeChannel()
+        confirms = PublisherConfirms(channel)
+        tags = {confirms.published(), confirms.published()}
+
+        def drain_events(timeout):
+            for callback in channel.events["basic_ack"]:
+                callback(1, False)
+            for callback in channel.events["basic_nack"]:
+                callback(2, False, False)
+        channel.connection.drain_events.side_effect = drain_events
+
+        with self.assertRaises(ConnectionError):
+            confirms.wait(tags, timeout=1)
+
+    def test_wait_timeout(self):
+        channel = FakeChannel()
+        confirms = PublisherConfirms(channel)
+        tags = {confirms.published()}
+        with self.assertRaises(TimeoutError):
+            confirms.wait(tags, timeout=0)
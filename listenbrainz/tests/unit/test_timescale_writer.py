@@ -0,0 +1,130 @@
+import unittest
+from unittest import mock
+
+import orjson
+
+from listenbrainz.timescale_writer.timescale_writer import TimescaleWriterSubscriber, LISTEN_INSERT_ERROR_SENTINEL
+from listenbrainz.webserver import create_app
+
+
+def make_message(listens):
+    message = mock.MagicMock()
+    message.body = orjson.dumps(listens)
+    return message
+
+
+class TimescaleWriterBatchingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(debug=True)
+        self.app.config["TIMESCALE_WRITER_BATCH_MAX_LISTENS"] = 3
+        self.app.config["TIMESCALE_WRITER_BATCH_MAX_DELAY_MS"] = 100
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.writer = TimescaleWriterSubscriber()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_batch_flushed_on_size(self, mock_lookup, mock_insert):
+        mock_lookup.return_value = []
+        mock_insert.return_value = 0
+        first, second = make_message([{"a": 1}, {"a": 2}]), make_message([{"a": 3}])
+
+        self.assertIsNone(self.writer.callback(first))
+        mock_lookup.assert_not_called()
+        first.ack.assert_not_called()
+
+        self.writer.callback(second)
+        mock_lookup.assert_called_once_with([{"a": 1}, {"a": 2}, {"a": 3}])
+        mock_insert.assert_called_once()
+        first.ack.assert_called_once()
+        second.ack.assert_called_once()
+        self.assertEqual(self.writer.pending_messages, [])
+
+    @mock.patch("listenbrainz.timescale_writer.timescale_writer.monotonic")
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_batch_flushed_on_delay(self, mock_lookup, mock_insert, mock_monotonic):
+        mock_lookup.return_value = []
+        mock_insert.return_value = 0
+        mock_monotonic.return_value = 1000
+        message = make_message([{"a": 1}])
+        self.writer.callback(message)
+
+        mock_monotonic.return_value = 1000.05
+        self.writer.on_iteration()
+        message.ack.assert_not_called()
+
+        mock_monotonic.return_value = 1000.1
+        self.writer.on_iteration()
+        message.ack.assert_called_once()
+
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_batch_not_acked_on_error(self, mock_lookup, mock_insert):
+        mock_lookup.return_value = []
+        mock_insert.return_value = LISTEN_INSERT_ERROR_SENTINEL
+        messages = [make_message([{"a": 1}, {"a": 2}]), make_message([{"a": 3}])]
+        for message in messages:
+            self.writer.callback(message)
+        for message in messages:
+            message.ack.assert_not_called()
+            message.requeue.assert_called_once()
+        self.assertEqual(self.writer.pending_messages, [])
+
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_batch_not_acked_on_lookup_error(self, mock_lookup, mock_insert):
+        mock_lookup.return_value = LISTEN_INSERT_ERROR_SENTINEL
+        messages = [make_message([{"a": 1}, {"a": 2}]), make_message([{"a": 3}])]
+        for message in messages:
+            self.writer.callback(message)
+        mock_insert.assert_not_called()
+        for message in messages:
+            message.ack.assert_not_called()
+            message.requeue.assert_called_once()
+        self.assertEqual(self.writer.pending_messages, [])
+
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_bad_message_dropped_on_lookup_data_error(self, mock_lookup, mock_insert):
+        # the lookup of the batch fails because of the listens of the first message, which is retried alone
+        mock_lookup.side_effect = [None, None, [{"a": 3}]]
+        mock_insert.return_value = 1
+        bad, good = make_message([{"a": 1}, {"a": 2}]), make_message([{"a": 3}])
+        self.writer.callback(bad)
+        self.writer.callback(good)
+        self.assertEqual(mock_lookup.call_args_list, [
+            mock.call([{"a": 1}, {"a": 2}, {"a": 3}]),
+            mock.call([{"a": 1}, {"a": 2}]),
+            mock.call([{"a": 3}]),
+        ])
+        mock_insert.assert_called_once()
+        bad.ack.assert_called_once()
+        good.ack.assert_called_once()
+        bad.requeue.assert_not_called()
+        good.requeue.assert_not_called()
+
+    @mock.patch("listenbrainz.timescale_writer.timescale_writer.Consumer")
+    def test_pending_batch_dropped_on_reconnect(self, _):
+        self.writer.callback(make_message([{"a": 1}]))
+        self.assertEqual(len(self.writer.pending_messages), 1)
+        self.writer.get_consumers(None, mock.MagicMock())
+        self.assertEqual(self.writer.pending_messages, [])
+        self.assertEqual(self.writer.pending_listens, [])
+        self.assertIsNone(self.writer.batch_deadline)
+        # nothing is left to flush on the dead channel
+        self.assertEqual(self.writer.flush(), 0)
+
+    @mock.patch.object(TimescaleWriterSubscriber, "insert_to_listenstore")
+    @mock.patch.object(TimescaleWriterSubscriber, "messybrainz_lookup")
+    def test_batching_disabled(self, mock_lookup, mock_insert):
+        mock_lookup.return_value = []
+        mock_insert.return_value = 0
+        self.writer.batch_max_listens = 0
+        message = make_message([{"a": 1}])
+        self.writer.callback(message)
+        message.ack.assert_called_once()
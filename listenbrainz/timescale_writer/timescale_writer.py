@@ -10,13 +10,12 @@ from flask import current_app
 from kombu import Exchange, Queue, Consumer, Message, Connection
 from kombu.entity import PERSISTENT_DELIVERY_MODE
 from kombu.mixins import ConsumerProducerMixin
-from more_itertools import chunked
 
 from listenbrainz import messybrainz
-from listenbrainz.listen import Listen
+from listenbrainz.listen import ListenBatch
+from listenbrainz.messybrainz.cache import init_msid_cache
 from listenbrainz.utils import get_fallback_connection_name
 from listenbrainz.webserver import create_app, redis_connection, timescale_connection
-from listenbrainz.webserver.views.api_tools import MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP
 
 METRIC_UPDATE_INTERVAL = 60  # seconds
 LISTEN_INSERT_ERROR_SENTINEL = -1  #
@@ -39,7 +38,25 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         self.unique_listens = 0
         self.metric_submission_time = monotonic() + METRIC_UPDATE_INTERVAL
 
+        # micro-batching of deliveries, disabled if TIMESCALE_WRITER_BATCH_MAX_LISTENS is 0. a batch is
+        # processed once it has at least batch_max_listens listens or its oldest message is batch_max_delay
+        # seconds old, whichever comes first.
+        self.batch_max_listens = current_app.config.get("TIMESCALE_WRITER_BATCH_MAX_LISTENS", 0)
+        self.batch_max_delay = current_app.config.get("TIMESCALE_WRITER_BATCH_MAX_DELAY_MS", 200) / 1000
+        self.pending_messages: list[Message] = []
+        self.pending_listens: list[dict] = []
+        self.batch_deadline = None
+
+        self.msid_cache = init_msid_cache(
+            current_app.config.get("MSID_CACHE_MAX_BYTES", 0),
+            current_app.config.get("MSID_CACHE_REDIS_EXPIRY")
+        )
+
     def get_consumers(self, _, channel):
+        # consumers are recreated when the connection is revived, the pending messages were delivered on the dead
+        # channel and cannot be acked anymore. rabbitmq redelivers them, drop them.
+        self.pending_messages, self.pending_listens = [], []
+        self.batch_deadline = None
         return [
             Consumer(
                 channel,
@@ -52,28 +69,78 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
     def callback(self, message: Message):
         listens = orjson.loads(message.body)
 
-        msb_listens = []
-        for chunk in chunked(listens, MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP):
-            msb_listens.extend(self.messybrainz_lookup(chunk))
+        if not self.batch_max_listens:
+            return self.process_messages([message], listens)
+
+        if not self.pending_messages:
+            self.batch_deadline = monotonic() + self.batch_max_delay
+        self.pending_messages.append(message)
+        self.pending_listens.extend(listens)
+
+        if len(self.pending_listens) >= self.batch_max_listens:
+            return self.flush()
+
+    def on_iteration(self):
+        """ Called by the kombu consume loop before waiting for new deliveries, at least once per
+         safety interval. Process the pending batch if it has waited long enough. """
+        if self.pending_messages and monotonic() >= self.batch_deadline:
+            self.flush()
+
+    def flush(self):
+        """ Process all pending messages as one batch. """
+        messages, listens = self.pending_messages, self.pending_listens
+        self.pending_messages, self.pending_listens = [], []
+        self.batch_deadline = None
+        if not messages:
+            return 0
+        return self.process_messages(messages, listens)
 
-        submit = []
-        for listen in msb_listens:
-            try:
-                submit.append(Listen.from_json(listen))
-            except ValueError:
-                pass
+    def process_messages(self, messages: list[Message], listens: list[dict]):
+        """ Lookup msids for and insert the listens of the given messages, then ack all of the messages.
+
+        If the MessyBrainz lookup of a batch of several messages fails because of bad data, each message is
+        processed on its own so that only the listens of the bad message are dropped.
 
-        ret = self.insert_to_listenstore(submit)
+        Returns: number of listens processed or LISTEN_INSERT_ERROR_SENTINEL if there was an error
+        in inserting listens.
+        """
+        msb_listens = self.messybrainz_lookup(listens)
+        if msb_listens is None:
+            if len(messages) == 1:
+                current_app.logger.error("Dropping %d listens which failed the MessyBrainz lookup", len(listens))
+                messages[0].ack()
+                return 0
+            return sum(
+                max(self.process_messages([message], orjson.loads(message.body)), 0)
+                for message in messages
+            )
 
-        # If there is an error, we do not ack the message so that rabbitmq redelivers it later.
+        # If there is an error which may go away on retrying, we requeue the messages so that rabbitmq redelivers them.
+        if msb_listens == LISTEN_INSERT_ERROR_SENTINEL:
+            self.requeue(messages)
+            return msb_listens
+
+        ret = self.insert_to_listenstore(ListenBatch.from_json_many(msb_listens))
         if ret == LISTEN_INSERT_ERROR_SENTINEL:
+            self.requeue(messages)
             return ret
 
-        message.ack()
+        for message in messages:
+            message.ack()
 
         return ret
 
+    @staticmethod
+    def requeue(messages: list[Message]):
+        for message in messages:
+            message.requeue()
+
     def messybrainz_lookup(self, listens):
+        """ Add the recording_msid of each listen from MessyBrainz.
+
+        Returns: the listens with their msids, LISTEN_INSERT_ERROR_SENTINEL if the lookup failed because of an
+        error which may go away on retrying or None if it failed because of the listens
+        """
         msb_listens = []
         for listen in listens:
             if 'additional_info' not in listen['track_metadata']:
@@ -99,10 +166,14 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
             msb_listens.append(data)
 
         try:
-            msb_responses = messybrainz.submit_listens_and_sing_me_a_sweet_song(msb_listens)
+            msb_responses = messybrainz.bulk_submit_listens(msb_listens)
+        except messybrainz.exceptions.TemporaryErrorException:
+            current_app.logger.error("MessyBrainz lookup for listens failed. Sleep.", exc_info=True)
+            time.sleep(self.ERROR_RETRY_DELAY)
+            return LISTEN_INSERT_ERROR_SENTINEL
         except (messybrainz.exceptions.BadDataException, messybrainz.exceptions.ErrorAddingException):
             current_app.logger.error("MessyBrainz lookup for listens failed: ", exc_info=True)
-            return []
+            return None
 
         augmented_listens = []
         for listen, msid in zip(listens, msb_responses):
@@ -117,7 +188,7 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         down the unique queue.
 
         Args:
-            data: the data to be inserted into the ListenStore
+            data: the ListenBatch to be inserted into the ListenStore
 
         Returns: number of listens successfully sent or LISTEN_INSERT_ERROR_SENTINEL
         if there was an error in inserting listens
@@ -143,16 +214,11 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
             # Not critical, so if this errors out, just log it to Sentry and move forward
             current_app.logger.error("Could not update listen count per day in redis", exc_info=True)
 
-        unique = []
-        inserted_index = {}
+        inserted_index = set()
         for inserted in rows_inserted:
-            inserted_index['%d-%s-%s' % (int(inserted[0].timestamp()), inserted[1], inserted[2])] = 1
-
-        for listen in data:
-            k = '%d-%s-%s' % (listen.ts_since_epoch, listen.user_id, listen.recording_msid)
-            if k in inserted_index:
-                unique.append(listen)
+            inserted_index.add((int(inserted[0].timestamp()), inserted[1], str(inserted[2])))
 
+        unique = data.select(idx for idx, key in enumerate(data.keys()) if key in inserted_index)
         if not unique:
             return len(data)
 
@@ -162,13 +228,15 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
         self.producer.publish(
             exchange=self.unique_exchange,
             routing_key="",
-            body=orjson.dumps([listen.to_json() for listen in unique]).decode("utf-8"),
+            body=ListenBatch.join_json(unique.to_json_many()).decode("utf-8"),
             delivery_mode=PERSISTENT_DELIVERY_MODE
         )
 
         if monotonic() > self.metric_submission_time:
             self.metric_submission_time += METRIC_UPDATE_INTERVAL
             metrics.set("timescale_writer", incoming_listens=self.incoming_listens, unique_listens=self.unique_listens)
+            if self.msid_cache is not None:
+                self.msid_cache.submit_metrics()
             self.incoming_listens = 0
             self.unique_listens = 0
 
@@ -189,7 +257,11 @@ class TimescaleWriterSubscriber(ConsumerProducerMixin):
             try:
                 current_app.logger.info("Timescale Writer started.")
                 self.init_rabbitmq_connection()
-                self.run()
+                if self.batch_max_listens:
+                    # wake up often enough to flush batches which have waited for batch_max_delay
+                    self.run(safety_interval=min(1, self.batch_max_delay))
+                else:
+                    self.run()
             except KeyboardInterrupt:
                 current_app.logger.error("Keyboard interrupt!")
                 break
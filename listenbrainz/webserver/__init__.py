@@ -162,7 +162,8 @@ def create_app(debug=None):
         app.config['COUCHDB_USER'],
         app.config['COUCHDB_ADMIN_KEY'],
         app.config['COUCHDB_HOST'],
-        app.config['COUCHDB_PORT']
+        app.config['COUCHDB_PORT'],
+        app.config.get('COUCHDB_DATABASES_CACHE_TTL', 0)
     )
     # RabbitMQ connection
     from listenbrainz.webserver.rabbitmq_connection import init_rabbitmq_connection
@@ -1,4 +1,6 @@
+from time import monotonic
 from typing import Optional
+from weakref import WeakKeyDictionary
 
 from kombu import Connection, pools, producers, Exchange
 from kombu.pools import ProducerPool
@@ -44,3 +46,72 @@ def init_rabbitmq_connection(app):
     INCOMING_EXCHANGE = Exchange(app.config["INCOMING_EXCHANGE"], "fanout", durable=False)
     PLAYING_NOW_EXCHANGE = Exchange(app.config["PLAYING_NOW_EXCHANGE"], "fanout", durable=False)
     rabbitmq = producers[connection]
+
+
+class PublisherConfirms:
+    """ Tracks the publisher confirms of a channel of a pooled producer.
+
+    The channel is put in confirm mode once and stays in it for its lifetime, the delivery tags of the messages
+    published on it are sequential starting at 1. Messages are published without waiting and :meth:`wait` then
+    waits once for the confirms of all the messages published by a request.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.next_tag = 1
+        self.pending = set()
+        self.nacked = set()
+        channel.confirm_select()
+        channel.events["basic_ack"].add(self._on_ack)
+        channel.events["basic_nack"].add(self._on_nack)
+
+    def published(self) -> int:
+        """ Record that a message has been published on the channel, returns its delivery tag. """
+        tag = self.next_tag
+        self.next_tag += 1
+        self.pending.add(tag)
+        return tag
+
+    def _settle(self, delivery_tag, multiple):
+        if multiple:
+            settled = {tag for tag in self.pending if tag <= delivery_tag}
+        else:
+            settled = {delivery_tag} & self.pending
+        self.pending -= settled
+        return settled
+
+    def _on_ack(self, delivery_tag, multiple):
+        self._settle(delivery_tag, multiple)
+
+    def _on_nack(self, delivery_tag, multiple, *args):
+        self.nacked |= self._settle(delivery_tag, multiple)
+
+    def wait(self, tags: set, timeout: float):
+        """ Wait until all the given delivery tags have been confirmed.
+
+        Raises:
+            TimeoutError: if the messages aren't confirmed within timeout seconds
+            ConnectionError: if the broker rejected any of the messages
+        """
+        deadline = monotonic() + timeout
+        while self.pending & tags:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Timed out waiting for publisher confirms")
+            self.channel.connection.drain_events(timeout=remaining)
+        nacked = self.nacked & tags
+        if nacked:
+            self.nacked -= nacked
+            raise ConnectionError("RabbitMQ rejected %d published messages" % len(nacked))
+
+
+_publisher_confirms: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def get_publisher_confirms(channel) -> PublisherConfirms:
+    """ Return the confirm tracker of the channel, putting the channel in confirm mode if needed. """
+    confirms = _publisher_confirms.get(channel)
+    if confirms is None:
+        confirms = PublisherConfirms(channel)
+        _publisher_confirms[channel] = confirms
+    return confirms
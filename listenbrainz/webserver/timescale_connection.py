@@ -3,6 +3,7 @@ from typing import Optional
 
 from listenbrainz.db import timescale
 from listenbrainz.listenstore import TimescaleListenStore
+from listenbrainz.listenstore.timescale_listenstore import INSERT_MODE_VALUES
 
 _ts: Optional[TimescaleListenStore] = None
 
@@ -16,7 +17,12 @@ def init_timescale_connection(app):
 
     while True:
         try:
-            _ts = TimescaleListenStore(app.logger)
+            _ts = TimescaleListenStore(
+                app.logger,
+                insert_mode=app.config.get("LISTENSTORE_INSERT_MODE", INSERT_MODE_VALUES),
+                listens_page_cache_expiry=app.config.get("LISTENS_PAGE_CACHE_EXPIRY", 0),
+                listens_page_cache_max_bytes=app.config.get("LISTENS_PAGE_CACHE_MAX_BYTES_PER_USER", 0)
+            )
             break
         except Exception:
             app.logger.error(f"Couldn't create TimescaleListenStore instance (sleeping and trying again...):", exc_info=True)
@@ -19,10 +19,10 @@ from listenbrainz.webserver import timescale_connection, db_conn, ts_conn
 from listenbrainz.webserver.decorators import api_listenstore_needed
 from listenbrainz.webserver.decorators import crossdomain
 from listenbrainz.webserver.errors import APIBadRequest, APIInternalServerError, APINotFound, APIServiceUnavailable, \
-    APIUnauthorized, ListenValidationError, APIForbidden
+    APIUnauthorized, APIForbidden
 from listenbrainz.webserver.models import SubmitListenUserMetadata
 from listenbrainz.webserver.utils import REJECT_LISTENS_WITHOUT_EMAIL_ERROR, REJECT_LISTENS_FROM_PAUSED_USER_ERROR
-from listenbrainz.webserver.views.api_tools import insert_payload, log_raise_400, validate_listen, \
+from listenbrainz.webserver.views.api_tools import insert_payload, log_raise_400, validate_listens, \
     is_valid_uuid, MAX_LISTEN_PAYLOAD_SIZE, MAX_LISTENS_PER_REQUEST, MAX_LISTEN_SIZE, LISTEN_TYPE_SINGLE, \
     LISTEN_TYPE_IMPORT, _validate_get_endpoint_params, LISTEN_TYPE_PLAYING_NOW, validate_auth_header, \
     get_non_negative_param, _parse_int_arg
@@ -72,8 +72,8 @@ def submit_listen():
     :statuscode 401: invalid authorization. See error message for details.
     :resheader Content-Type: *application/json*
     """
-    user = validate_auth_header(fetch_email=True, scopes=["listenbrainz:submit-listens"])
-    if mb_engine and current_app.config["REJECT_LISTENS_WITHOUT_USER_EMAIL"] and not user["email"]:
+    user = validate_auth_header(scopes=["listenbrainz:submit-listens"])
+    if mb_engine and current_app.config["REJECT_LISTENS_WITHOUT_USER_EMAIL"] and not user["has_email"]:
         raise APIUnauthorized(REJECT_LISTENS_WITHOUT_EMAIL_ERROR)
 
     if user['is_paused']:
@@ -125,10 +125,11 @@ def submit_listen():
     except KeyError:
         log_raise_400("Invalid JSON document submitted.", raw_data)
 
-    try:
-        # validate listens to make sure json is okay
-        validated_payload = [validate_listen(listen, listen_type) for listen in payload]
-    except ListenValidationError as err:
+    # validate listens to make sure json is okay. a unicode null can only be present in the parsed payload
+    # if it was escaped in the raw document.
+    validated_payload, errors = validate_listens(payload, listen_type, check_unicode_null=b"\\u0000" in raw_data)
+    if errors:
+        _, err = errors[0]
         raise APIBadRequest(err.message, err.payload)
 
     user_metadata = SubmitListenUserMetadata(user_id=user['id'], musicbrainz_id=user['musicbrainz_id'])
@@ -720,7 +721,7 @@ def get_service_details(user_name):
     :statuscode 403: Forbidden, you do not have permissions to view this user's information.
     :statuscode 404: The requested user was not found.
     """
-    user = validate_auth_header(fetch_email=True)
+    user = validate_auth_header()
     if user_name != user['musicbrainz_id']:
         raise APIForbidden("You don't have permissions to view this user's information.")
 
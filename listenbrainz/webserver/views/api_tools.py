@@ -1,6 +1,7 @@
 import logging
+import re
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 from urllib.parse import urlparse
 
 import bleach
@@ -11,6 +12,7 @@ from more_itertools import chunked
 import listenbrainz.webserver.rabbitmq_connection as rabbitmq_connection
 import listenbrainz.webserver.redis_connection as redis_connection
 import listenbrainz.db.user as db_user
+from listenbrainz.db import auth_token_cache
 import time
 import orjson
 import uuid
@@ -60,6 +62,14 @@ MAX_ITEMS_PER_MESSYBRAINZ_LOOKUP = 10
 
 MAX_LISTENS_PER_RMQ_MESSAGE = 100  # internal limit on number of listens per RMQ message to avoid timeouts in TS writer
 
+# Fields of submitted listens checked by validate_listen, in the order in which they are checked
+BASIC_METADATA_FIELDS = (("track_name", True), ("artist_name", True), ("release_name", False))
+DURATION_FIELDS = (("duration", MAX_DURATION_LIMIT), ("duration_ms", MAX_DURATION_MS_LIMIT))
+SINGLE_MBID_FIELDS = ("release_mbid", "recording_mbid", "release_group_mbid", "track_mbid")
+MULTIPLE_MBID_FIELDS = ("artist_mbids", "work_mbids")
+
+CANONICAL_UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z")
+
 
 # Define the values for types of listens
 LISTEN_TYPE_SINGLE = 1
@@ -124,8 +134,7 @@ def _send_listens_to_queue(listen_type, listens):
         else:
             exchange = rabbitmq_connection.INCOMING_EXCHANGE
 
-        for chunk in chunked(submit, MAX_LISTENS_PER_RMQ_MESSAGE):
-            publish_data_to_queue(chunk, exchange)
+        publish_chunks_to_queue(chunked(submit, MAX_LISTENS_PER_RMQ_MESSAGE), exchange)
 
 
 def _raise_error_if_has_unicode_null(value, listen):
@@ -151,12 +160,55 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
     Also, check all keys for absence of unicode null which cannot be
     inserted into Postgres. The function may also mutate listens
     in place if needed."""
+    _validate_listen_fields(listen, listen_type, int(time.time()) + API_LISTENED_AT_ALLOWED_SKEW)
+
+    # monitor performance of unicode null check because it might be a potential bottleneck
+    with sentry_sdk.start_span(op="null check", name="check for unicode null in submitted listen json"):
+        # If unicode null is present in the listen, postgres will raise an
+        # error while trying to insert it. hence, reject such listens.
+        check_for_unicode_null_recursively(listen)
+
+    return listen
+
 
+def validate_listens(listens: List[Dict], listen_type, check_unicode_null=True) \
+        -> Tuple[List[Dict], List[Tuple[int, ListenValidationError]]]:
+    """ Validate all the listens of a payload in one pass, with the same rules and errors as
+    :func:`validate_listen`.
+
+    The time dependent bounds are computed once per payload and the unicode null check, which has to walk every
+    value of the listens, can be skipped by the caller if it has established that the payload can not contain one.
+    A JSON document can only encode a unicode null as an escape so it is enough to check that the raw request body
+    doesn't contain ``\\u0000``.
+
+    Returns:
+        a tuple of the list of valid listens and a list of (index in listens, error) of the invalid ones.
+    """
+    max_listened_at = int(time.time()) + API_LISTENED_AT_ALLOWED_SKEW
+    validated, errors = [], []
+    with sentry_sdk.start_span(op="validation", name="validate submitted listens"):
+        for idx, listen in enumerate(listens):
+            try:
+                _validate_listen_fields(listen, listen_type, max_listened_at)
+                if check_unicode_null:
+                    check_for_unicode_null_recursively(listen)
+            except ListenValidationError as err:
+                errors.append((idx, err))
+            except APIBadRequest as err:
+                # raised by the unicode null check
+                errors.append((idx, ListenValidationError(err.message, err.payload)))
+            else:
+                validated.append(listen)
+    return validated, errors
+
+
+def _validate_listen_fields(listen: Dict, listen_type, max_listened_at: int):
+    """ Perform all checks of :func:`validate_listen` except the unicode null check. """
     if listen is None:
         raise ListenValidationError("Listen is empty and cannot be validated.")
 
     if listen_type in (LISTEN_TYPE_SINGLE, LISTEN_TYPE_IMPORT):
-        validate_listened_at(listen)
+        validate_listened_at(listen, max_listened_at)
 
         if "track_metadata" not in listen:
             raise ListenValidationError("JSON document must contain the key track_metadata"
@@ -188,9 +240,8 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
         raise ListenValidationError("JSON document may not have track_metadata with null value.", listen)
 
     # Basic metadata
-    validate_basic_metadata(listen, "track_name")
-    validate_basic_metadata(listen, "artist_name")
-    validate_basic_metadata(listen, "release_name", required=False)
+    for key, required in BASIC_METADATA_FIELDS:
+        validate_basic_metadata(listen, key, required)
 
     if 'additional_info' in listen['track_metadata']:
         # Tags
@@ -208,25 +259,15 @@ def validate_listen(listen: Dict, listen_type) -> Dict:
         if 'duration' in listen['track_metadata']['additional_info'] and 'duration_ms' in listen['track_metadata']['additional_info']:
             raise ListenValidationError("JSON document should not contain both duration and duration_ms.", listen)
         # check duration validity
-        validate_duration_field(listen, "duration", MAX_DURATION_LIMIT)
-        validate_duration_field(listen, "duration_ms", MAX_DURATION_MS_LIMIT)
+        for key, max_value in DURATION_FIELDS:
+            validate_duration_field(listen, key, max_value)
 
         # MBIDs, both of the mbid validation methods mutate the listen payload if needed.
-        single_mbid_keys = ['release_mbid', 'recording_mbid', 'release_group_mbid', 'track_mbid']
-        for key in single_mbid_keys:
+        for key in SINGLE_MBID_FIELDS:
             validate_single_mbid_field(listen, key)
-        multiple_mbid_keys = ['artist_mbids', 'work_mbids']
-        for key in multiple_mbid_keys:
+        for key in MULTIPLE_MBID_FIELDS:
             validate_multiple_mbids_field(listen, key)
 
-    # monitor performance of unicode null check because it might be a potential bottleneck
-    with sentry_sdk.start_span(op="null check", name="check for unicode null in submitted listen json"):
-        # If unicode null is present in the listen, postgres will raise an
-        # error while trying to insert it. hence, reject such listens.
-        check_for_unicode_null_recursively(listen)
-
-    return listen
-
 
 def validate_basic_metadata(listen, key, required=True):
     if key in listen["track_metadata"]:
@@ -243,6 +284,9 @@ def validate_basic_metadata(listen, key, required=True):
 def is_valid_uuid(u):
     if u is None:
         return False
+    # fast path for the canonical form which almost all submitted mbids use
+    if isinstance(u, str) and CANONICAL_UUID_RE.match(u):
+        return True
     try:
         u = uuid.UUID(u)
         return True
@@ -339,13 +383,14 @@ def validate_multiple_mbids_field(listen, key):
         listen['track_metadata']['additional_info'][key] = mbids  # set the filtered in the listen payload
 
 
-def validate_listened_at(listen):
+def validate_listened_at(listen, max_listened_at=None):
     """ Raises an error if the listened_at timestamp is invalid. The timestamp is invalid
     if it is lower than the minimum acceptable timestamp or if its in future beyond
     tolerable skew.
 
     Args:
         listen: the listen to be validated
+        max_listened_at: the exclusive upper bound of listened_at, defaults to the current time plus the allowed skew
     """
     if "listened_at" not in listen:
         raise ListenValidationError("JSON document must contain the key listened_at at the top level.", listen)
@@ -358,7 +403,9 @@ def validate_listened_at(listen):
     # raise error if timestamp is too high
     # in order to make up for possible clock skew, we allow
     # timestamps to be one hour ahead of server time
-    if listen["listened_at"] >= int(time.time()) + API_LISTENED_AT_ALLOWED_SKEW:
+    if max_listened_at is None:
+        max_listened_at = int(time.time()) + API_LISTENED_AT_ALLOWED_SKEW
+    if listen["listened_at"] >= max_listened_at:
         raise ListenValidationError("Value for key listened_at is too high.", listen)
 
     if listen["listened_at"] < LISTEN_MINIMUM_TS:
@@ -373,20 +420,63 @@ def publish_data_to_queue(data, exchange):
         data: the data to be published
         exchange: the name of the exchange
     """
-    try:
-        with rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
-            producer.publish(
-                exchange=exchange,
-                routing_key='',
-                body=orjson.dumps(data),
-                delivery_mode=PERSISTENT_DELIVERY_MODE,
-                retry=True,
-                retry_policy={"max_retries": 5},
-                declare=[exchange]
-            )
-    except Exception:
-        current_app.logger.error("Cannot publish to rabbitmq channel:", exc_info=True)
-        raise APIServiceUnavailable("Cannot submit listens to queue, please try again later.")
+    publish_chunks_to_queue([data], exchange)
+
+
+def publish_chunks_to_queue(chunks, exchange):
+    """ Publish each of the chunks of data as a message to the specified exchange, all of them with a single
+    producer acquired from the pool.
+
+    If RABBITMQ_PUBLISH_CONFIRMS is enabled, the request waits once after publishing all the messages for the
+    broker to confirm them and publishes the whole batch again if that fails, the timescale writer discards the
+    duplicates. Bodies of at least RABBITMQ_PUBLISH_COMPRESSION_MIN_BYTES bytes are compressed, kombu consumers
+    decompress them transparently so the consumers of the exchange must run a kombu version which supports the
+    compression method before enabling it.
+
+    Args:
+        chunks: an iterable of the data of each message
+        exchange: the name of the exchange
+    """
+    bodies = [orjson.dumps(chunk) for chunk in chunks]
+    confirms = current_app.config.get("RABBITMQ_PUBLISH_CONFIRMS", False)
+    attempts = 2 if confirms else 1
+    for attempt in range(1, attempts + 1):
+        try:
+            with rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
+                _publish_bodies(producer, bodies, exchange, confirms)
+            return
+        except Exception:
+            if attempt < attempts:
+                current_app.logger.warning("Cannot publish to rabbitmq channel, retrying:", exc_info=True)
+                continue
+            current_app.logger.error("Cannot publish to rabbitmq channel:", exc_info=True)
+            raise APIServiceUnavailable("Cannot submit listens to queue, please try again later.")
+
+
+def _publish_bodies(producer, bodies, exchange, confirms):
+    compression_min_bytes = current_app.config.get("RABBITMQ_PUBLISH_COMPRESSION_MIN_BYTES", 0)
+    tracker = rabbitmq_connection.get_publisher_confirms(producer.channel) if confirms else None
+    tags = set()
+    for body in bodies:
+        producer.publish(
+            exchange=exchange,
+            routing_key='',
+            body=body,
+            delivery_mode=PERSISTENT_DELIVERY_MODE,
+            compression="zlib" if compression_min_bytes and len(body) >= compression_min_bytes else None,
+            retry=True,
+            retry_policy={"max_retries": 5},
+            declare=[exchange]
+        )
+        if tracker is not None:
+            if producer.channel is not tracker.channel:
+                # the connection was lost and the producer was revived on a new channel, the messages published
+                # on the old channel will never be confirmed.
+                raise ConnectionError("RabbitMQ channel was revived while publishing")
+            tags.add(tracker.published())
+
+    if tracker is not None:
+        tracker.wait(tags, current_app.config.get("RABBITMQ_PUBLISH_CONFIRM_TIMEOUT", 5))
 
 
 def get_non_negative_param(param, default=None):
@@ -465,7 +555,8 @@ def _validate_get_endpoint_params() -> Tuple[int, int, int]:
     return min_ts, max_ts, count
 
 
-def validate_auth_header(*, optional: bool = False, fetch_email: bool = False, scopes: list[str] = None):
+def validate_auth_header(*, optional: bool = False, fetch_email: bool = False, fetch_auth_token: bool = False,
+                         scopes: list[str] = None):
     """ Examine the current request headers for an Authorization: Token <uuid>
         header that identifies a LB user and then load the corresponding user
         object from the database and return it, if successful. Otherwise raise
@@ -474,8 +565,14 @@ def validate_auth_header(*, optional: bool = False, fetch_email: bool = False, s
     Args:
         optional: If the optional flag is given, do not raise an exception
             if the Authorization header is not set.
-        fetch_email: if True, include email in the returned dict
+        fetch_email: if True, include email in the returned dict. The email isn't kept in the auth token cache,
+            users with it are always loaded from the database, use has_email if only its presence matters.
+        fetch_auth_token: if True, include the API token of the user in the returned dict. Like the email, it isn't
+            kept in the auth token cache.
         scopes: the scopes the access token is required to have access to
+
+    Returns:
+        the user, with has_email set to whether the user has an email
     """
     auth_token = request.headers.get("Authorization")
     if not auth_token:
@@ -488,6 +585,15 @@ def validate_auth_header(*, optional: bool = False, fetch_email: bool = False, s
     except IndexError:
         raise APIUnauthorized("Provided Authorization header is invalid.")
 
+    use_cache = auth_token_cache.enabled()
+    # the email isn't cached, only whether the user has one, and neither is the API token
+    cached = auth_token_cache.get(auth_token) if use_cache and not fetch_email and not fetch_auth_token else None
+    if cached is not None:
+        if cached["scopes"] is not None:
+            _check_token_scopes(cached["scopes"], scopes)
+        return cached["user"]
+
+    generation = auth_token_cache.get_generation() if use_cache else None
     if auth_token.startswith("meba_"):
         try:
             response = requests.post(
@@ -507,22 +613,36 @@ def validate_auth_header(*, optional: bool = False, fetch_email: bool = False, s
         if not token["active"] or datetime.fromtimestamp(token["expires_at"]) < datetime.now():
             raise APIUnauthorized("Invalid access token.")
 
-        if scopes:
-            token_scopes = token["scope"]
-            for scope in scopes:
-                if scope not in token_scopes:
-                    raise APIUnauthorized("Insufficient scope.")
+        _check_token_scopes(token["scope"], scopes)
 
-        user = db_user.get_by_mb_id(db_conn, token["sub"], fetch_email=fetch_email)
+        user = db_user.get_by_mb_id(db_conn, token["sub"], fetch_email=True)
+        if user is not None and use_cache:
+            auth_token_cache.put(auth_token, user, generation, token["scope"], token["expires_at"])
     else:
-        user = db_user.get_by_token(db_conn, auth_token, fetch_email=fetch_email)
+        user = db_user.get_by_token(db_conn, auth_token, fetch_email=True)
+        if user is not None and use_cache:
+            auth_token_cache.put(auth_token, user, generation)
 
     if user is None:
         raise APIUnauthorized("Invalid authorization token.")
 
+    user = dict(user)
+    user["has_email"] = bool(user["email"])
+    if not fetch_email:
+        del user["email"]
+    if not fetch_auth_token:
+        del user["auth_token"]
     return user
 
 
+def _check_token_scopes(token_scopes, scopes):
+    """ Raise an error if the OAuth access token doesn't have access to all of the required scopes. """
+    if scopes:
+        for scope in scopes:
+            if scope not in token_scopes:
+                raise APIUnauthorized("Insufficient scope.")
+
+
 def _allow_metabrainz_domains(tag, name, value):
     """A bleach attribute cleaner for <a> tags that only allows hrefs to point
     to metabrainz-controlled domains"""
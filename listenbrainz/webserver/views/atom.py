@@ -418,11 +418,11 @@ def get_user_fresh_releases(user_name):
 
 
 def _get_entity_stats(user_id: str, entity: str, range: str, count: int):
-    stats = db_stats.get(user_id, entity, range, EntityRecord)
+    count = min(count, MAX_ITEMS_PER_GET)
+    stats = db_stats.get(user_id, entity, range, EntityRecord, count=count)
     if stats is None:
         return None, None, None
 
-    count = min(count, MAX_ITEMS_PER_GET)
     entity_list = [x.dict() for x in stats.data.__root__[:count]]
     return entity_list, stats.to_ts, stats.last_updated
 
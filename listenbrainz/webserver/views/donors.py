@@ -5,7 +5,7 @@ from listenbrainz.webserver.views.api_tools import _parse_int_arg
 
 from listenbrainz.db.donation import get_recent_donors, get_biggest_donors
 from listenbrainz.webserver import db_conn, meb_conn, ts_conn, timescale_connection
-import listenbrainz.db.user as db_user
+from listenbrainz.db import user_identity_cache
 import listenbrainz.db.playlist as db_playlist
 
 DEFAULT_DONOR_COUNT = 25
@@ -32,8 +32,8 @@ def donors_post():
     donation_count_pages = ceil(donation_count / DEFAULT_DONOR_COUNT)
 
     musicbrainz_ids = [donor["musicbrainz_id"] for donor in donors if donor['is_listenbrainz_user']]
-    donors_info = db_user.get_many_users_by_mb_id(db_conn, musicbrainz_ids) if musicbrainz_ids else {}
-    donor_ids = [donor_info.id for _, donor_info in donors_info.items()]
+    donors_info = user_identity_cache.get_users_by_name(db_conn, musicbrainz_ids)
+    donor_ids = [donor_info["id"] for donor_info in donors_info.values()]
 
     user_listen_count = timescale_connection._ts.get_listen_count_for_users(donor_ids) if donor_ids else {}
     user_playlist_count = db_playlist.get_playlist_count(ts_conn, donor_ids) if donor_ids else {}
@@ -44,8 +44,8 @@ def donors_post():
             donor['listenCount'] = None
             donor['playlistCount'] = None
         else:
-            donor['listenCount'] = user_listen_count.get(donor_info.id, 0)
-            donor['playlistCount'] = user_playlist_count.get(donor_info.id, 0)
+            donor['listenCount'] = user_listen_count.get(donor_info["id"], 0)
+            donor['playlistCount'] = user_playlist_count.get(donor_info["id"], 0)
 
     return jsonify({
         "data": donors,
@@ -19,6 +19,7 @@ from listenbrainz.background.background_tasks import add_task
 from listenbrainz.db.donation import get_recent_donors
 from listenbrainz.db.exceptions import DatabaseException
 from listenbrainz.db.msid_mbid_mapping import fetch_track_metadata_for_items
+from listenbrainz.db import user_identity_cache
 from listenbrainz.db.pinned_recording import get_current_pin_for_users
 from listenbrainz.domain.musicbrainz import MusicBrainzService
 from listenbrainz.webserver import flash, db_conn, meb_conn, ts_conn
@@ -132,8 +133,8 @@ def recent_listens():
                        if donor.get('is_listenbrainz_user')]
 
     # Fetch donor info only if there are valid MusicBrainz IDs
-    donors_info = db_user.get_many_users_by_mb_id(db_conn, musicbrainz_ids) if musicbrainz_ids else {}
-    donor_ids = [donor_info.id for donor_info in donors_info.values()]
+    donors_info = user_identity_cache.get_users_by_name(db_conn, musicbrainz_ids)
+    donor_ids = [donor_info["id"] for donor_info in donors_info.values()]
 
     # Get current pinned recordings
     pinned_recordings_data = {}
@@ -147,8 +148,8 @@ def recent_listens():
 
     # Add pinned recordings to recent donors
     for donor in recent_donors:
-        donor_info = donors_info.get(donor["musicbrainz_id"])
-        donor["pinnedRecording"] = pinned_recordings_data.get(donor_info.id) if donor_info else None
+        donor_info = donors_info.get(donor["musicbrainz_id"].lower())
+        donor["pinnedRecording"] = pinned_recordings_data.get(donor_info["id"]) if donor_info else None
 
     props = {
         "listens": recent,
@@ -10,6 +10,7 @@ from listenbrainz.labs_api.labs.api.artist_credit_recording_lookup import Artist
 from listenbrainz.labs_api.labs.api.artist_credit_recording_release_lookup import \
     ArtistCreditRecordingReleaseLookupQuery, ArtistCreditRecordingReleaseLookupInput
 from listenbrainz.labs_api.labs.api.mbid_mapping import MBIDMappingQuery, MBIDMappingInput
+from listenbrainz.listenstore import listens_page_cache
 from listenbrainz.mbid_mapping_writer.mbid_mapper import MBIDMapper
 from listenbrainz.webserver import ts_conn
 from listenbrainz.webserver.decorators import crossdomain
@@ -488,6 +489,8 @@ def submit_manual_mapping():
     )
 
     create_mbid_manual_mapping(ts_conn, mapping)
+    # the user's manual mappings take precedence over other mappings of their listens
+    listens_page_cache.invalidate([user["id"]])
 
     return jsonify({"status": "ok"})
 
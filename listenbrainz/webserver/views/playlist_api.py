@@ -9,7 +9,7 @@ import requests
 from psycopg2.extras import DictCursor
 
 import listenbrainz.db.playlist as db_playlist
-import listenbrainz.db.user as db_user
+from listenbrainz.db import user_identity_cache
 from listenbrainz.domain.spotify import SpotifyService, SPOTIFY_PLAYLIST_PERMISSIONS
 from listenbrainz.domain.apple import AppleService
 from listenbrainz.troi.export import export_to_spotify, export_to_apple_music
@@ -338,7 +338,7 @@ def create_playlist():
 
     users = {}
     if username_lookup:
-        users = db_user.get_many_users_by_mb_id(db_conn, username_lookup)
+        users = user_identity_cache.get_users_by_name(db_conn, username_lookup)
 
     collaborator_ids = []
     for collaborator in collaborators:
@@ -492,7 +492,7 @@ def edit_playlist(playlist_mbid):
         collaborators.remove(user["musicbrainz_id"])
 
     if collaborators:
-        users = db_user.get_many_users_by_mb_id(db_conn, collaborators)
+        users = user_identity_cache.get_users_by_name(db_conn, collaborators)
 
     collaborator_ids = []
     for collaborator in collaborators:
@@ -864,7 +864,7 @@ def export_playlist(playlist_mbid, service):
     :statuscode 404: Playlist not found
     :resheader Content-Type: *application/json*
     """
-    user = validate_auth_header()
+    user = validate_auth_header(fetch_auth_token=True)
 
     if not is_valid_uuid(playlist_mbid):
         log_raise_400("Provided playlist ID is invalid.")
@@ -969,7 +969,7 @@ def import_tracks_from_spotify_playlist(playlist_id):
     :statuscode 404: Playlist not found
     :resheader Content-Type: *application/json*
     """
-    user = validate_auth_header()
+    user = validate_auth_header(fetch_auth_token=True)
 
     spotify_service = SpotifyService()
     token = spotify_service.get_user(user["id"], refresh=True)
@@ -1005,7 +1005,7 @@ def import_tracks_from_apple_playlist(playlist_id):
     :statuscode 404: Playlist not found
     :resheader Content-Type: *application/json*
     """
-    user = validate_auth_header()
+    user = validate_auth_header(fetch_auth_token=True)
 
     apple_service = AppleService()
     # TODO: implement refresh token for AppleMusic
@@ -1040,7 +1040,7 @@ def export_playlist_jspf(service):
     :statuscode 401: invalid authorization. See error message for details.
     :resheader Content-Type: *application/json*
     """
-    user = validate_auth_header()
+    user = validate_auth_header(fetch_auth_token=True)
 
     if service != "spotify" and service != "apple_music":
         raise APIBadRequest(f"Service {service} is not supported. We currently only support 'spotify' and 'apple_msuic'.")
@@ -1,4 +1,6 @@
 import calendar
+import gzip
+import time
 from collections import defaultdict
 from datetime import datetime
 from typing import Dict, List, Tuple, Iterable
@@ -13,12 +15,12 @@ import heapq
 
 from data.model.common_stat import StatApi, StatisticsRange, StatRecordList
 from data.model.user_artist_map import UserArtistMapRecord, UserArtistMapArtist
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 
 from data.model.user_daily_activity import DailyActivityRecord
 from data.model.user_entity import EntityRecord
 from data.model.user_listening_activity import ListeningActivityRecord
-from listenbrainz.db import year_in_music as db_year_in_music
+from listenbrainz.db import stats_response_cache, user_identity_cache, year_in_music as db_year_in_music
 from listenbrainz.webserver import db_conn
 from listenbrainz.webserver.decorators import crossdomain
 from listenbrainz.webserver.errors import (APIBadRequest,
@@ -32,6 +34,18 @@ from listenbrainz.webserver.views.api_tools import (DEFAULT_ITEMS_PER_GET,
 
 stats_api_bp = Blueprint('stats_api_v1', __name__)
 
+#: The maximum number of users whose stats can be fetched in one request to :func:`get_users_entity`
+MAX_USERS_PER_BULK_STATS = 100
+
+# the top entity stats that can be fetched for many users at once, the path segment mapped
+# to the stats type and the key of the total count of entities in the response
+BULK_ENTITY_STATS = {
+    "artists": ("artists", "total_artist_count"),
+    "releases": ("releases", "total_release_count"),
+    "release-groups": ("release_groups", "total_release_group_count"),
+    "recordings": ("recordings", "total_recording_count"),
+}
+
 
 @stats_api_bp.get("/user/<user_name>/artists")
 @crossdomain
@@ -308,32 +322,181 @@ def _get_entity_stats(user_name: str, entity: str, count_key: str, entire_range:
     offset = get_non_negative_param("offset", default=0)
     count = get_non_negative_param("count", default=DEFAULT_ITEMS_PER_GET)
 
-    stats = db_stats.get(user["id"], entity, stats_range, EntityRecord)
-    if stats is None:
-        raise APINoContent('')
+    def build_response():
+        # only the requested page of the stats is validated
+        window = None if entire_range else min(count, MAX_ITEMS_PER_GET)
+        stats = db_stats.get(user["id"], entity, stats_range, EntityRecord, offset=offset, count=window)
+        if stats is None:
+            raise APINoContent('')
 
-    entity_list, total_entity_count = _process_user_entity(stats, offset, count, entire_range)
-    return jsonify({"payload": {
-        "user_id": user_name,
-        entity: entity_list,
-        "count": len(entity_list),
-        count_key: total_entity_count,
-        "offset": offset,
-        "range": stats_range,
-        "from_ts": stats.from_ts,
-        "to_ts": stats.to_ts,
-        "last_updated": stats.last_updated,
-    }})
+        entity_list, total_entity_count = _process_user_entity(stats, 0, count, entire_range)
+        return jsonify({"payload": {
+            "user_id": user_name,
+            entity: entity_list,
+            "count": len(entity_list),
+            count_key: total_entity_count,
+            "offset": offset,
+            "range": stats_range,
+            "from_ts": stats.from_ts,
+            "to_ts": stats.to_ts,
+            "last_updated": stats.last_updated,
+        }})
+
+    variant = f"{user_name}:{count}:{offset}:{int(entire_range)}"
+    return _cached_stats_response(f"{entity}_{stats_range}", user["id"], variant, build_response)
+
+
+def _cached_stats_response(prefix: str, user_id: int, variant: str, build_response):
+    """ Return the response built by build_response, from the stats response cache if possible.
+
+        The response has an ETag so that clients can revalidate it with If-None-Match, and is sent gzip
+        compressed to clients which accept it if it was cached compressed.
+
+        Args:
+            prefix: the stat type and range
+            user_id: the id of the user whose stats are returned
+            variant: identifies the response among the ones of the user for this stat, the user name
+                (which is part of the response) and all the query params the response depends on
+            build_response: builds the response if it isn't cached
+    """
+    if not stats_response_cache.enabled():
+        return build_response()
+
+    databases = stats_response_cache.get_databases(prefix)
+    if databases is None:
+        return build_response()
+
+    cached = stats_response_cache.get(prefix, user_id, variant, databases)
+    if cached is None:
+        version = stats_response_cache.get_version(prefix, user_id)
+        start = time.perf_counter()
+        response = build_response()
+        cached = stats_response_cache.put(prefix, user_id, variant, response.get_data(),
+                                          time.perf_counter() - start, databases, version)
+
+    etag = cached.etag
+    body = cached.body
+    if cached.compressed:
+        if "gzip" in request.accept_encodings:
+            # the compressed and uncompressed representations need distinct etags
+            etag += "-gzip"
+        else:
+            body = gzip.decompress(body)
+
+    response = Response(body, mimetype="application/json")
+    if cached.compressed:
+        response.vary.add("Accept-Encoding")
+        if body is cached.body:
+            response.content_encoding = "gzip"
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 
 def get_entity_stats_last_updated(user_name: str, entity: str, count_key: str):
     user, stats_range = _validate_stats_user_params(user_name)
-    stats = db_stats.get(user["id"], entity, stats_range, EntityRecord)
+    stats = db_stats.get(user["id"], entity, stats_range, EntityRecord, count=0)
     if stats is None:
         return None
     return stats.last_updated
 
 
+@stats_api_bp.get("/users/<entity>")
+@crossdomain
+@ratelimit()
+def get_users_entity(entity: str):
+    """
+    Get the top artists, releases, release groups or recordings of many users at once, instead of
+    calling the endpoint of each user separately.
+
+    A sample response from the endpoint ``/1/stats/users/artists?user_names=rob,lucifer&count=1``
+    may look like:
+
+    .. code-block:: json
+
+        {
+            "payload": {
+                "range": "all_time",
+                "users": {
+                    "rob": {
+                        "artists": [
+                            {
+                               "artist_mbids": ["93e6118e-7fa8-49f6-9e02-699a1ebce105"],
+                               "artist_name": "The Local train",
+                               "listen_count": 385
+                            }
+                        ],
+                        "count": 1,
+                        "total_artist_count": 175,
+                        "offset": 0,
+                        "last_updated": 1588494361,
+                        "from_ts": 1009823400,
+                        "to_ts": 1590029157
+                    }
+                }
+            }
+        }
+
+    Users that don't exist or whose statistics haven't been calculated are left out of ``users``, in the
+    example above the stats of ``lucifer`` haven't been calculated yet. The items of each user have the same
+    format as the response of the endpoint for a single user, like :http:get:`/1/stats/user/(user_name)/artists`.
+
+    :param entity: one of ``artists``, ``releases``, ``release-groups`` or ``recordings``
+    :type entity: ``str``
+    :param user_names: A comma separated list of user names, at most
+        :data:`~webserver.views.stats_api.MAX_USERS_PER_BULK_STATS`
+    :type user_names: ``str``
+    :param count: Optional, number of entities to return for each user,
+        Default: :data:`~webserver.views.api.DEFAULT_ITEMS_PER_GET` Max: :data:`~webserver.views.api.MAX_ITEMS_PER_GET`
+    :type count: ``int``
+    :param offset: Optional, number of entities to skip from the beginning, for pagination.
+    :type offset: ``int``
+    :param range: Optional, time interval for which statistics should be returned, possible values are
+        :data:`~data.model.common_stat.ALLOWED_STATISTICS_RANGE`, defaults to ``all_time``
+    :type range: ``str``
+    :statuscode 200: Successful query, you have data!
+    :statuscode 400: Bad request, check ``response['error']`` for more details
+    :statuscode 404: Unknown entity
+    :resheader Content-Type: *application/json*
+    """
+    if entity not in BULK_ENTITY_STATS:
+        raise APINotFound(f"Cannot find stats for entity: {entity}")
+    stats_type, count_key = BULK_ENTITY_STATS[entity]
+
+    user_names_param = request.args.get("user_names")
+    if not user_names_param:
+        raise APIBadRequest("user_names argument must be present and contain a comma separated list of user names")
+    user_names = [user_name.strip() for user_name in user_names_param.split(",") if user_name.strip()]
+    if len(user_names) > MAX_USERS_PER_BULK_STATS:
+        raise APIBadRequest(f"Maximum number of users whose stats can be fetched at once is {MAX_USERS_PER_BULK_STATS}")
+
+    stats_range = request.args.get("range", default="all_time")
+    if not _is_valid_range(stats_range):
+        raise APIBadRequest(f"Invalid range: {stats_range}")
+
+    offset = get_non_negative_param("offset", default=0)
+    count = get_non_negative_param("count", default=DEFAULT_ITEMS_PER_GET)
+
+    users = user_identity_cache.get_users_by_name(db_conn, user_names)
+    users_by_id = {user["id"]: user["musicbrainz_id"] for user in users.values()}
+    all_stats = db_stats.get_many(list(users_by_id), stats_type, stats_range, EntityRecord,
+                                  offset=offset, count=min(count, MAX_ITEMS_PER_GET))
+
+    payload = {}
+    for user_id, stats in all_stats.items():
+        entity_list, total_entity_count = _process_user_entity(stats, 0, count, False)
+        payload[users_by_id[user_id]] = {
+            stats_type: entity_list,
+            "count": len(entity_list),
+            count_key: total_entity_count,
+            "offset": offset,
+            "from_ts": stats.from_ts,
+            "to_ts": stats.to_ts,
+            "last_updated": stats.last_updated,
+        }
+
+    return jsonify({"payload": {"range": stats_range, "users": payload}})
+
+
 @stats_api_bp.get("/user/<user_name>/listening-activity")
 @crossdomain
 @ratelimit()
@@ -28,6 +28,7 @@ from flask import Blueprint, jsonify, request, current_app
 import listenbrainz.db.user as db_user
 import listenbrainz.db.user_relationship as db_user_relationship
 import listenbrainz.db.user_timeline_event as db_user_timeline_event
+from listenbrainz.db import user_identity_cache
 from data.model.listen import APIListen
 from listenbrainz.db.model.user_timeline_event import RecordingRecommendationMetadata, APITimelineEvent, \
     SimilarUserTimelineEvent, UserTimelineEventType, \
@@ -715,7 +716,7 @@ def create_thanks_event(user_name):
 
         if not result:
             raise APIBadRequest(f"{event_type} event with id {row_id} not found")
-        thankee_username = db_user.get_users_by_id(db_conn, [result.user_id])[result.user_id]
+        thankee_username = user_identity_cache.get_user_names(db_conn, [result.user_id])[result.user_id]
         if db_user_relationship.is_following_user(db_conn, user['id'], result.user_id):
             db_user_timeline_event.create_thanks_event(db_conn, user['id'], user_name, result.user_id, thankee_username, metadata)
             return jsonify({"status": "ok"})
@@ -1,13 +1,22 @@
-import json
+import os
+import socket
 import time
+import uuid
+from collections import defaultdict
+from time import monotonic
 
+import orjson
+from brainzutils import metrics
 from kombu.mixins import ConsumerMixin
 
-from listenbrainz.listen import Listen, NowPlayingListen
+from listenbrainz.listen import ListenBatch, NowPlayingListen
 from listenbrainz.utils import get_fallback_connection_name
+from listenbrainz.webserver import rabbitmq_connection
 
 from kombu import Connection, Exchange, Queue, Consumer
 
+METRIC_UPDATE_INTERVAL = 60  # seconds
+
 
 class ListensDispatcher(ConsumerMixin):
 
@@ -22,28 +31,127 @@ class ListensDispatcher(ConsumerMixin):
 
         self.unique_exchange = Exchange(app.config["UNIQUE_EXCHANGE"], "fanout", durable=False)
         self.playing_now_exchange = Exchange(app.config["PLAYING_NOW_EXCHANGE"], "fanout", durable=False)
-        self.websockets_queue = Queue(app.config["WEBSOCKETS_QUEUE"], exchange=self.unique_exchange, durable=True)
-        self.playing_now_queue = Queue(app.config["PLAYING_NOW_QUEUE"], exchange=self.playing_now_exchange,
-                                       durable=True)
+        if app.config.get("WEBSOCKETS_EXCLUSIVE_QUEUES", False):
+            # multi node mode: every node consumes all the messages from its own queues, which are deleted when
+            # the node disconnects, and only emits to the rooms of its own clients.
+            node = "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+            self.websockets_queue = Queue("%s.%s" % (app.config["WEBSOCKETS_QUEUE"], node),
+                                          exchange=self.unique_exchange, durable=False,
+                                          exclusive=True, auto_delete=True)
+            self.playing_now_queue = Queue("%s.%s" % (app.config["PLAYING_NOW_QUEUE"], node),
+                                           exchange=self.playing_now_exchange, durable=False,
+                                           exclusive=True, auto_delete=True)
+            # the collaborators of a playlist can be connected to different nodes, so the playlist updates
+            # received by a node are relayed to all the nodes through this exchange.
+            self.playlist_exchange = Exchange(app.config.get("WEBSOCKETS_PLAYLIST_EXCHANGE", "websockets_playlist"),
+                                              "fanout", durable=False)
+            self.playlist_queue = Queue("%s.%s" % (self.playlist_exchange.name, node),
+                                        exchange=self.playlist_exchange, durable=False,
+                                        exclusive=True, auto_delete=True)
+        else:
+            self.websockets_queue = Queue(app.config["WEBSOCKETS_QUEUE"], exchange=self.unique_exchange, durable=True)
+            self.playing_now_queue = Queue(app.config["PLAYING_NOW_QUEUE"], exchange=self.playing_now_exchange,
+                                           durable=True)
+            self.playlist_exchange = None
+            self.playlist_queue = None
+
+        # if enabled, the listens of a message for the same user are emitted as a single "listens" event with
+        # a json array instead of one "listen" event per listen.
+        self.batch_events = app.config.get("WEBSOCKETS_BATCH_EVENTS", False)
+
+        # these are counts since the last metric update was submitted
+        self.emitted_events = 0
+        self.dropped_listens = 0
+        self.emit_latency_total = 0.0
+        self.emit_latency_max = 0.0
+        self.processed_messages = 0
+        self.metric_submission_time = monotonic() + METRIC_UPDATE_INTERVAL
+
+    def has_subscribers(self, room) -> bool:
+        """ Whether any client connected to this process has joined the room. """
+        return bool(self.socketio.server.manager.rooms.get("/", {}).get(room))
 
     def send_listens(self, event_name, message):
-        listens = json.loads(message.body)
+        start = monotonic()
+        listens = orjson.loads(message.body)
+
+        # drop the listens of users nobody is listening to before doing any serialization
+        subscribed = []
         for data in listens:
-            if event_name == "playing_now":
+            if self.has_subscribers(data["user_name"]):
+                subscribed.append(data)
+        self.dropped_listens += len(listens) - len(subscribed)
+
+        if event_name == "playing_now":
+            for data in subscribed:
                 listen = NowPlayingListen(user_id=data["user_id"], user_name=data["user_name"], data=data["track_metadata"])
-            else:
-                listen = Listen.from_json(data)
-            self.socketio.emit(event_name, json.dumps(listen.to_api()), to=listen.user_name)
+                self.emit(event_name, orjson.dumps(listen.to_api()), data["user_name"])
+        else:
+            batch = ListenBatch.from_json_many(subscribed)
+            rooms = defaultdict(list)
+            for user_name, document in zip(batch.user_names, batch.to_api_json_many()):
+                rooms[user_name].append(document)
+            for room, documents in rooms.items():
+                if self.batch_events:
+                    self.emit("listens", ListenBatch.join_json(documents), room)
+                else:
+                    for document in documents:
+                        self.emit(event_name, document, room)
+
         message.ack()
+        self.record_latency(monotonic() - start)
+
+    def publish_playlist_update(self, playlist_id, data):
+        """ Relay a playlist update to the websockets servers of all the nodes. """
+        body = orjson.dumps({"playlist_id": playlist_id, "data": data})
+        with rabbitmq_connection.rabbitmq.acquire(block=True, timeout=60) as producer:
+            producer.publish(body, exchange=self.playlist_exchange, routing_key="", declare=[self.playlist_exchange])
+
+    def send_playlist_update(self, message):
+        """ Emit a playlist update relayed by any node to the collaborators of the playlist connected to this one. """
+        update = orjson.loads(message.body)
+        if self.has_subscribers(update["playlist_id"]):
+            self.socketio.emit("playlist_changed", update["data"], to=update["playlist_id"])
+            self.emitted_events += 1
+        message.ack()
+
+    def emit(self, event_name, document: bytes, room):
+        self.socketio.emit(event_name, document.decode("utf-8"), to=room)
+        self.emitted_events += 1
+
+    def record_latency(self, latency):
+        """ Record the time taken to emit the events of a message and periodically report the metrics. """
+        self.processed_messages += 1
+        self.emit_latency_total += latency
+        self.emit_latency_max = max(self.emit_latency_max, latency)
+
+        if monotonic() < self.metric_submission_time:
+            return
+        self.metric_submission_time = monotonic() + METRIC_UPDATE_INTERVAL
+        try:
+            metrics.set(
+                "websockets_dispatcher",
+                emitted_events=self.emitted_events,
+                dropped_listens=self.dropped_listens,
+                avg_emit_latency_ms=self.emit_latency_total / self.processed_messages * 1000,
+                max_emit_latency_ms=self.emit_latency_max * 1000
+            )
+        except Exception:
+            self.app.logger.error("Could not submit websockets dispatcher metrics:", exc_info=True)
+        self.emitted_events = self.dropped_listens = self.processed_messages = 0
+        self.emit_latency_total = self.emit_latency_max = 0.0
 
     def get_consumers(self, _, channel):
         self.playing_now_channel = channel.connection.channel()
-        return [
+        consumers = [
             Consumer(channel, queues=[self.websockets_queue],
                      on_message=lambda x: self.send_listens("listen", x)),
             Consumer(self.playing_now_channel, queues=[self.playing_now_queue],
                      on_message=lambda x: self.send_listens("playing_now", x))
         ]
+        if self.playlist_queue is not None:
+            consumers.append(Consumer(channel, queues=[self.playlist_queue], on_message=self.send_playlist_update))
+        return consumers
 
     def on_consume_end(self, connection, default_channel):
         if self.playing_now_channel:
@@ -1,5 +1,6 @@
 import eventlet
 
+from flask import current_app
 from flask_login import current_user
 from flask_socketio import SocketIO, join_room, emit, disconnect
 from werkzeug.exceptions import BadRequest
@@ -11,6 +12,7 @@ from listenbrainz.websockets.listens_dispatcher import ListensDispatcher
 eventlet.monkey_patch(all=False, socket=True)
 
 socketio = SocketIO(cors_allowed_origins='*', logger=True, engineio_logger=True)
+dispatcher: ListensDispatcher = None
 
 
 @socketio.on('json')
@@ -27,7 +29,11 @@ def dispatch_playlist_updates(data):
     identifier = data['identifier']
     idx = identifier.rfind('/')
     playlist_id = identifier[idx + 1:]
-    emit('playlist_changed', data, to=playlist_id)
+    if current_app.config.get("WEBSOCKETS_EXCLUSIVE_QUEUES", False):
+        # the collaborators of the playlist may be connected to other nodes
+        dispatcher.publish_playlist_update(playlist_id, data)
+    else:
+        emit('playlist_changed', data, to=playlist_id)
 
 
 @socketio.on('joined')
@@ -44,6 +50,7 @@ def joined(data):
 
 
 def run_websockets(app, host='0.0.0.0', port=7082, debug=True):
+    global dispatcher
     socketio.init_app(app)
     dispatcher = ListensDispatcher(app, socketio)
     socketio.start_background_task(dispatcher.start)
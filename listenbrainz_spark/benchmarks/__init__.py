@@ -0,0 +1,9 @@
+""" Benchmarks for the hot paths of the spark request consumer.
+
+Each module in this package is a standalone script meant to be run in the spark container started with
+develop.sh, for instance::
+
+    python -m listenbrainz_spark.benchmarks.result_collection --rows 1000000
+
+They are not run as part of the test suite.
+"""
@@ -0,0 +1,49 @@
+""" Compare the time to generate the whole set of daily stats of a stats range with one IncrementalStatsEngine run per
+stat, like the individual stats queries, and with :class:`BatchIncrementalStatsEngine`, like the ``stats.all``
+query, which scans the listens once per date range.
+
+Uses the listens and metadata caches already imported in HDFS (e.g. with the dumps of the development setup). The
+existing partial aggregates of the stats are removed before each method so that both scan the full dump listens,
+the messages are generated but not sent.
+"""
+import argparse
+
+import listenbrainz_spark
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.stats.batch import create_all_stats_engines
+from listenbrainz_spark.stats.incremental.batch_stats_engine import BatchIncrementalStatsEngine
+
+
+def remove_aggregates(engines):
+    for engine in engines:
+        hdfs_connection.client.delete(engine.provider.get_existing_aggregate_path(), recursive=True)
+        hdfs_connection.client.delete(engine.provider.get_bookkeeping_path(), recursive=True)
+
+
+def run(name, stats_range, batched):
+    engines = create_all_stats_engines(stats_range)
+    remove_aggregates(engines)
+    timer = Timer()
+    with timer.time():
+        if batched:
+            messages = sum(1 for _ in BatchIncrementalStatsEngine(engines).run())
+        else:
+            messages = sum(1 for engine in engines for _ in engine.run())
+    report(name, len(engines), timer.total, messages=messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--range", dest="stats_range", default="month", help="Stats range to generate")
+    args = parser.parse_args()
+
+    listenbrainz_spark.init_spark_session("batch-stats-benchmark")
+    hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+
+    run("one engine per stat", args.stats_range, batched=False)
+    run("batch", args.stats_range, batched=True)
+
+
+if __name__ == "__main__":
+    main()
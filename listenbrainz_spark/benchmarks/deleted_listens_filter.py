@@ -0,0 +1,71 @@
+""" Compare removing the deleted listens with a plain anti join of all the listens against the deleted listens and
+with the index of the user months which have deleted listens (see
+:func:`listenbrainz_spark.listens.data.filter_deleted_listens_with_index`).
+
+Synthetic listens of --users users over --months months are generated, and --deleted of them are deleted, spread
+over the users and months. Both methods are timed on all the listens and on the listens of the last month only.
+"""
+import argparse
+from datetime import datetime
+
+import listenbrainz_spark
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz_spark.listens.data import anti_join_deleted_listens, filter_deleted_listens_with_index
+from listenbrainz_spark.stats import run_query
+
+
+def generate_listens(users, months, listens_per_month):
+    return run_query(f"""
+        WITH listens AS (
+            SELECT CAST(user.id AS INT) AS user_id
+                 , timestamp_seconds(
+                        unix_timestamp(add_months(DATE '2020-01-01', CAST(month.id AS INT))) + listen.id * 60
+                   ) AS listened_at
+                 , uuid() AS recording_msid
+              FROM range(1, {users + 1}) AS user
+        CROSS JOIN range(0, {months}) AS month
+        CROSS JOIN range(0, {listens_per_month}) AS listen
+        )
+        SELECT user_id, listened_at, listened_at AS created, recording_msid FROM listens
+    """)
+
+
+def time_filter(name, df, rows):
+    timer = Timer()
+    with timer.time():
+        df.write.format("noop").mode("overwrite").save()
+    report(name, rows, timer.total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000, help="Number of users")
+    parser.add_argument("--months", type=int, default=24, help="Number of months of listens")
+    parser.add_argument("--listens-per-month", type=int, default=50, help="Number of listens of a user per month")
+    parser.add_argument("--deleted", type=int, default=1000, help="Number of deleted listens")
+    args = parser.parse_args()
+
+    listenbrainz_spark.init_spark_session("deleted-listens-filter-benchmark")
+
+    listens_df = generate_listens(args.users, args.months, args.listens_per_month).cache()
+    rows = listens_df.count()
+    delete_df = listens_df.sample(fraction=min(1.0, 2 * args.deleted / rows)).limit(args.deleted).cache()
+    delete_df.count()
+    index_df = delete_df \
+        .selectExpr("user_id", "year(listened_at) AS year", "month(listened_at) AS month") \
+        .distinct() \
+        .cache()
+
+    time_filter("anti join", anti_join_deleted_listens(listens_df, delete_df), rows)
+    time_filter("index", filter_deleted_listens_with_index(listens_df, delete_df, index_df, None, None), rows)
+
+    last_month = datetime(2020 + (args.months - 1) // 12, (args.months - 1) % 12 + 1, 1)
+    month_df = listens_df.where(listens_df.listened_at >= last_month).cache()
+    month_rows = month_df.count()
+    time_filter("last month anti join", anti_join_deleted_listens(month_df, delete_df), month_rows)
+    time_filter("last month index",
+                filter_deleted_listens_with_index(month_df, delete_df, index_df, last_month, None), month_rows)
+
+
+if __name__ == "__main__":
+    main()
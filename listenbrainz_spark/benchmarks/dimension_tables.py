@@ -0,0 +1,88 @@
+""" Compare the time of the artist aggregation join of the stats queries when the dimension table is read from HDFS
+for every query and joined with the default strategy, and when it is taken from the registry of
+:mod:`listenbrainz_spark.dimensions` (persisted once and broadcast if below SPARK_DIMENSION_BROADCAST_THRESHOLD).
+
+--listens synthetic listens over --artists artists and a dimension table of --artists rows stored in HDFS are
+generated, then the aggregation is run --queries times with each method, like the daily stats jobs do with the
+same caches. The listens are cached and counted beforehand so that only the joins are measured. The join strategies
+used by each method are reported along with the time.
+"""
+import argparse
+
+import listenbrainz_spark
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz_spark import config, dimensions, hdfs_connection
+from listenbrainz_spark.stats import run_query
+from listenbrainz_spark.utils import read_files_from_HDFS, save_parquet
+
+BENCHMARK_DIMENSION_PATH = "/benchmarks/dimension"
+
+
+def aggregate(cache_table):
+    return run_query(f"""
+        SELECT user_id
+             , COALESCE(d.artist_name, l.artist_name) AS artist_name
+             , count(*) AS listen_count
+          FROM benchmark_listens l
+     LEFT JOIN {cache_table} d
+            ON l.artist_mbid = d.artist_mbid
+      GROUP BY user_id
+             , COALESCE(d.artist_name, l.artist_name)
+    """)
+
+
+def with_default_read():
+    read_files_from_HDFS(BENCHMARK_DIMENSION_PATH).createOrReplaceTempView("benchmark_dimension")
+    return aggregate("benchmark_dimension")
+
+
+def with_registry():
+    return aggregate(dimensions.get_dimension_table("benchmark_dimension_cached", BENCHMARK_DIMENSION_PATH))
+
+
+def run(name, method, queries, listens):
+    timer = Timer()
+    strategies = None
+    for _ in range(queries):
+        with timer.time():
+            df = method()
+            df.write.format("noop").mode("overwrite").save()
+        strategies = dimensions.get_join_strategies(df)
+    report(name, queries * listens, timer.total, joins=dict(strategies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listens", type=int, default=10_000_000, help="Number of listens")
+    parser.add_argument("--artists", type=int, default=500_000, help="Number of artists in the dimension table")
+    parser.add_argument("--queries", type=int, default=5, help="Number of stats queries run with each method")
+    args = parser.parse_args()
+
+    listenbrainz_spark.init_spark_session("dimension-tables-benchmark")
+    hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+
+    save_parquet(run_query(f"""
+        SELECT CAST(id AS STRING) AS artist_mbid
+             , CONCAT('artist ', id) AS artist_name
+          FROM range(0, {args.artists})
+    """), BENCHMARK_DIMENSION_PATH)
+
+    listens = run_query(f"""
+        SELECT CAST(id % 100000 AS INT) AS user_id
+             , CAST(CAST(rand(1) * {args.artists} AS BIGINT) AS STRING) AS artist_mbid
+             , 'unmatched artist' AS artist_name
+          FROM range(0, {args.listens})
+    """).cache()
+    listens.count()
+    listens.createOrReplaceTempView("benchmark_listens")
+
+    try:
+        run("read per query, default join", with_default_read, args.queries, args.listens)
+        run("dimension registry", with_registry, args.queries, args.listens)
+    finally:
+        dimensions.unpersist_dimension_tables()
+        hdfs_connection.client.delete(BENCHMARK_DIMENSION_PATH, recursive=True)
+
+
+if __name__ == "__main__":
+    main()
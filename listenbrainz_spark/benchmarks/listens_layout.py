@@ -0,0 +1,101 @@
+""" Compare the month and user_sorted layouts of the base listens (see :mod:`listenbrainz_spark.listens.metadata`).
+
+The listens of the testdata full dump are uploaded to HDFS and scaled up --scale times, each copy with its own user
+ids, then written in both layouts to temporary HDFS directories. The write time is reported, and for each layout
+the time of user scoped reads with :func:`listenbrainz_spark.listens.data.get_base_listens_df`: the listens of
+a single user, of --users users and a per user aggregation over all listens.
+"""
+import argparse
+import os
+import uuid
+
+import listenbrainz_spark
+from listenbrainz.benchmarks import Timer, report
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.hdfs.utils import upload_to_HDFS
+from listenbrainz_spark.listens.compact import arrange_listens
+from listenbrainz_spark.listens.data import get_base_listens_df
+from listenbrainz_spark.listens.metadata import LAYOUT_MONTH, LAYOUT_USER_SORTED
+from listenbrainz_spark.stats import run_query
+
+TEST_DUMP_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "testdata", "full-dump-1")
+BENCHMARK_DIRECTORY = "/benchmarks/listens_layout"
+
+
+def upload_test_dump():
+    dump_path = os.path.join(BENCHMARK_DIRECTORY, "dump")
+    for file_name in os.listdir(TEST_DUMP_PATH):
+        if file_name.endswith(".parquet"):
+            upload_to_HDFS(os.path.join(dump_path, file_name), os.path.join(TEST_DUMP_PATH, file_name))
+    return dump_path
+
+
+def scale_up(dump_path, scale):
+    listenbrainz_spark.session.read.parquet(config.HDFS_CLUSTER_URI + dump_path).createOrReplaceTempView("test_dump")
+    max_user_id = run_query("SELECT max(user_id) AS max_user_id FROM test_dump").collect()[0].max_user_id
+    return run_query(f"""
+        SELECT extract(year from listened_at) AS year
+             , extract(month from listened_at) AS month
+             , listened_at
+             , created
+             , CAST(user_id + copy.id * {max_user_id + 1} AS INT) AS user_id
+             , recording_msid
+             , artist_name
+             , artist_credit_id
+             , release_name
+             , release_mbid
+             , recording_name
+             , recording_mbid
+             , artist_credit_mbids
+          FROM test_dump
+    CROSS JOIN range(0, {scale}) AS copy
+    """), max_user_id
+
+
+def time_query(name, layout, df, rows):
+    timer = Timer()
+    with timer.time():
+        df.write.format("noop").mode("overwrite").save()
+    report(f"{layout} {name}", rows, timer.total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=1000, help="Number of copies of the test dump listens")
+    parser.add_argument("--users", type=int, default=100, help="Number of users of the multiple users read")
+    args = parser.parse_args()
+
+    listenbrainz_spark.init_spark_session("listens-layout-benchmark")
+    hdfs_connection.init_hdfs(config.HDFS_HTTP_URI)
+
+    try:
+        listens, max_user_id = scale_up(upload_test_dump(), args.scale)
+        listens = listens.cache()
+        rows = listens.count()
+        # users spread over the whole range of user ids
+        step = max(1, args.scale * (max_user_id + 1) // args.users)
+        users = list(range(1, args.scale * (max_user_id + 1), step))[:args.users]
+
+        for layout in [LAYOUT_MONTH, LAYOUT_USER_SORTED]:
+            location = os.path.join(BENCHMARK_DIRECTORY, layout, str(uuid.uuid4()))
+            timer = Timer()
+            with timer.time():
+                arrange_listens(listens, layout) \
+                    .write \
+                    .partitionBy("year", "month") \
+                    .mode("overwrite") \
+                    .parquet(config.HDFS_CLUSTER_URI + location)
+            report(f"{layout} write", rows, timer.total)
+
+            time_query("single user", layout, get_base_listens_df(location, None, None, users[:1]), rows)
+            time_query(f"{len(users)} users", layout, get_base_listens_df(location, None, None, users), rows)
+            get_base_listens_df(location, None, None).createOrReplaceTempView("layout_listens")
+            time_query("per user aggregation", layout, run_query("""
+                SELECT user_id, count(*) AS listen_count FROM layout_listens GROUP BY user_id
+            """), rows)
+    finally:
+        hdfs_connection.client.delete(BENCHMARK_DIRECTORY, recursive=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+""" Measure the driver CPU time spent collecting query results and building the json messages sent to ListenBrainz,
+with ``toLocalIterator()`` and ``Row.asDict(recursive=True)`` and with the Arrow based
+:func:`listenbrainz_spark.results.iterate_chunks`.
+
+Two datasets of --rows rows are generated in spark: flat rows shaped like the similar recordings dataset and nested
+rows shaped like the user top artists stats (--entities artists per row). They are cached and counted beforehand so
+that only the collection is measured. The driver CPU time (user + system of this process, which excludes the JVM)
+per million rows and the wall clock time are reported for each method.
+"""
+import argparse
+import json
+import time
+
+import orjson
+from more_itertools import chunked
+
+import listenbrainz_spark
+from listenbrainz.benchmarks import report
+from listenbrainz_spark.results import iterate_chunks
+from listenbrainz_spark.stats import run_query
+
+ROWS_PER_MESSAGE = 10000
+
+
+def with_row_iterator(df):
+    for rows in chunked(df.toLocalIterator(), ROWS_PER_MESSAGE):
+        yield json.dumps({"data": [row.asDict(recursive=True) for row in rows]})
+
+
+def with_arrow(df):
+    for rows in iterate_chunks(df, ROWS_PER_MESSAGE):
+        yield orjson.dumps({"data": rows})
+
+
+def run(name, method, df, rows):
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    size = sum(len(body) for body in method(df))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    report(name, rows, wall, cpu_s_per_million_rows=round(cpu / rows * 1_000_000, 3),
+           message_mb=round(size / 1024 / 1024, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of rows of each dataset")
+    parser.add_argument("--entities", type=int, default=25, help="Number of entities in each nested row")
+    args = parser.parse_args()
+
+    listenbrainz_spark.init_spark_session("result-collection-benchmark")
+    listenbrainz_spark.session.range(0, args.rows).createOrReplaceTempView("benchmark_ids")
+
+    flat = run_query("""
+        SELECT uuid() AS mbid0
+             , uuid() AS mbid1
+             , CAST(id % 1000 AS INT) AS score
+          FROM benchmark_ids
+    """).cache()
+    nested = run_query(f"""
+        SELECT id AS user_id
+             , {args.entities} AS artists_count
+             , transform(sequence(1, {args.entities}), idx -> named_struct(
+                    'artist_name', CONCAT('artist ', idx),
+                    'artist_mbid', uuid(),
+                    'listen_count', idx
+               )) AS artists
+          FROM benchmark_ids
+    """).cache()
+    flat.count()
+    nested.count()
+
+    for name, df in [("flat", flat), ("nested", nested)]:
+        run(f"{name} toLocalIterator + asDict", with_row_iterator, df, args.rows)
+        run(f"{name} arrow", with_arrow, df, args.rows)
+
+
+if __name__ == "__main__":
+    main()
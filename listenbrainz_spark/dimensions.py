@@ -0,0 +1,125 @@
+""" Registry of the dimension tables, the metadata caches imported to HDFS from MusicBrainz, that the stats and
+similarity queries join with listens.
+
+Each table is read from HDFS once per process, persisted at the SPARK_DIMENSION_STORAGE_LEVEL storage level and
+registered as a temporary view. Before a cached table is reused, the modification time of its directory in HDFS is
+checked and the table is reloaded if the cache was imported again since (the import overwrites the directory).
+Tables whose estimated size in memory is at most SPARK_DIMENSION_BROADCAST_THRESHOLD bytes are registered with a
+broadcast hint, so that the joins with listens broadcast them to the executors instead of shuffling the listens. The
+size in memory is estimated as the size of the compressed parquet files times SPARK_DIMENSION_SIZE_EXPANSION_FACTOR.
+The hint bypasses spark.sql.autoBroadcastJoinThreshold, so the threshold defaults to the same 10MB as Spark.
+"""
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import broadcast
+
+from listenbrainz_spark import config, hdfs_connection
+from listenbrainz_spark.exceptions import PathNotFoundException
+from listenbrainz_spark.utils import read_files_from_HDFS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_LEVEL = "DISK_ONLY"
+DEFAULT_BROADCAST_THRESHOLD = 10 * 1024 * 1024
+DEFAULT_SIZE_EXPANSION_FACTOR = 4
+
+_JOIN_STRATEGY_PATTERN = re.compile(
+    r"\b(BroadcastHashJoin|ShuffledHashJoin|SortMergeJoin|BroadcastNestedLoopJoin|CartesianProduct)\b"
+)
+
+
+@dataclass
+class _DimensionTable:
+    df: DataFrame
+    modification_time: int
+    size: int
+    broadcast: bool
+
+
+_tables: dict[str, _DimensionTable] = {}
+
+
+def _get_storage_level() -> StorageLevel:
+    return getattr(StorageLevel, getattr(config, "SPARK_DIMENSION_STORAGE_LEVEL", DEFAULT_STORAGE_LEVEL))
+
+
+def _get_broadcast_threshold() -> int:
+    return getattr(config, "SPARK_DIMENSION_BROADCAST_THRESHOLD", DEFAULT_BROADCAST_THRESHOLD)
+
+
+def _estimate_memory_size(size: int) -> int:
+    """ Estimate the size in memory of a table from the size of its parquet files. """
+    return int(size * getattr(config, "SPARK_DIMENSION_SIZE_EXPANSION_FACTOR", DEFAULT_SIZE_EXPANSION_FACTOR))
+
+
+def get_dimension_table(name: str, path: str) -> str:
+    """ Register the dimension table stored at the given path in HDFS as a temporary view, reusing the cached
+    dataframe if the table hasn't changed in HDFS since it was loaded.
+
+        Args:
+            name: the name of the temporary view
+            path: the HDFS path of the parquet files of the table
+
+        Returns:
+            the name of the temporary view
+    """
+    status = hdfs_connection.client.status(path, strict=False)
+    if status is None:
+        raise PathNotFoundException("Dimension table does not exist", path)
+
+    table = _tables.get(name)
+    if table is not None and table.modification_time == status["modificationTime"]:
+        return name
+
+    unpersist_dimension_table(name)
+
+    size = hdfs_connection.client.content(path)["length"]
+    threshold = _get_broadcast_threshold()
+    is_broadcast = 0 < threshold and _estimate_memory_size(size) <= threshold
+
+    df = read_files_from_HDFS(path)
+    df.persist(_get_storage_level())
+    # the hint is kept in the plan of the view, the cached data is still used because the plan under the hint
+    # is the one that was persisted
+    (broadcast(df) if is_broadcast else df).createOrReplaceTempView(name)
+
+    _tables[name] = _DimensionTable(df, status["modificationTime"], size, is_broadcast)
+    logger.info("Loaded dimension table %s from %s (%d bytes, about %d bytes in memory, %s)", name, path, size,
+                _estimate_memory_size(size), "broadcast" if is_broadcast else "not broadcast")
+    return name
+
+
+def unpersist_dimension_table(name: str):
+    """ Unpersist the dimension table, it will be read again from HDFS the next time it is requested. """
+    table = _tables.pop(name, None)
+    if table is not None:
+        table.df.unpersist()
+
+
+def unpersist_dimension_tables():
+    """ Unpersist all the dimension tables loaded in this process. """
+    for name in list(_tables):
+        unpersist_dimension_table(name)
+
+
+def get_join_strategies(df: DataFrame) -> Counter:
+    """ Count the join strategies, e.g. BroadcastHashJoin or SortMergeJoin, in the physical plan of the dataframe.
+
+    With adaptive query execution enabled, this is the plan before execution, joins may still be converted to
+    broadcast joins at runtime.
+    """
+    plan = df._jdf.queryExecution().executedPlan().toString()
+    return Counter(_JOIN_STRATEGY_PATTERN.findall(plan))
+
+
+def log_join_strategies(description: str, df: DataFrame):
+    """ Log the join strategies planned for the query of the dataframe. """
+    strategies = get_join_strategies(df)
+    if strategies:
+        logger.info("Join strategies of %s: %s", description,
+                    ", ".join(f"{count} {strategy}" for strategy, count in strategies.most_common()))
@@ -9,6 +9,7 @@ from listenbrainz_spark.utils import read_files_from_HDFS
 _incremental_listens_df: Optional[DataFrame] = None
 _incremental_users_df: Optional[DataFrame] = None
 _deleted_listens_df: Optional[DataFrame] = None
+_deleted_listens_index_df: Optional[DataFrame] = None
 _deleted_users_listen_history_df: Optional[DataFrame] = None
 
 
@@ -23,10 +24,13 @@ def unpersist_incremental_df():
 
 
 def unpersist_deleted_df():
-    global _deleted_listens_df, _deleted_users_listen_history_df
+    global _deleted_listens_df, _deleted_listens_index_df, _deleted_users_listen_history_df
     if _deleted_listens_df is not None:
         _deleted_listens_df.unpersist()
         _deleted_listens_df = None
+    if _deleted_listens_index_df is not None:
+        _deleted_listens_index_df.unpersist()
+        _deleted_listens_index_df = None
     if _deleted_users_listen_history_df is not None:
         _deleted_users_listen_history_df.unpersist()
         _deleted_users_listen_history_df = None
@@ -66,6 +70,17 @@ def get_deleted_listens_df() -> DataFrame:
     return _deleted_listens_df
 
 
+def get_deleted_listens_index_df() -> DataFrame:
+    """ Loads the (user_id, year, month) keys of the months of users that have deleted listens """
+    global _deleted_listens_index_df
+    if _deleted_listens_index_df is None:
+        listens_location = get_listens_metadata().location
+        deleted_listens_index_location = os.path.join(listens_location, "deleted-listens-index")
+        _deleted_listens_index_df = read_files_from_HDFS(deleted_listens_index_location)
+        _deleted_listens_index_df.persist()
+    return _deleted_listens_index_df
+
+
 def get_deleted_users_listen_history_df() -> DataFrame:
     global _deleted_users_listen_history_df
     if _deleted_users_listen_history_df is None:
@@ -1,12 +1,15 @@
 import os
 
+from pyspark.sql import DataFrame
+
 import listenbrainz_spark
 from listenbrainz_spark import hdfs_connection
 from listenbrainz_spark.hdfs.utils import path_exists
 from listenbrainz_spark.listens.cache import unpersist_incremental_df
 from listenbrainz_spark.listens.data import get_listens_from_dump
+from listenbrainz_spark.listens.delete import get_max_folded_deleted_listen_id
 from listenbrainz_spark.listens.metadata import get_listens_metadata, generate_new_listens_location, \
-    update_listens_metadata
+    update_listens_metadata, get_configured_layout, LAYOUT_USER_SORTED
 from listenbrainz_spark.path import LISTENBRAINZ_BASE_STATS_DIRECTORY
 
 
@@ -15,18 +18,37 @@ def main():
     Compacts listen storage by processing base and incremental listen records.
 
     Reads base and incremental listen records, removes deleted listens, and stores the final
-    processed data partitioned by year and month in a new HDFS location.
+    processed data partitioned by year and month in a new HDFS location. The deleted listens are
+    folded into the new base listens: the new location starts without deleted listens and only the
+    listens deleted after the latest one removed here are imported again.
     """
     table = "listens_to_compact"
+    max_folded_deleted_listen_id = get_max_folded_deleted_listen_id(get_listens_metadata().location)
     old_df = get_listens_from_dump(include_incremental=True, remove_deleted=True)
     old_df.createOrReplaceTempView(table)
 
-    write_partitioned_listens(table)
+    write_partitioned_listens(table, max_folded_deleted_listen_id)
+
 
+def arrange_listens(df: DataFrame, layout: str) -> DataFrame:
+    """ Arrange the listens dataframe, with year and month columns, for writing in the given layout. """
+    if layout == LAYOUT_USER_SORTED:
+        return df \
+            .repartitionByRange("year", "month", "user_id") \
+            .sortWithinPartitions("year", "month", "user_id", "listened_at")
+    return df
 
-def write_partitioned_listens(table):
+
+def write_partitioned_listens(table, max_folded_deleted_listen_id=None):
     """ Read listens from the given table and write them to a new HDFS location partitioned
-     by listened_at's year and month. """
+     by listened_at's year and month.
+
+     With the user_sorted layout (SPARK_LISTENS_LAYOUT), the listens of each month are also range partitioned and
+     sorted by user_id, so that each parquet file and row group covers a narrow range of user ids. The min/max
+     statistics of the files then let filters on user_id skip most of the data of a month.
+
+     max_folded_deleted_listen_id is the id of the latest deleted listen already removed from the listens
+     in the table, if any. """
     query = f"""
         select extract(year from listened_at) as year
              , extract(month from listened_at) as month
@@ -35,10 +57,9 @@ def write_partitioned_listens(table):
     """
     new_location = generate_new_listens_location()
     new_base_listens_location = os.path.join(new_location, "base")
+    layout = get_configured_layout()
 
-    listenbrainz_spark \
-        .session \
-        .sql(query) \
+    arrange_listens(listenbrainz_spark.session.sql(query), layout) \
         .write \
         .partitionBy("year", "month") \
         .mode("overwrite") \
@@ -59,7 +80,8 @@ def write_partitioned_listens(table):
     else:
         existing_location = metadata.location
 
-    update_listens_metadata(new_location, result.max_listened_at, result.max_created)
+    update_listens_metadata(new_location, result.max_listened_at, result.max_created, layout,
+                            max_folded_deleted_listen_id)
 
     unpersist_incremental_df()
 
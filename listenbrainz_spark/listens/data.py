@@ -2,16 +2,17 @@ import os
 import os.path
 from datetime import datetime
 from textwrap import dedent
-from typing import Optional
+from typing import Optional, List
 
 from dateutil.relativedelta import relativedelta
 from pyspark.sql import functions, DataFrame
+from pyspark.sql.types import StructType, StructField, IntegerType
 
 import listenbrainz_spark
 from listenbrainz_spark import hdfs_connection
 from listenbrainz_spark.listens.cache import get_incremental_listens_df, \
-    get_deleted_listens_df, get_deleted_users_listen_history_df
-from listenbrainz_spark.listens.metadata import get_listens_metadata
+    get_deleted_listens_df, get_deleted_listens_index_df, get_deleted_users_listen_history_df
+from listenbrainz_spark.listens.metadata import get_listens_metadata, get_listens_layout, LAYOUT_USER_SORTED
 from listenbrainz_spark.schema import listens_new_schema
 
 
@@ -23,7 +24,8 @@ def incremental_listens_exist() -> bool:
 
 
 def get_listens_from_dump(start: datetime = None, end: datetime = None,
-                          include_incremental: bool = True, remove_deleted: bool = False) -> DataFrame:
+                          include_incremental: bool = True, remove_deleted: bool = False,
+                          user_ids: List[int] = None) -> DataFrame:
     """ Load listens with listened_at between from_ts and to_ts from HDFS in a spark dataframe.
 
         Args:
@@ -31,6 +33,10 @@ def get_listens_from_dump(start: datetime = None, end: datetime = None,
             end: maximum time to include a listen in the dataframe
             include_incremental: if True, also include listens from incremental dumps
             remove_deleted: if True, also remove deleted listens from the dataframe
+            user_ids: if not None, only include the listens of these users. with the user_sorted layout and at
+                most spark.sql.parquet.pushdown.inFilterThreshold users, the filter is pushed down to the parquet
+                scan of the base listens to skip the files and row groups of other users, otherwise the listens
+                are semi joined with the (broadcast) user ids.
 
         Returns:
             dataframe of listens with listened_at between start and end
@@ -41,16 +47,25 @@ def get_listens_from_dump(start: datetime = None, end: datetime = None,
     base_listens_location = os.path.join(metadata.location, "base")
 
     if hdfs_connection.client.status(base_listens_location, strict=False):
-        full_df = get_base_listens_df(base_listens_location, start, end)
+        if user_ids is not None and get_listens_layout(metadata) == LAYOUT_USER_SORTED \
+                and len(user_ids) <= get_parquet_in_filter_threshold():
+            full_df = get_base_listens_df(base_listens_location, start, end, user_ids)
+        else:
+            full_df = get_base_listens_df(base_listens_location, start, end)
+            if user_ids is not None:
+                full_df = filter_listens_by_users(full_df, user_ids)
         df = df.union(full_df)
 
     if include_incremental and incremental_listens_exist():
-        df = df.union(get_incremental_listens_df())
+        inc_df = get_incremental_listens_df()
+        if user_ids is not None:
+            inc_df = filter_listens_by_users(inc_df, user_ids)
+        df = df.union(inc_df)
 
     df = filter_listens_by_range(df, start, end)
 
     if remove_deleted:
-        df = filter_deleted_listens(df, metadata.location)
+        df = filter_deleted_listens(df, metadata.location, start, end)
 
     return df
 
@@ -64,15 +79,105 @@ def filter_listens_by_range(listens_df: DataFrame, start: Optional[datetime], en
     return listens_df
 
 
-def filter_deleted_listens(listens_df: DataFrame, location: str) -> DataFrame:
-    """ Filter listens dataframe to remove listens that have been deleted from LB db. """
+def get_parquet_in_filter_threshold() -> int:
+    """ The maximum number of values of an IN filter that spark pushes down to parquet as is, larger ones are
+    pushed down as a min/max range which doesn't skip anything when the values are spread out. """
+    return int(listenbrainz_spark.session.conf.get("spark.sql.parquet.pushdown.inFilterThreshold", "10"))
+
+
+def filter_listens_by_users(listens_df: DataFrame, user_ids: List[int]) -> DataFrame:
+    """ Filter listens dataframe to only keep the listens of the given users, semi joining it with the broadcast
+    user ids instead of adding a (possibly very long) IN list to the query. """
+    users_df = listenbrainz_spark.session.createDataFrame(
+        [(int(user_id),) for user_id in user_ids],
+        schema=StructType([StructField("user_id", IntegerType(), nullable=False)])
+    )
+    return listens_df \
+        .join(functions.broadcast(users_df), "user_id", "left_semi") \
+        .select(*listens_df.columns)
+
+
+DELETED_LISTENS_KEY = ["user_id", "listened_at", "recording_msid", "created"]
+
+
+def get_deleted_listens_months(index_df: DataFrame, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """ Returns the (year, month) of the months between start and end which have deleted listens in the index. """
+    months = []
+    for row in index_df.select("year", "month").distinct().collect():
+        month = (row.year, row.month)
+        if start and month < (start.year, start.month):
+            continue
+        if end and month > (end.year, end.month):
+            continue
+        months.append(month)
+    return months
+
+
+def anti_join_deleted_listens(listens_df: DataFrame, delete_df: DataFrame) -> DataFrame:
+    """ Remove the deleted listens from the listens dataframe by anti joining all the listens with them. """
+    return listens_df.join(delete_df, DELETED_LISTENS_KEY, "anti").select(*listens_df.columns)
+
+
+def filter_deleted_listens_with_index(listens_df: DataFrame, delete_df: DataFrame, index_df: DataFrame,
+                                      start: Optional[datetime], end: Optional[datetime]) -> DataFrame:
+    """ Remove the deleted listens from the listens dataframe, using the index of the (user_id, year, month) which
+    have deleted listens to only look up the listens of those months of those users in the deleted listens.
+
+    The listens are returned as is, without any join, if no month between start and end has deleted listens.
+    Otherwise, the listens are left joined once with the (small, broadcast) index to flag the listens of the indexed
+    user months, and only the flagged listens get a key to match with the deleted listens in the anti join, so that
+    the listens are scanned only once.
+    """
+    if not get_deleted_listens_months(index_df, start, end):
+        return listens_df
+
+    columns = listens_df.columns
+    index_df = functions.broadcast(
+        index_df
+        .select("user_id", "year", "month")
+        .distinct()
+        .withColumn("has_deleted_listens", functions.lit(True))
+    )
+    flagged_df = listens_df \
+        .withColumn("year", functions.year("listened_at")) \
+        .withColumn("month", functions.month("listened_at")) \
+        .join(index_df, ["user_id", "year", "month"], "left")
+
+    # the listens of the other user months have a null key, which matches no deleted listen
+    has_deleted_listens = functions.col("has_deleted_listens").isNotNull()
+    delete_key = [f"deleted_{column}" for column in DELETED_LISTENS_KEY]
+    keyed_df = flagged_df.select(
+        *columns,
+        *[functions.when(has_deleted_listens, functions.col(column)).alias(key)
+          for column, key in zip(DELETED_LISTENS_KEY, delete_key)]
+    )
+    delete_df = delete_df.select(
+        *[functions.col(column).alias(key) for column, key in zip(DELETED_LISTENS_KEY, delete_key)]
+    )
+    return keyed_df.join(delete_df, delete_key, "anti").select(*columns)
+
+
+def filter_deleted_listens(listens_df: DataFrame, location: str,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None) -> DataFrame:
+    """ Filter listens dataframe to remove listens that have been deleted from LB db.
+
+        Args:
+            listens_df: the listens to filter
+            location: the location of the listens in HDFS
+            start: if set, the listens are known to have listened_at after start
+            end: if set, the listens are known to have listened_at before end
+    """
     deleted_listens_save_path = os.path.join(location, "deleted-listens")
     if hdfs_connection.client.status(deleted_listens_save_path, strict=False):
         delete_df = get_deleted_listens_df()
         if not delete_df.isEmpty():
-            listens_df = listens_df \
-                .join(delete_df, ["user_id", "listened_at", "recording_msid", "created"], "anti") \
-                .select(*listens_df.columns)
+            deleted_listens_index_path = os.path.join(location, "deleted-listens-index")
+            if hdfs_connection.client.status(deleted_listens_index_path, strict=False):
+                index_df = get_deleted_listens_index_df()
+                listens_df = filter_deleted_listens_with_index(listens_df, delete_df, index_df, start, end)
+            else:
+                # deleted listens imported before the index existed
+                listens_df = anti_join_deleted_listens(listens_df, delete_df)
 
     deleted_user_listen_history_save_path = os.path.join(location, "deleted-user-listen-history")
     if hdfs_connection.client.status(deleted_user_listen_history_save_path, strict=False):
@@ -86,17 +191,25 @@ def filter_deleted_listens(listens_df: DataFrame, location: str) -> DataFrame:
     return listens_df
 
 
-def get_base_listens_df(location, start: datetime, end: datetime):
-    if start is None and end is None:
-        where_clause = ""
-    else:
+def get_base_listens_df(location, start: datetime, end: datetime, user_ids: List[int] = None):
+    conditions = []
+    if start is not None or end is not None:
         filters = []
         current = start
         step = relativedelta(months=1)
         while current <= end:
             filters.append(f"(year = {current.year} AND month = {current.month})")
             current += step
-        where_clause = "where (\n       " + "\n    OR ".join(filters) + "\n       )"
+        conditions.append("(\n       " + "\n    OR ".join(filters) + "\n       )")
+    if user_ids is not None:
+        # an empty IN list is invalid, IN (NULL) matches no row
+        users = ", ".join(str(int(user_id)) for user_id in user_ids) or "NULL"
+        conditions.append(f"user_id IN ({users})")
+
+    if conditions:
+        where_clause = "where " + "\n  and ".join(conditions)
+    else:
+        where_clause = ""
 
     query = dedent(f"""\
         select listened_at
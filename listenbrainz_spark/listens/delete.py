@@ -1,15 +1,24 @@
 import os
 import uuid
+from typing import Optional
+
+from pyspark.sql import functions
 
 from listenbrainz_spark import config, hdfs_connection
 from listenbrainz_spark.hdfs.utils import move
-from listenbrainz_spark.listens.cache import unpersist_deleted_df
+from listenbrainz_spark.listens.cache import unpersist_deleted_df, get_deleted_listens_df
 from listenbrainz_spark.listens.metadata import get_listens_metadata
 from listenbrainz_spark.postgres.utils import load_from_db
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.utils import read_files_from_HDFS
 
 
+# ids of listen_delete_metadata are assigned when a row is inserted but the timescale cron only marks the committed rows
+# complete, a row committed late can become complete after rows with higher ids were folded into the base listens. the
+# deleted listens are imported again from this many ids below the folded ones and deduplicated so that it isn't missed.
+DEFAULT_DELETED_LISTENS_ID_OVERLAP = 10000
+
+
 def combine_if_exists(new_df, save_path, combine_query_template, table_suffix):
     """ If a dataframe already exists at the save path, load it and combine it with the new dataframe using the provided
     query. Otherwise, save the new dataframe at the save path directly.
@@ -40,7 +49,30 @@ def combine_if_exists(new_df, save_path, combine_query_template, table_suffix):
             .parquet(save_path)
 
 
+def get_max_folded_deleted_listen_id(location) -> Optional[int]:
+    """ Returns the id of the latest deleted listen removed from the listens at the given location, the deleted
+    listens up to this one are folded into the base listens when compacting them. """
+    metadata = get_listens_metadata()
+    max_folded_id = metadata.max_folded_deleted_listen_id if metadata is not None else None
+
+    deleted_listens_save_path = os.path.join(location, "deleted-listens")
+    if hdfs_connection.client.status(deleted_listens_save_path, strict=False):
+        max_deleted_id = get_deleted_listens_df() \
+            .agg(functions.max("id").alias("max_id")) \
+            .collect()[0]["max_id"]
+        if max_deleted_id is not None and (max_folded_id is None or max_deleted_id > max_folded_id):
+            max_folded_id = max_deleted_id
+
+    return max_folded_id
+
+
 def import_deleted_listens(location):
+    """ Import the deleted listens not yet folded into the base listens, and update the index of the user months
+    which have deleted listens.
+
+    The deleted listens are imported from SPARK_DELETED_LISTENS_ID_OVERLAP ids below the latest folded one, the
+    ones imported again are deduplicated with the existing ones.
+    """
     query = """
         SELECT id
              , user_id
@@ -50,7 +82,13 @@ def import_deleted_listens(location):
           FROM listen_delete_metadata
          WHERE status = 'complete'::listen_delete_metadata_status_enum
     """
+    metadata = get_listens_metadata()
+    if metadata is not None and metadata.max_folded_deleted_listen_id is not None:
+        overlap = getattr(config, "SPARK_DELETED_LISTENS_ID_OVERLAP", DEFAULT_DELETED_LISTENS_ID_OVERLAP)
+        query += f" AND id > {metadata.max_folded_deleted_listen_id - overlap}"
     new_listens_to_delete_df = load_from_db(config.TS_JDBC_URI, config.TS_USER, config.TS_PASSWORD, query)
+    # the new deleted listens are used for both the deleted listens and the index, load them once
+    new_listens_to_delete_df.persist()
     columns = "id, user_id, listened_at, recording_msid, created"
     query = f"""\
         WITH intermediate AS (
@@ -63,6 +101,24 @@ def import_deleted_listens(location):
     deleted_listens_save_path = os.path.join(location, "deleted-listens")
     combine_if_exists(new_listens_to_delete_df, deleted_listens_save_path, query, "listens_to_delete")
 
+    new_index_df = new_listens_to_delete_df.select(
+        "user_id",
+        functions.year("listened_at").alias("year"),
+        functions.month("listened_at").alias("month")
+    )
+    query = """\
+        WITH intermediate AS (
+            SELECT user_id, year, month FROM {new_table}
+             UNION ALL
+            SELECT user_id, year, month FROM {existing_table}
+        )
+            SELECT DISTINCT user_id, year, month FROM intermediate
+    """
+    deleted_listens_index_save_path = os.path.join(location, "deleted-listens-index")
+    combine_if_exists(new_index_df, deleted_listens_index_save_path, query, "deleted_listens_index")
+
+    new_listens_to_delete_df.unpersist()
+
 
 def import_deleted_user_listen_history(location):
     query = """SELECT id, user_id, max_created FROM deleted_user_listen_history"""
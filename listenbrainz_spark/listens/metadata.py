@@ -12,6 +12,12 @@ from listenbrainz_spark.hdfs.utils import create_dir
 from listenbrainz_spark.path import LISTENBRAINZ_LISTENS_METADATA, LISTENBRAINZ_LISTENS_DIRECTORY_PREFIX
 from listenbrainz_spark.schema import listens_metadata_schema
 
+# base listens partitioned by year and month of listened_at
+LAYOUT_MONTH = "month"
+# base listens partitioned by year and month, and range partitioned and sorted by user_id within each month so that
+# each parquet file (and row group) covers a narrow range of user ids, see write_partitioned_listens
+LAYOUT_USER_SORTED = "user_sorted"
+
 _listens_metadata_df: Optional[DataFrame] = None
 
 
@@ -29,13 +35,31 @@ def get_listens_metadata() -> Union[Row, None]:
         return _listens_metadata_df.collect()[0]
 
 
-def update_listens_metadata(new_location, max_listened_at, max_created):
+def get_configured_layout() -> str:
+    """ The layout to write base listens in, SPARK_LISTENS_LAYOUT in the config """
+    layout = getattr(config, "SPARK_LISTENS_LAYOUT", LAYOUT_MONTH)
+    if layout not in (LAYOUT_MONTH, LAYOUT_USER_SORTED):
+        raise ValueError(f"Unknown listens layout: {layout}")
+    return layout
+
+
+def get_listens_layout(metadata: Optional[Row]) -> str:
+    """ The layout of the base listens described by the given listens metadata """
+    if metadata is None or metadata.layout is None:
+        return LAYOUT_MONTH
+    return metadata.layout
+
+
+def update_listens_metadata(new_location, max_listened_at, max_created, layout=LAYOUT_MONTH,
+                            max_folded_deleted_listen_id=None):
     """ Update listens metadata in HDFS """
     row = Row(
         location=new_location,
         max_listened_at=max_listened_at,
         max_created=max_created,
-        updated_at=datetime.now(timezone.utc)
+        updated_at=datetime.now(timezone.utc),
+        layout=layout,
+        max_folded_deleted_listen_id=max_folded_deleted_listen_id
     )
     listenbrainz_spark \
         .session \
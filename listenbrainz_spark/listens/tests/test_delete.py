@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import listenbrainz_spark
+from listenbrainz_spark.listens.data import anti_join_deleted_listens, filter_deleted_listens_with_index, \
+    get_deleted_listens_months
+from listenbrainz_spark.tests import SparkNewTestCase
+
+
+class DeletedListensTestCase(SparkNewTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        listens = []
+        for user_id in range(1, 4):
+            for month in range(1, 4):
+                for day in range(1, 4):
+                    listened_at = datetime(2023, month, day, 12)
+                    listens.append((user_id, listened_at, f"msid-{user_id}-{month}-{day}", listened_at))
+        columns = ["user_id", "listened_at", "recording_msid", "created"]
+        cls.listens_df = listenbrainz_spark.session.createDataFrame(listens, columns)
+        # user 1 deleted a listen in January, user 2 a listen in March
+        cls.delete_df = listenbrainz_spark.session.createDataFrame([
+            (1, datetime(2023, 1, 2, 12), "msid-1-1-2", datetime(2023, 1, 2, 12)),
+            (2, datetime(2023, 3, 1, 12), "msid-2-3-1", datetime(2023, 3, 1, 12)),
+        ], columns)
+        cls.index_df = listenbrainz_spark.session.createDataFrame([(1, 2023, 1), (2, 2023, 3)],
+                                                                  ["user_id", "year", "month"])
+
+    @staticmethod
+    def collect_listens(df):
+        return sorted((row.user_id, row.recording_msid) for row in df.collect())
+
+    def test_get_deleted_listens_months(self):
+        self.assertEqual(sorted(get_deleted_listens_months(self.index_df, None, None)), [(2023, 1), (2023, 3)])
+        self.assertEqual(
+            get_deleted_listens_months(self.index_df, datetime(2023, 2, 1), datetime(2023, 3, 31)),
+            [(2023, 3)]
+        )
+        self.assertEqual(get_deleted_listens_months(self.index_df, datetime(2023, 2, 1), datetime(2023, 2, 28)), [])
+
+    def test_filter_deleted_listens_with_index(self):
+        expected = self.collect_listens(anti_join_deleted_listens(self.listens_df, self.delete_df))
+        self.assertEqual(len(expected), 25)
+        self.assertNotIn((1, "msid-1-1-2"), expected)
+        self.assertNotIn((2, "msid-2-3-1"), expected)
+
+        received_df = filter_deleted_listens_with_index(self.listens_df, self.delete_df, self.index_df, None, None)
+        self.assertEqual(received_df.columns, self.listens_df.columns)
+        self.assertEqual(self.collect_listens(received_df), expected)
+
+    def test_filter_deleted_listens_with_index_no_deleted_month(self):
+        # no deleted listens in February, the listens are returned without any join
+        start, end = datetime(2023, 2, 1), datetime(2023, 2, 28)
+        received_df = filter_deleted_listens_with_index(self.listens_df, self.delete_df, self.index_df, start, end)
+        self.assertIs(received_df, self.listens_df)
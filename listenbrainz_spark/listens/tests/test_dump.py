@@ -10,7 +10,10 @@ from listenbrainz_spark.hdfs.utils import (delete_dir, path_exists)
 from listenbrainz_spark.listens.data import get_listens_from_dump
 from listenbrainz_spark.listens.dump import import_full_dump_to_hdfs, import_incremental_dump_to_hdfs, \
     import_full_dump_handler, import_incremental_dump_handler
+from listenbrainz_spark.listens.metadata import get_listens_metadata, get_listens_layout, LAYOUT_MONTH, \
+    LAYOUT_USER_SORTED
 from listenbrainz_spark.path import IMPORT_METADATA
+from listenbrainz_spark import config
 from listenbrainz_spark.tests import SparkNewTestCase
 from listenbrainz_spark.utils import (read_files_from_HDFS)
 
@@ -53,6 +56,23 @@ class DumpImporterJobTestCase(SparkNewTestCase):
             .filter("dump_id == 1 AND dump_type == 'full'") \
             .count())
         self.assertEqual(68, get_listens_from_dump().count())
+        self.assertEqual(LAYOUT_MONTH, get_listens_layout(get_listens_metadata()))
+
+    def test_import_full_dump_to_hdfs_user_sorted(self):
+        with patch.object(config, "SPARK_LISTENS_LAYOUT", LAYOUT_USER_SORTED, create=True):
+            import_full_dump_to_hdfs(self.dump_loader, 1)
+        self.assertEqual(LAYOUT_USER_SORTED, get_listens_layout(get_listens_metadata()))
+
+        listens = get_listens_from_dump()
+        self.assertEqual(68, listens.count())
+        user_id = listens.first().user_id
+        expected = listens.where(f"user_id = {user_id}").count()
+        self.assertEqual(expected, get_listens_from_dump(user_ids=[user_id]).count())
+        self.assertEqual(0, get_listens_from_dump(user_ids=[]).count())
+
+        # more users than spark pushes down to parquet as an IN filter, the listens are semi joined with them
+        with patch("listenbrainz_spark.listens.data.get_parquet_in_filter_threshold", return_value=0):
+            self.assertEqual(expected, get_listens_from_dump(user_ids=[user_id]).count())
 
     def test_import_incremental_dump_to_hdfs(self):
         import_incremental_dump_to_hdfs(self.dump_loader, 2)
@@ -74,6 +94,13 @@ class DumpImporterJobTestCase(SparkNewTestCase):
         self.assertEqual(3, read_files_from_HDFS(IMPORT_METADATA).count())
         self.assertEqual(85, get_listens_from_dump().count())
 
+        # the listens of the base month layout and of the incremental dumps are filtered by user
+        listens = get_listens_from_dump()
+        user_ids = [row.user_id for row in listens.select("user_id").distinct().limit(2).collect()]
+        expected = listens.where(listens.user_id.isin(user_ids)).count()
+        self.assertEqual(expected, get_listens_from_dump(user_ids=user_ids).count())
+        self.assertEqual(0, get_listens_from_dump(user_ids=[]).count())
+
     @patch("ftplib.FTP")
     @patch.object(ListenBrainzFtpDumpLoader, "load_listens")
     @patch("listenbrainz_spark.listens.dump.upload_archive_to_hdfs_temp")
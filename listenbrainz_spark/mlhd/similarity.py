@@ -1,7 +1,8 @@
 from more_itertools import chunked
 
 from listenbrainz_spark.mlhd.download import MLHD_PLUS_CHUNKS
-from listenbrainz_spark.path import RECORDING_LENGTH_DATAFRAME, MLHD_PLUS_DATA_DIRECTORY
+from listenbrainz_spark.path import MLHD_PLUS_DATA_DIRECTORY
+from listenbrainz_spark.postgres.recording import get_recording_length_cache
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.utils import read_files_from_HDFS
 
@@ -81,12 +82,11 @@ def main(session, contribution, threshold, limit, skip):
             timestamping listens.
     """
     table = "mlhd_recording_similarity_listens"
-    metadata_table = "recording_length"
     skip_threshold = -skip
 
     run_query("SET spark.sql.shuffle.partitions = 2000").collect()
 
-    read_files_from_HDFS(RECORDING_LENGTH_DATAFRAME).createOrReplaceTempView(metadata_table)
+    metadata_table = get_recording_length_cache()
     mlhd_df = read_files_from_HDFS(MLHD_PLUS_DATA_DIRECTORY)
 
     first_batch = True
@@ -1,9 +1,9 @@
 from typing import Iterator, Dict
 
-from more_itertools import chunked
 from pyspark.sql import DataFrame
 from typing import Optional
 
+from listenbrainz_spark.results import iterate_chunks
 from listenbrainz_spark.stats.incremental.message_creator import MessageCreator
 
 ROWS_PER_MESSAGE = 10000
@@ -105,9 +105,7 @@ class PopularityMessageCreator(MessageCreator):
         return row
 
     def create_messages(self, results: DataFrame, only_inc: bool) -> Iterator[Dict]:
-        itr = results.toLocalIterator()
-        for chunk in chunked(itr, ROWS_PER_MESSAGE):
-            multiple_stats = [row.asDict(recursive=True) for row in chunk]
+        for multiple_stats in iterate_chunks(results, ROWS_PER_MESSAGE):
             yield {
                 "type": self.message_type,
                 "is_mlhd": self.is_mlhd,
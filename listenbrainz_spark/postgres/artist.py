@@ -1,18 +1,13 @@
-from typing import Optional
-
 import pycountry
-from pyspark import StorageLevel
-from pyspark.sql import DataFrame
 
 import listenbrainz_spark
 from listenbrainz_spark import config
+from listenbrainz_spark.dimensions import get_dimension_table, unpersist_dimension_table
 from listenbrainz_spark.path import ARTIST_COUNTRY_CODE_DATAFRAME
 from listenbrainz_spark.postgres.utils import load_from_db
 from listenbrainz_spark.stats import run_query
-from listenbrainz_spark.utils import read_files_from_HDFS
 
 _ARTIST_COUNTRY_CACHE = "artist_country_cache"
-_artist_country_df: Optional[DataFrame] = None
 
 
 def create_iso_country_codes_df():
@@ -76,18 +71,10 @@ def create_artist_country_cache():
 
 
 def get_artist_country_cache():
-    """ Read the ARTIST_COUNTRY_CACHE parquet files from HDFS and create a spark SQL view
-     if one already doesn't exist """
-    global _artist_country_df
-    if _artist_country_df is None:
-        _artist_country_df = read_files_from_HDFS(ARTIST_COUNTRY_CODE_DATAFRAME)
-        _artist_country_df.persist(StorageLevel.DISK_ONLY)
-        _artist_country_df.createOrReplaceTempView(_ARTIST_COUNTRY_CACHE)
-    return _ARTIST_COUNTRY_CACHE
+    """ Load the ARTIST_COUNTRY_CACHE parquet files from HDFS as a spark SQL view, or reuse the view if the cache
+     hasn't changed since it was loaded. See :mod:`listenbrainz_spark.dimensions`. """
+    return get_dimension_table(_ARTIST_COUNTRY_CACHE, ARTIST_COUNTRY_CODE_DATAFRAME)
 
 
 def unpersist_artist_country_cache():
-    global _artist_country_df
-    if _artist_country_df is not None:
-        _artist_country_df.unpersist()
-        _artist_country_df = None
+    unpersist_dimension_table(_ARTIST_COUNTRY_CACHE)
@@ -1,14 +1,9 @@
-from typing import Optional
-
-from pyspark import StorageLevel
-from pyspark.sql import DataFrame
-
+from listenbrainz_spark.dimensions import get_dimension_table, unpersist_dimension_table
 from listenbrainz_spark.path import RECORDING_LENGTH_DATAFRAME, RECORDING_ARTIST_DATAFRAME
 from listenbrainz_spark.postgres.utils import save_pg_table_to_hdfs
-from listenbrainz_spark.utils import read_files_from_HDFS
 
+_RECORDING_LENGTH_CACHE = "recording_length_cache"
 _RECORDING_ARTIST_CACHE = "recording_artist_cache"
-_recording_artist_df: Optional[DataFrame] = None
 
 
 def create_recording_length_cache():
@@ -21,6 +16,18 @@ def create_recording_length_cache():
 
     save_pg_table_to_hdfs(query, RECORDING_LENGTH_DATAFRAME)
 
+    unpersist_recording_length_cache()
+
+
+def get_recording_length_cache():
+    """ Load the RECORDING_LENGTH_CACHE parquet files from HDFS as a spark SQL view, or reuse the view if the cache
+     hasn't changed since it was loaded. See :mod:`listenbrainz_spark.dimensions`. """
+    return get_dimension_table(_RECORDING_LENGTH_CACHE, RECORDING_LENGTH_DATAFRAME)
+
+
+def unpersist_recording_length_cache():
+    unpersist_dimension_table(_RECORDING_LENGTH_CACHE)
+
 
 def create_recording_artist_cache():
     """ Import recording artists from postgres to HDFS for use in periodic jams calculation. """
@@ -49,18 +56,10 @@ def create_recording_artist_cache():
 
 
 def get_recording_artist_cache():
-    """ Read the RECORDING_ARTIST_CACHE parquet files from HDFS and create a spark SQL view
-     if one already doesn't exist """
-    global _recording_artist_df
-    if _recording_artist_df is None:
-        _recording_artist_df = read_files_from_HDFS(RECORDING_ARTIST_DATAFRAME)
-        _recording_artist_df.persist(StorageLevel.DISK_ONLY)
-        _recording_artist_df.createOrReplaceTempView(_RECORDING_ARTIST_CACHE)
-    return _RECORDING_ARTIST_CACHE
+    """ Load the RECORDING_ARTIST_CACHE parquet files from HDFS as a spark SQL view, or reuse the view if the cache
+     hasn't changed since it was loaded. See :mod:`listenbrainz_spark.dimensions`. """
+    return get_dimension_table(_RECORDING_ARTIST_CACHE, RECORDING_ARTIST_DATAFRAME)
 
 
 def unpersist_recording_artist_cache():
-    global _recording_artist_df
-    if _recording_artist_df is not None:
-        _recording_artist_df.unpersist()
-        _recording_artist_df = None
+    unpersist_dimension_table(_RECORDING_ARTIST_CACHE)
@@ -3,6 +3,7 @@ import listenbrainz_spark.recommendations.recording.create_dataframes
 import listenbrainz_spark.recommendations.recording.recommend
 import listenbrainz_spark.recommendations.recording.discovery
 import listenbrainz_spark.recommendations.recording.train_models
+import listenbrainz_spark.stats.batch
 import listenbrainz_spark.stats.sitewide.entity
 import listenbrainz_spark.stats.sitewide.listening_activity
 import listenbrainz_spark.stats.user.daily_activity
@@ -38,6 +39,7 @@ import listenbrainz_spark.listens.compact
 
 functions = {
     'echo.echo': listenbrainz_spark.echo.echo.handler,
+    'stats.all': listenbrainz_spark.stats.batch.get_all_stats,
     'stats.entity.listeners': listenbrainz_spark.stats.listener.entity.get_listener_stats,
     'stats.user.entity': listenbrainz_spark.stats.user.entity.get_entity_stats,
     'stats.user.listening_activity': listenbrainz_spark.stats.user.listening_activity.get_listening_activity,
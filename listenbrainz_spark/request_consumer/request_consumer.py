@@ -21,6 +21,7 @@ import socket
 import time
 import logging
 
+import orjson
 from kombu import Exchange, Queue, Message, Connection, Consumer
 from kombu.entity import PERSISTENT_DELIVERY_MODE
 from kombu.mixins import ConsumerProducerMixin
@@ -85,12 +86,15 @@ class RequestConsumer(ConsumerProducerMixin):
         avg_size_of_message = 0
         for message in messages:
             num_of_messages += 1
-            body = json.dumps(message)
+            # OPT_NON_STR_KEYS converts non string keys like json.dumps does
+            body = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
             avg_size_of_message += len(body)
             self.producer.publish(
                 exchange=self.spark_result_exchange,
                 routing_key='',
                 body=body,
+                content_type="application/json",
+                content_encoding="utf-8",
                 properties=PERSISTENT_DELIVERY_MODE,
             )
 
@@ -0,0 +1,51 @@
+""" Streaming of query results to the driver as Arrow record batches.
+
+``DataFrame.toLocalIterator()`` unpickles each row into a ``Row`` object which is then converted to a dict with
+``Row.asDict(recursive=True)`` by the message creators, all of it pure python work on the driver for every field of
+the results. Instead, the executors convert each partition to Arrow record batches with ``mapInArrow`` and send
+them serialized in the Arrow IPC format, one partition at a time like ``toLocalIterator()``. The driver only
+deserializes the batches and converts their columns to python objects with pyarrow.
+
+The rows are converted to the same dicts as ``Row.asDict(recursive=True)`` returns, except that timestamps are
+timezone aware and map columns are lists of (key, value) tuples. Neither appears in the messages sent to
+ListenBrainz.
+"""
+from typing import Iterator
+
+import pyarrow as pa
+from pyspark.sql import DataFrame
+
+
+def _serialize_batches(batches: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+    """ Serialize each record batch of a partition into a row with a single binary column, run on the executors. """
+    for batch in batches:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        yield pa.RecordBatch.from_pydict({"batch": [sink.getvalue().to_pybytes()]})
+
+
+def iterate_batches(df: DataFrame) -> Iterator[pa.RecordBatch]:
+    """ Stream the results of the dataframe to the driver as Arrow record batches, preserving the order of rows. """
+    serialized = df.mapInArrow(_serialize_batches, "batch binary")
+    for row in serialized.toLocalIterator():
+        with pa.ipc.open_stream(row.batch) as reader:
+            yield from reader
+
+
+def iterate_chunks(df: DataFrame, chunk_size: int) -> Iterator[list[dict]]:
+    """ Stream the results of the dataframe to the driver as lists of chunk_size rows (the last one may be shorter),
+     each row converted to a dict. Equivalent to ``chunked(df.toLocalIterator(), chunk_size)`` with each row
+     converted by ``Row.asDict(recursive=True)``. """
+    pending = []
+    for batch in iterate_batches(df):
+        offset = 0
+        while offset < batch.num_rows:
+            length = min(chunk_size - len(pending), batch.num_rows - offset)
+            pending.extend(batch.slice(offset, length).to_pylist())
+            offset += length
+            if len(pending) == chunk_size:
+                yield pending
+                pending = []
+    if pending:
+        yield pending
@@ -8,6 +8,10 @@ listens_metadata_schema = StructType([
     StructField('max_listened_at', TimestampType(), False),
     StructField('max_created', TimestampType(), False),
     StructField('updated_at', TimestampType(), False),
+    # null for listens written before the layout was recorded, which use the month layout
+    StructField('layout', StringType(), True),
+    # the deleted listens with id up to this one have been removed from the base listens at compaction
+    StructField('max_folded_deleted_listen_id', LongType(), True),
 ])
 
 # Keeping track of the from_date and the to_date used to create the partial aggressive from full dump listens.
@@ -1,8 +1,9 @@
 from datetime import datetime, date, time, timedelta
 
-from more_itertools import chunked
-
-from listenbrainz_spark.path import RECORDING_LENGTH_DATAFRAME, ARTIST_CREDIT_MBID_DATAFRAME
+from listenbrainz_spark import staging
+from listenbrainz_spark.path import ARTIST_CREDIT_MBID_DATAFRAME
+from listenbrainz_spark.postgres.recording import get_recording_length_cache
+from listenbrainz_spark.results import iterate_chunks
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.listens.data import get_listens_from_dump
 from listenbrainz_spark.utils import read_files_from_HDFS
@@ -122,20 +123,18 @@ def main(days, session, contribution, threshold, limit, skip, is_production_data
     from_date = to_date + timedelta(days=-days)
 
     table = "artist_similarity_listens"
-    metadata_table = "recording_length"
     artist_credit_table = "artist_credit"
 
     get_listens_from_dump(from_date, to_date).createOrReplaceTempView(table)
 
-    metadata_df = read_files_from_HDFS(RECORDING_LENGTH_DATAFRAME)
-    metadata_df.createOrReplaceTempView(metadata_table)
+    metadata_table = get_recording_length_cache()
 
     artist_credit_df = read_files_from_HDFS(ARTIST_CREDIT_MBID_DATAFRAME)
     artist_credit_df.createOrReplaceTempView(artist_credit_table)
 
     skip_threshold = -skip
     query = build_sessioned_index(table, metadata_table, artist_credit_table, session, contribution, threshold, limit, skip_threshold)
-    data = run_query(query).toLocalIterator()
+    results = run_query(query)
 
     algorithm = f"session_based_days_{days}_session_{session}_contribution_{contribution}_threshold_{threshold}_limit_{limit}_skip_{skip}"
 
@@ -145,14 +144,21 @@ def main(days, session, contribution, threshold, limit, skip, is_production_data
             "algorithm": algorithm
         }
 
-    for entries in chunked(data, RECORDINGS_PER_MESSAGE):
-        items = [row.asDict() for row in entries]
+    if staging.is_enabled():
         yield {
             "type": "similarity_artist",
             "algorithm": algorithm,
-            "data": items,
+            "staged_file": staging.stage_dataframe(results, "similarity_artist"),
             "is_production_dataset": is_production_dataset
         }
+    else:
+        for items in iterate_chunks(results, RECORDINGS_PER_MESSAGE):
+            yield {
+                "type": "similarity_artist",
+                "algorithm": algorithm,
+                "data": items,
+                "is_production_dataset": is_production_dataset
+            }
 
     if is_production_dataset:
         yield {
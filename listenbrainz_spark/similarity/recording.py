@@ -1,13 +1,11 @@
 from datetime import datetime, date, time, timedelta
 
-from more_itertools import chunked
-
 import listenbrainz_spark
-from listenbrainz_spark import config
-from listenbrainz_spark.path import RECORDING_LENGTH_DATAFRAME
+from listenbrainz_spark import config, staging
+from listenbrainz_spark.postgres.recording import get_recording_length_cache
+from listenbrainz_spark.results import iterate_chunks
 from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.listens.data import get_listens_from_dump
-from listenbrainz_spark.utils import read_files_from_HDFS
 
 RECORDINGS_PER_MESSAGE = 10000
 # the duration value in seconds to use for track whose duration data in not available in MB
@@ -112,16 +110,14 @@ def main(days, session, contribution, threshold, limit, skip, is_production_data
     from_date = to_date + timedelta(days=-days)
 
     table = "recording_similarity_listens"
-    metadata_table = "recording_length"
 
     get_listens_from_dump(from_date, to_date).createOrReplaceTempView(table)
 
-    metadata_df = read_files_from_HDFS(RECORDING_LENGTH_DATAFRAME)
-    metadata_df.createOrReplaceTempView(metadata_table)
+    metadata_table = get_recording_length_cache()
 
     skip_threshold = -skip
     query = build_sessioned_index(table, metadata_table, session, contribution, threshold, limit, skip_threshold)
-    data = run_query(query).toLocalIterator()
+    results = run_query(query)
 
     algorithm = f"session_based_days_{days}_session_{session}_contribution_{contribution}_threshold_{threshold}_limit_{limit}_skip_{skip}"
 
@@ -131,14 +127,21 @@ def main(days, session, contribution, threshold, limit, skip, is_production_data
             "algorithm": algorithm
         }
 
-    for entries in chunked(data, RECORDINGS_PER_MESSAGE):
-        items = [row.asDict() for row in entries]
+    if staging.is_enabled():
         yield {
             "type": "similarity_recording",
             "algorithm": algorithm,
-            "data": items,
+            "staged_file": staging.stage_dataframe(results, "similarity_recording"),
             "is_production_dataset": is_production_dataset
         }
+    else:
+        for items in iterate_chunks(results, RECORDINGS_PER_MESSAGE):
+            yield {
+                "type": "similarity_recording",
+                "algorithm": algorithm,
+                "data": items,
+                "is_production_dataset": is_production_dataset
+            }
 
     if is_production_dataset:
         yield {
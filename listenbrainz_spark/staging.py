@@ -0,0 +1,78 @@
+""" Hand-off of large datasets to ListenBrainz through files in a staging directory shared with the spark reader,
+instead of sending all the rows in json RabbitMQ messages.
+
+The rows of the dataframe are streamed to the driver as Arrow record batches and written to an Arrow IPC file in the
+SPARK_RESULT_STAGING_DIR directory, and a single small message with the name of the file (relative to the staging
+directory, which can be mounted at another path on the ListenBrainz side) is sent in place of the data messages.
+The spark reader bulk loads the file and removes it, see :mod:`listenbrainz.spark.staging`. Staging is disabled if
+SPARK_RESULT_STAGING_DIR is not set.
+"""
+import os
+import uuid
+
+import pyarrow as pa
+from pyspark.sql import DataFrame
+from pyspark.sql.types import (
+    ArrayType, BooleanType, DataType, DoubleType, FloatType, IntegerType, LongType, ShortType, StringType, StructType
+)
+
+from listenbrainz_spark import config
+from listenbrainz_spark.results import iterate_batches
+
+_ARROW_TYPES = {
+    StringType: pa.string(),
+    BooleanType: pa.bool_(),
+    ShortType: pa.int16(),
+    IntegerType: pa.int32(),
+    LongType: pa.int64(),
+    FloatType: pa.float32(),
+    DoubleType: pa.float64(),
+}
+
+
+def is_enabled() -> bool:
+    """ Whether large datasets are handed off through the staging directory. """
+    return bool(getattr(config, "SPARK_RESULT_STAGING_DIR", None))
+
+
+def to_arrow_type(spark_type: DataType) -> pa.DataType:
+    """ Convert a spark sql type to the equivalent arrow type, including arrays and (nested) structs. """
+    if isinstance(spark_type, StructType):
+        return pa.struct([pa.field(field.name, to_arrow_type(field.dataType), field.nullable) for field in spark_type])
+    if isinstance(spark_type, ArrayType):
+        return pa.list_(to_arrow_type(spark_type.elementType))
+    try:
+        return _ARROW_TYPES[type(spark_type)]
+    except KeyError:
+        raise TypeError(f"Unsupported type for staging: {spark_type}")
+
+
+def stage_dataframe(df: DataFrame, name: str) -> str:
+    """ Write the rows of the dataframe to an Arrow IPC file in the staging directory. The record batches streamed
+    from the executors are written as is, see :func:`listenbrainz_spark.results.iterate_batches`.
+
+        Args:
+            df: the dataframe to stage
+            name: prefix of the name of the file, usually the type of the dataset's messages
+
+        Returns:
+            the name of the file relative to the staging directory
+    """
+    file_name = f"{name}-{uuid.uuid4()}.arrow"
+    path = os.path.join(config.SPARK_RESULT_STAGING_DIR, file_name)
+    # write to a temporary file and rename it once complete so that a partial file is never loaded
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        writer = None
+        try:
+            for batch in iterate_batches(df):
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, batch.schema)
+                writer.write_batch(batch)
+            if writer is None:
+                writer = pa.ipc.new_file(sink, pa.schema(list(to_arrow_type(df.schema))))
+        finally:
+            if writer is not None:
+                writer.close()
+    os.rename(tmp_path, path)
+    return file_name
@@ -0,0 +1,40 @@
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from listenbrainz_spark.stats.incremental.batch_stats_engine import BatchIncrementalStatsEngine
+from listenbrainz_spark.stats.incremental.incremental_stats_engine import IncrementalStatsEngine
+from listenbrainz_spark.stats.listener.entity import create_listener_stats_engine, incremental_entity_obj_map
+from listenbrainz_spark.stats.sitewide.entity import incremental_sitewide_map, \
+    create_entity_stats_engine as create_sitewide_entity_stats_engine
+from listenbrainz_spark.stats.sitewide.listening_activity import \
+    create_listening_activity_engine as create_sitewide_listening_activity_engine
+from listenbrainz_spark.stats.user.daily_activity import create_daily_activity_engine
+from listenbrainz_spark.stats.user.entity import incremental_entity_map, \
+    create_entity_stats_engine as create_user_entity_stats_engine
+from listenbrainz_spark.stats.user.listening_activity import \
+    create_listening_activity_engine as create_user_listening_activity_engine
+
+logger = logging.getLogger(__name__)
+
+
+def create_all_stats_engines(stats_range: str) -> List[IncrementalStatsEngine]:
+    """ Create the engines of all the user, sitewide and entity listener stats for the specified stats_range, in the
+    order the individual stats are requested daily. """
+    engines = []
+    for entity in incremental_entity_map:
+        engines.append(create_user_entity_stats_engine(entity, stats_range))
+    engines.append(create_user_listening_activity_engine(stats_range))
+    engines.append(create_daily_activity_engine(stats_range))
+    for entity in incremental_sitewide_map:
+        engines.append(create_sitewide_entity_stats_engine(entity, stats_range))
+    engines.append(create_sitewide_listening_activity_engine(stats_range))
+    for entity in incremental_entity_obj_map:
+        engines.append(create_listener_stats_engine(entity, stats_range))
+    return engines
+
+
+def get_all_stats(stats_range: str) -> Iterator[Optional[Dict]]:
+    """ Generate all the user, sitewide and entity listener stats for the specified stats_range, the same messages
+    as the individual stats queries, scanning the listens once for all the stats sharing a date range. """
+    logger.debug(f"Calculating all stats for {stats_range}...")
+    return BatchIncrementalStatsEngine(create_all_stats_engines(stats_range)).run()
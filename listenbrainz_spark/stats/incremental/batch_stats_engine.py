@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
+
+from listenbrainz_spark.listens.cache import get_incremental_listens_df
+from listenbrainz_spark.listens.data import get_listens_from_dump, filter_listens_by_range, filter_deleted_listens
+from listenbrainz_spark.listens.metadata import get_listens_metadata
+from listenbrainz_spark.stats.incremental.incremental_stats_engine import IncrementalStatsEngine
+
+logger = logging.getLogger(__name__)
+
+
+class SharedListens:
+    """ The full dump listens and the incremental listens of a date range, each loaded and filtered at most once
+    and persisted for all the stats of a batch. """
+
+    def __init__(self, from_date: datetime, to_date: datetime):
+        self.from_date = from_date
+        self.to_date = to_date
+        self._full_dump_listens_df: Optional[DataFrame] = None
+        self._incremental_listens_df: Optional[DataFrame] = None
+
+    def get_full_dump_listens(self) -> DataFrame:
+        """ Returns the full dump listens of the date range, without the deleted listens. """
+        if self._full_dump_listens_df is None:
+            logger.info("Loading full dump listens from %s to %s for the batch", self.from_date, self.to_date)
+            self._full_dump_listens_df = get_listens_from_dump(
+                self.from_date,
+                self.to_date,
+                include_incremental=False,
+                remove_deleted=True
+            ).persist(StorageLevel.MEMORY_AND_DISK)
+        return self._full_dump_listens_df
+
+    def get_incremental_listens(self) -> DataFrame:
+        """ Returns the incremental listens of the date range, without the deleted listens. """
+        if self._incremental_listens_df is None:
+            inc_listens_df = get_incremental_listens_df()
+            inc_listens_df = filter_listens_by_range(inc_listens_df, self.from_date, self.to_date)
+            inc_listens_df = filter_deleted_listens(
+                inc_listens_df, get_listens_metadata().location, self.from_date, self.to_date
+            )
+            self._incremental_listens_df = inc_listens_df.persist(StorageLevel.MEMORY_AND_DISK)
+        return self._incremental_listens_df
+
+    def unpersist(self):
+        if self._full_dump_listens_df is not None:
+            self._full_dump_listens_df.unpersist()
+            self._full_dump_listens_df = None
+        if self._incremental_listens_df is not None:
+            self._incremental_listens_df.unpersist()
+            self._incremental_listens_df = None
+
+
+class BatchIncrementalStatsEngine:
+    """
+    Runs several IncrementalStatsEngine one after the other, scanning the listens once for all the stats that share
+    a date range instead of once per stat.
+
+    The engines are grouped by the date range of their query provider, keeping the order in which they were given.
+    For each group, the listens are loaded and filtered once and persisted (see SharedListens), all the aggregate
+    queries of the group are run against them and they are released before moving to the next group.
+
+    An error while generating a stat is logged and the remaining stats of the batch are still generated, like they
+    would be if each stat was requested separately.
+    """
+
+    def __init__(self, engines: List[IncrementalStatsEngine]):
+        self.engines = engines
+
+    def get_groups(self) -> List[List[IncrementalStatsEngine]]:
+        """ Group the engines by the date range of their query provider. """
+        groups: Dict[tuple, List[IncrementalStatsEngine]] = {}
+        for engine in self.engines:
+            key = (engine.provider.from_date, engine.provider.to_date)
+            groups.setdefault(key, []).append(engine)
+        return list(groups.values())
+
+    def run(self) -> Iterator[Dict]:
+        for group in self.get_groups():
+            provider = group[0].provider
+            shared_listens = SharedListens(provider.from_date, provider.to_date)
+            logger.info("Generating %d stats from listens from %s to %s", len(group),
+                        provider.from_date, provider.to_date)
+            try:
+                for engine in group:
+                    engine.shared_listens = shared_listens
+                    try:
+                        yield from engine.run()
+                    except Exception:
+                        logger.error("Error while generating stat %s from listens from %s to %s",
+                                     engine.provider.get_table_prefix(), provider.from_date, provider.to_date,
+                                     exc_info=True)
+            finally:
+                shared_listens.unpersist()
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Dict
+from typing import Iterator, Dict, List, Tuple
 
 from pyspark.sql import DataFrame
 from pyspark.errors import AnalysisException
@@ -9,6 +9,7 @@ from pyspark.errors import AnalysisException
 import listenbrainz_spark
 from listenbrainz_spark import hdfs_connection
 from listenbrainz_spark.config import HDFS_CLUSTER_URI
+from listenbrainz_spark.dimensions import log_join_strategies
 from listenbrainz_spark.listens.cache import get_incremental_listens_df
 from listenbrainz_spark.listens.metadata import get_listens_metadata
 from listenbrainz_spark.schema import BOOKKEEPING_SCHEMA, INCREMENTAL_BOOKKEEPING_SCHEMA
@@ -48,9 +49,20 @@ class IncrementalStatsEngine:
         is absent in incremental listens.
     """
 
-    def __init__(self, provider: QueryProvider, message_creator: MessageCreator):
+    def __init__(self, provider: QueryProvider, message_creator: MessageCreator,
+                 derived_stats: List[Tuple[QueryProvider, MessageCreator]] = None):
+        """
+        Args:
+            provider: the query provider of the stat
+            message_creator: the message creator for the results of the stat
+            derived_stats: query providers and message creators of additional stats generated from the same final
+                aggregate, for instance the artist map from the artists aggregate
+        """
         self.provider = provider
         self.message_creator = message_creator
+        self.derived_stats = derived_stats or []
+        # set by BatchIncrementalStatsEngine to reuse listens loaded once for several stats
+        self.shared_listens = None
         self._only_inc = None
         self._final_table = None
         self.incremental_table = None
@@ -94,17 +106,22 @@ class IncrementalStatsEngine:
         existing_aggregate_path = self.provider.get_existing_aggregate_path()
 
         table = f"{self.provider.get_table_prefix()}_full_listens"
-        get_listens_from_dump(
-            self.provider.from_date,
-            self.provider.to_date,
-            include_incremental=False,
-            remove_deleted=True
-        ).createOrReplaceTempView(table)
+        if self.shared_listens is not None:
+            full_listens_df = self.shared_listens.get_full_dump_listens()
+        else:
+            full_listens_df = get_listens_from_dump(
+                self.provider.from_date,
+                self.provider.to_date,
+                include_incremental=False,
+                remove_deleted=True
+            )
+        full_listens_df.createOrReplaceTempView(table)
 
         logger.info("Creating partial aggregate from full dump listens")
         hdfs_connection.client.makedirs(Path(existing_aggregate_path).parent)
         full_query = self.provider.get_aggregate_query(table)
         full_df = run_query(full_query)
+        log_join_strategies(f"{self.provider.get_table_prefix()} full aggregate", full_df)
         full_df.write.mode("overwrite").parquet(existing_aggregate_path)
 
         hdfs_connection.client.makedirs(Path(metadata_path).parent)
@@ -126,13 +143,23 @@ class IncrementalStatsEngine:
         """
         self.incremental_table = f"{self.provider.get_table_prefix()}_incremental_listens"
 
-        inc_listens_df = get_incremental_listens_df()
-        inc_listens_df = filter_listens_by_range(inc_listens_df, self.provider.from_date, self.provider.to_date)
-        inc_listens_df = filter_deleted_listens(inc_listens_df, get_listens_metadata().location)
+        if self.shared_listens is not None:
+            inc_listens_df = self.shared_listens.get_incremental_listens()
+        else:
+            inc_listens_df = get_incremental_listens_df()
+            inc_listens_df = filter_listens_by_range(inc_listens_df, self.provider.from_date, self.provider.to_date)
+            inc_listens_df = filter_deleted_listens(
+                inc_listens_df,
+                get_listens_metadata().location,
+                self.provider.from_date,
+                self.provider.to_date
+            )
         inc_listens_df.createOrReplaceTempView(self.incremental_table)
 
         inc_query = self.provider.get_aggregate_query(self.incremental_table)
-        return run_query(inc_query)
+        inc_df = run_query(inc_query)
+        log_join_strategies(f"{self.provider.get_table_prefix()} incremental aggregate", inc_df)
+        return inc_df
 
     def bookkeep_incremental_aggregate(self):
         metadata_path = f"{self.provider.get_bookkeeping_path()}/incremental"
@@ -210,6 +237,7 @@ class IncrementalStatsEngine:
     def generate_stats(self) -> DataFrame:
         results_query = self.provider.get_stats_query(self._final_table)
         results_df = run_query(results_query)
+        log_join_strategies(f"{self.provider.get_table_prefix()} stats", results_df)
         return results_df
 
     @staticmethod
@@ -229,5 +257,8 @@ class IncrementalStatsEngine:
         self.prepare_final_aggregate()
         results = self.generate_stats()
         yield from self.create_messages(results, self.only_inc, self.message_creator)
+        for provider, message_creator in self.derived_stats:
+            derived_results = run_query(provider.get_stats_query(self._final_table))
+            yield from self.create_messages(derived_results, self.only_inc, message_creator)
         if incremental_listens_exist():
             self.bookkeep_incremental_aggregate()
@@ -2,7 +2,6 @@ import abc
 import logging
 from typing import Iterator, Dict
 
-from more_itertools import chunked
 from pydantic import ValidationError
 from pyspark.sql import DataFrame
 
@@ -11,6 +10,7 @@ from data.model.user_recording_stat import RecordingRecord
 from data.model.user_release_group_stat import ReleaseGroupRecord
 from data.model.user_release_stat import ReleaseRecord
 from listenbrainz_spark.path import LISTENBRAINZ_USER_STATS_DIRECTORY
+from listenbrainz_spark.results import iterate_chunks
 from listenbrainz_spark.listens.cache import get_incremental_users_df
 from listenbrainz_spark.stats.incremental.message_creator import StatsMessageCreator
 from listenbrainz_spark.stats.incremental.query_provider import QueryProvider
@@ -71,12 +71,10 @@ class UserStatsMessageCreator(StatsMessageCreator, abc.ABC):
         from_ts = int(self.from_date.timestamp())
         to_ts = int(self.to_date.timestamp())
 
-        data = results.toLocalIterator()
-        for entries in chunked(data, self.items_per_message()):
+        for entries in iterate_chunks(results, self.items_per_message()):
             multiple_rows = []
             for entry in entries:
-                processed_row = entry.asDict(recursive=True)
-                processed_stat = self.parse_row(processed_row)
+                processed_stat = self.parse_row(entry)
                 if processed_stat is not None:
                     multiple_rows.append(processed_stat)
 
@@ -17,12 +17,17 @@ incremental_entity_obj_map: Dict[str, Type[EntityListenerStatsQueryProvider]] =
 NUMBER_OF_TOP_LISTENERS = 10  # number of top listeners to retain for user stats
 
 
-def get_listener_stats(entity: str, stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
-    """ Get the top listeners for all entity for specified stats_range """
-    logger.debug(f"Calculating {entity}_listeners_{stats_range}...")
+def create_listener_stats_engine(entity: str, stats_range: str, database: str = None) -> IncrementalStatsEngine:
+    """ Create the engine for the top listeners of all entities for specified stats_range """
     selector = StatsRangeListenRangeSelector(stats_range)
     entity_cls = incremental_entity_obj_map[entity]
     entity_obj = entity_cls(selector, NUMBER_OF_TOP_LISTENERS)
     message_creator = EntityListenerStatsMessageCreator(entity, "entity_listener", selector, database)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
+    return IncrementalStatsEngine(entity_obj, message_creator)
+
+
+def get_listener_stats(entity: str, stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
+    """ Get the top listeners for all entity for specified stats_range """
+    logger.debug(f"Calculating {entity}_listeners_{stats_range}...")
+    engine = create_listener_stats_engine(entity, stats_range, database)
     return engine.run()
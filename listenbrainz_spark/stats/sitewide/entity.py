@@ -1,7 +1,7 @@
 import logging
 from typing import Dict, Iterator, Type
 
-from listenbrainz_spark.stats import SITEWIDE_STATS_ENTITY_LIMIT, run_query
+from listenbrainz_spark.stats import SITEWIDE_STATS_ENTITY_LIMIT
 from listenbrainz_spark.stats.incremental.incremental_stats_engine import IncrementalStatsEngine
 from listenbrainz_spark.stats.incremental.range_selector import StatsRangeListenRangeSelector
 from listenbrainz_spark.stats.incremental.sitewide.artist import AritstSitewideEntity
@@ -23,22 +23,23 @@ incremental_sitewide_map: Dict[str, Type[SitewideEntityStatsQueryProvider]] = {
 }
 
 
-def get_entity_stats(entity: str, stats_range: str) -> Iterator[Dict]:
-    """ Returns top entity stats for given time period """
-    logger.debug(f"Calculating sitewide_{entity}_{stats_range}...")
+def create_entity_stats_engine(entity: str, stats_range: str) -> IncrementalStatsEngine:
+    """ Create the engine for the top entity stats for given time period, the artist map stats are generated along
+    with the top artists. """
     selector = StatsRangeListenRangeSelector(stats_range)
     entity_cls = incremental_sitewide_map[entity]
     entity_obj: SitewideEntityStatsQueryProvider = entity_cls(selector, SITEWIDE_STATS_ENTITY_LIMIT)
     message_creator = SitewideEntityStatsMessageCreator(entity, selector)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
-
+    derived_stats = []
     if entity == "artists":
-        yield from engine.run()
-
         artist_map_entity = ArtistMapSitewideEntity(selector, SITEWIDE_STATS_ENTITY_LIMIT)
         artist_map_message_creator = ArtistMapSitewideStatsMessageCreator(selector)
-        artist_map_query = artist_map_entity.get_stats_query(engine._final_table)
-        artist_map_results = run_query(artist_map_query)
-        yield from engine.create_messages(artist_map_results, engine._only_inc, artist_map_message_creator)
-    else:
-        yield from engine.run()
+        derived_stats.append((artist_map_entity, artist_map_message_creator))
+    return IncrementalStatsEngine(entity_obj, message_creator, derived_stats)
+
+
+def get_entity_stats(entity: str, stats_range: str) -> Iterator[Dict]:
+    """ Returns top entity stats for given time period """
+    logger.debug(f"Calculating sitewide_{entity}_{stats_range}...")
+    engine = create_entity_stats_engine(entity, stats_range)
+    return engine.run()
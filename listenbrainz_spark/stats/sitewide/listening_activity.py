@@ -9,6 +9,14 @@ from listenbrainz_spark.stats.incremental.sitewide.listening_activity import Lis
 logger = logging.getLogger(__name__)
 
 
+def create_listening_activity_engine(stats_range: str) -> IncrementalStatsEngine:
+    """ Create the engine for the sitewide listening activity stats for the specified time range """
+    selector = ListeningActivityListenRangeSelector(stats_range)
+    entity_obj = ListeningActivitySitewideStatsQuery(selector)
+    message_creator = ListeningActivitySitewideMessageCreator(selector)
+    return IncrementalStatsEngine(entity_obj, message_creator)
+
+
 def get_listening_activity(stats_range: str) -> Iterator[Optional[Dict]]:
     """ Compute the number of listens for a time range compared to the previous range
 
@@ -19,8 +27,5 @@ def get_listening_activity(stats_range: str) -> Iterator[Optional[Dict]]:
     details). These values are used on the listening activity reports.
     """
     logger.debug(f"Calculating listening_activity_{stats_range}")
-    selector = ListeningActivityListenRangeSelector(stats_range)
-    entity_obj = ListeningActivitySitewideStatsQuery(selector)
-    message_creator = ListeningActivitySitewideMessageCreator(selector)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
+    engine = create_listening_activity_engine(stats_range)
     return engine.run()
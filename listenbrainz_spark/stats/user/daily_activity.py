@@ -9,11 +9,16 @@ from listenbrainz_spark.stats.incremental.user.daily_activity import DailyActivi
 logger = logging.getLogger(__name__)
 
 
-def get_daily_activity(stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
-    """ Calculate number of listens for an user for the specified time range """
-    logger.debug(f"Calculating daily_activity_{stats_range}")
+def create_daily_activity_engine(stats_range: str, database: str = None) -> IncrementalStatsEngine:
+    """ Create the engine for the daily activity stats of all users for the specified time range """
     selector = StatsRangeListenRangeSelector(stats_range)
     entity_obj = DailyActivityUserStatsQueryEntity(selector)
     message_creator = DailyActivityUserMessageCreator("user_daily_activity", selector, database)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
+    return IncrementalStatsEngine(entity_obj, message_creator)
+
+
+def get_daily_activity(stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
+    """ Calculate number of listens for an user for the specified time range """
+    logger.debug(f"Calculating daily_activity_{stats_range}")
+    engine = create_daily_activity_engine(stats_range, database)
     return engine.run()
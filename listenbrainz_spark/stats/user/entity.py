@@ -1,7 +1,6 @@
 import logging
 from typing import Iterator, Optional, Dict, Type
 
-from listenbrainz_spark.stats import run_query
 from listenbrainz_spark.stats.incremental.incremental_stats_engine import IncrementalStatsEngine
 from listenbrainz_spark.stats.incremental.range_selector import StatsRangeListenRangeSelector
 from listenbrainz_spark.stats.incremental.user.artist import ArtistUserEntity
@@ -24,21 +23,23 @@ incremental_entity_map: Dict[str, Type[UserEntityStatsQueryProvider]] = {
 NUMBER_OF_TOP_ENTITIES = 1000  # number of top entities to retain for user stats
 
 
-def get_entity_stats(entity: str, stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
-    """ Get the top entity for all users for specified stats_range """
-    logger.debug(f"Calculating user_{entity}_{stats_range}...")
+def create_entity_stats_engine(entity: str, stats_range: str, database: str = None) -> IncrementalStatsEngine:
+    """ Create the engine for the top entity stats of all users for specified stats_range, the artist map stats are
+    generated along with the top artists. """
     selector = StatsRangeListenRangeSelector(stats_range)
     entity_obj = incremental_entity_map[entity](selector, NUMBER_OF_TOP_ENTITIES)
     message_creator = UserEntityStatsMessageCreator(entity, "user_entity", selector, database)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
+    derived_stats = []
     if entity == "artists":
-        yield from engine.run()
-
         artist_map_database = database.replace("artists", "artist_map") if database else None
         artist_map_entity = ArtistMapUserEntity(selector, NUMBER_OF_TOP_ENTITIES)
         artist_map_message_creator = ArtistMapStatsMessageCreator("artist_map", "user_entity", selector, artist_map_database)
-        artist_map_query = artist_map_entity.get_stats_query(engine._final_table)
-        artist_map_results = run_query(artist_map_query)
-        yield from engine.create_messages(artist_map_results, engine._only_inc, artist_map_message_creator)
-    else:
-        yield from engine.run()
+        derived_stats.append((artist_map_entity, artist_map_message_creator))
+    return IncrementalStatsEngine(entity_obj, message_creator, derived_stats)
+
+
+def get_entity_stats(entity: str, stats_range: str, database: str = None) -> Iterator[Optional[Dict]]:
+    """ Get the top entity for all users for specified stats_range """
+    logger.debug(f"Calculating user_{entity}_{stats_range}...")
+    engine = create_entity_stats_engine(entity, stats_range, database)
+    return engine.run()
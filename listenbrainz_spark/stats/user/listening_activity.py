@@ -9,6 +9,14 @@ from listenbrainz_spark.stats.incremental.user.listening_activity import Listeni
 logger = logging.getLogger(__name__)
 
 
+def create_listening_activity_engine(stats_range: str, database: str = None) -> IncrementalStatsEngine:
+    """ Create the engine for the listening activity stats of all users for the specified time range """
+    selector = ListeningActivityListenRangeSelector(stats_range)
+    entity_obj = ListeningActivityUserStatsQueryEntity(selector)
+    message_creator = ListeningActivityUserMessageCreator("user_listening_activity", selector, database)
+    return IncrementalStatsEngine(entity_obj, message_creator)
+
+
 def get_listening_activity(stats_range: str, database: str = None)\
         -> Iterator[Optional[Dict]]:
     """ Compute the number of listens for a time range compared to the previous range
@@ -20,8 +28,5 @@ def get_listening_activity(stats_range: str, database: str = None)\
     details). These values are used on the listening activity reports.
     """
     logger.debug(f"Calculating listening_activity_{stats_range}")
-    selector = ListeningActivityListenRangeSelector(stats_range)
-    entity_obj = ListeningActivityUserStatsQueryEntity(selector)
-    message_creator = ListeningActivityUserMessageCreator("user_listening_activity", selector, database)
-    engine = IncrementalStatsEngine(entity_obj, message_creator)
+    engine = create_listening_activity_engine(stats_range, database)
     return engine.run()
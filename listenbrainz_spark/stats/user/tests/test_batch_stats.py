@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from listenbrainz_spark.stats.incremental.batch_stats_engine import BatchIncrementalStatsEngine
+from listenbrainz_spark.stats.user.daily_activity import create_daily_activity_engine
+from listenbrainz_spark.stats.user.entity import create_entity_stats_engine
+from listenbrainz_spark.stats.user.listening_activity import create_listening_activity_engine
+from listenbrainz_spark.stats.user.tests import StatsTestCase
+
+
+class BatchStatsTestCase(StatsTestCase):
+
+    def test_batch_stats(self):
+        engines = [
+            create_entity_stats_engine("recordings", "all_time"),
+            create_listening_activity_engine("all_time"),
+            create_entity_stats_engine("releases", "all_time"),
+            create_daily_activity_engine("all_time"),
+        ]
+        batch = BatchIncrementalStatsEngine(engines)
+
+        groups = batch.get_groups()
+        self.assertEqual(groups, [[engines[0], engines[2], engines[3]], [engines[1]]])
+
+        messages = list(batch.run())
+        for engine in engines:
+            self.assertIsNotNone(engine.shared_listens)
+            # the listens shared by the group are released once its stats are generated
+            self.assertIsNone(engine.shared_listens._full_dump_listens_df)
+            self.assertIsNone(engine.shared_listens._incremental_listens_df)
+
+        # each stat is a start message, a data message and an end message, in the order of the groups
+        self.assertEqual(len(messages), 12)
+        self.assert_user_stats_equal("user_top_recordings_output.json", messages[0:3], "recordings_all_time")
+        self.assert_user_stats_equal("user_top_releases_output.json", messages[3:6], "releases_all_time")
+        self.assertEqual(messages[7]["type"], "user_daily_activity")
+        self.assert_user_stats_equal(
+            "user_listening_activity_all_time.json",
+            messages[9:12],
+            "listening_activity_all_time"
+        )
+
+    def test_batch_stats_engine_error(self):
+        engines = [
+            create_entity_stats_engine("recordings", "all_time"),
+            create_entity_stats_engine("artists", "all_time"),
+            create_entity_stats_engine("releases", "all_time"),
+        ]
+        batch = BatchIncrementalStatsEngine(engines)
+
+        # an error in one stat doesn't stop the stats after it
+        with patch.object(engines[1], "run", side_effect=Exception("failed")):
+            messages = list(batch.run())
+
+        self.assertEqual(len(messages), 6)
+        self.assert_user_stats_equal("user_top_recordings_output.json", messages[0:3], "recordings_all_time")
+        self.assert_user_stats_equal("user_top_releases_output.json", messages[3:6], "releases_all_time")
+        self.assertIsNone(engines[0].shared_listens._full_dump_listens_df)
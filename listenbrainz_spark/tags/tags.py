@@ -1,7 +1,7 @@
-from more_itertools import chunked
-
+from listenbrainz_spark import staging
 from listenbrainz_spark.path import RECORDING_RECORDING_TAG_DATAFRAME, MLHD_RECORDING_POPULARITY_DATAFRAME, \
     RECORDING_ARTIST_TAG_DATAFRAME, RECORDING_RELEASE_GROUP_TAG_DATAFRAME
+from listenbrainz_spark.results import iterate_chunks
 from listenbrainz_spark.stats import run_query
 
 RECORDINGS_PER_MESSAGE = 10000
@@ -31,9 +31,16 @@ def create_messages(recordings_table, popularity_table, source):
               FROM percent_ranking
           GROUP BY recording_mbid
     """
-    results = run_query(query).toLocalIterator()
-    for result in chunked(results, RECORDINGS_PER_MESSAGE):
-        data = [tag.asDict(recursive=True) for tag in result]
+    results = run_query(query)
+    if staging.is_enabled():
+        yield {
+            "type": "tags_dataset",
+            "staged_file": staging.stage_dataframe(results, f"tags_dataset_{source}"),
+            "source": source
+        }
+        return
+
+    for data in iterate_chunks(results, RECORDINGS_PER_MESSAGE):
         yield {
             "type": "tags_dataset",
             "data": data,
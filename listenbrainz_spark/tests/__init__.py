@@ -7,6 +7,7 @@ from tempfile import NamedTemporaryFile
 
 import listenbrainz_spark
 from listenbrainz_spark import hdfs_connection, config
+from listenbrainz_spark.dimensions import unpersist_dimension_tables
 from listenbrainz_spark.dump import ListenbrainzDumpLoader, DumpType
 from listenbrainz_spark.listens.cache import unpersist_incremental_df, unpersist_deleted_df
 from listenbrainz_spark.listens.dump import import_full_dump_to_hdfs, import_incremental_dump_to_hdfs
@@ -51,6 +52,7 @@ class SparkNewTestCase(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         unpersist_listens_metadata()
+        unpersist_dimension_tables()
         cls.delete_dir()
         listenbrainz_spark.context.stop()
 
@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import listenbrainz_spark
+from listenbrainz_spark import config, dimensions
+from listenbrainz_spark.hdfs.utils import delete_dir
+from listenbrainz_spark.stats import run_query
+from listenbrainz_spark.tests import SparkNewTestCase
+from listenbrainz_spark.utils import save_parquet
+
+TEST_DIMENSION_PATH = "/tests/dimension"
+
+
+class DimensionsTestCase(SparkNewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # disable automatic broadcast joins so that only the hints of the dimension tables cause broadcasts
+        run_query("SET spark.sql.autoBroadcastJoinThreshold = -1").collect()
+        listenbrainz_spark.session.range(0, 100).createOrReplaceTempView("dimension_test_facts")
+
+    def tearDown(self):
+        dimensions.unpersist_dimension_tables()
+        delete_dir(TEST_DIMENSION_PATH, recursive=True)
+        run_query("RESET spark.sql.autoBroadcastJoinThreshold").collect()
+        super().tearDown()
+
+    def save_dimension(self, count):
+        df = run_query(f"SELECT id, CONCAT('name ', id) AS name FROM range(0, {count})")
+        save_parquet(df, TEST_DIMENSION_PATH)
+
+    def join(self, name):
+        return run_query(f"""
+            SELECT f.id, d.name
+              FROM dimension_test_facts f
+         LEFT JOIN {name} d
+                ON f.id = d.id
+        """)
+
+    def test_get_dimension_table(self):
+        self.save_dimension(10)
+        name = dimensions.get_dimension_table("dimension_test", TEST_DIMENSION_PATH)
+        self.assertEqual(name, "dimension_test")
+        self.assertEqual(run_query(f"SELECT count(*) AS count FROM {name}").collect()[0]["count"], 10)
+        table = dimensions._tables[name]
+        self.assertTrue(table.broadcast)
+        self.assertTrue(table.df.is_cached)
+        self.assertEqual(dimensions.get_join_strategies(self.join(name)), {"BroadcastHashJoin": 1})
+
+        # unchanged in HDFS, the cached dataframe is reused
+        dimensions.get_dimension_table("dimension_test", TEST_DIMENSION_PATH)
+        self.assertIs(dimensions._tables[name], table)
+
+        # the cache was imported again, the table is reloaded
+        self.save_dimension(20)
+        dimensions.get_dimension_table("dimension_test", TEST_DIMENSION_PATH)
+        self.assertIsNot(dimensions._tables[name], table)
+        self.assertFalse(table.df.is_cached)
+        self.assertEqual(run_query(f"SELECT count(*) AS count FROM {name}").collect()[0]["count"], 20)
+
+    def test_get_dimension_table_above_threshold(self):
+        self.save_dimension(10)
+        with patch.object(config, "SPARK_DIMENSION_BROADCAST_THRESHOLD", 0, create=True):
+            name = dimensions.get_dimension_table("dimension_test", TEST_DIMENSION_PATH)
+        self.assertFalse(dimensions._tables[name].broadcast)
+        self.assertEqual(dimensions.get_join_strategies(self.join(name)), {"SortMergeJoin": 1})
+
+    def test_get_dimension_table_expanded_size_above_threshold(self):
+        self.save_dimension(10)
+        size = listenbrainz_spark.hdfs_connection.client.content(TEST_DIMENSION_PATH)["length"]
+        # the parquet files are under the threshold but not their estimated size in memory
+        with patch.object(config, "SPARK_DIMENSION_BROADCAST_THRESHOLD", size, create=True), \
+                patch.object(config, "SPARK_DIMENSION_SIZE_EXPANSION_FACTOR", 2, create=True):
+            name = dimensions.get_dimension_table("dimension_test", TEST_DIMENSION_PATH)
+        self.assertFalse(dimensions._tables[name].broadcast)
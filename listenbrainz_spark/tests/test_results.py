@@ -0,0 +1,25 @@
+from more_itertools import chunked
+
+import listenbrainz_spark
+from listenbrainz_spark.results import iterate_chunks
+from listenbrainz_spark.stats import run_query
+from listenbrainz_spark.tests import SparkNewTestCase
+
+
+class ResultsTestCase(SparkNewTestCase):
+
+    def test_iterate_chunks(self):
+        listenbrainz_spark.session.range(0, 105, numPartitions=4).createOrReplaceTempView("results_test")
+        df = run_query("""
+            SELECT id AS user_id
+                 , CAST(id AS STRING) AS user_name
+                 , id / 2 AS score
+                 , array(named_struct('artist_name', CONCAT('artist ', id), 'listen_count', id)) AS artists
+              FROM results_test
+          ORDER BY id DESC
+        """)
+
+        expected = [[row.asDict(recursive=True) for row in rows] for rows in chunked(df.toLocalIterator(), 25)]
+        received = list(iterate_chunks(df, 25))
+        self.assertEqual(received, expected)
+        self.assertEqual([len(chunk) for chunk in received], [25, 25, 25, 25, 5])
@@ -16,7 +16,8 @@ MAX_TRACKS_PER_PLAYLIST = 50
 TOP_MISSED_TRACKS_COUNT = 200
 
 
-def get_similar_users(from_date, to_date):
+def get_similar_users(from_date, to_date) -> set:
+    """ Register the pairs of similar users as a temporary view and return the ids of the users in those pairs. """
     calculate_dataframes(from_date, to_date, "similar_users", 50)
     similar_users_df = get_similar_users_df(3)
 
@@ -30,6 +31,7 @@ def get_similar_users(from_date, to_date):
         StructField("other_user_id", IntegerType(), nullable=False)
     ]))
     df.createOrReplaceTempView("similar_users_for_missed_recordings")
+    return {user_id for pair in users for user_id in pair}
 
 
 def generate_top_missed_recordings(year):
@@ -37,8 +39,9 @@ def generate_top_missed_recordings(year):
     from_date = datetime(year, 1, 1)
     to_date = datetime.combine(date(year, 12, 31), time.max)
 
-    get_listens_from_dump(from_date, to_date).createOrReplaceTempView("all_listens")
-    get_similar_users(from_date, to_date)
+    # only the listens of users with similar users are used, skip reading those of other users
+    user_ids = get_similar_users(from_date, to_date)
+    get_listens_from_dump(from_date, to_date, user_ids=list(user_ids)).createOrReplaceTempView("all_listens")
 
     query = f"""
         WITH intermediate AS (